@@ -26,10 +26,21 @@ HDT
 '''
 
 import sys
+import os
 import time
+import queue
+import signal
 import pigpio
 import _433_AR
 import math
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Common'))
+import _433_sink
+import _433_cap
+import _433_bench
+import _433_beacon
+import _433_log
+import _433_shm
+import _433_txq
 
 # GPIO pins on the Pi to use for transmit/receive
 TX=16
@@ -64,6 +75,18 @@ REPEATS  =     5       # number of times to repeat packet in transmission
 MSGLEN   =    40       # Acurite 609 msgs are 40 bits
 SLPTIME  =    10       # Sleep 10 sec between beacons
 
+MODEL    = "Acurite-609TXC"   # rtl_433 model name for logged packets
+LOGFILE  = None        # JSON-lines packet log file; None logs to stdout
+CAPTURE  = None        # raw edge capture file prefix; None for no capture
+SHMFILE  = None        # shared-memory ring of received packets, e.g. "/dev/shm/AR609.433"; None for none
+BENCH    = False       # loopback benchmark: check codes received against those sent
+BENCHFILE = None       # file to append benchmark reports to (JSON lines); None for none
+BEACON   = False       # True: pigpiod itself sends a fixed packet every SLPTIME sec
+DBGLEVEL = "INFO"      # debug log level (TRACE, DEBUG, INFO, WARN); kill -USR1 toggles TRACE
+DBGFILE  = "/dev/stderr"  # debug log file
+CALFILE  = "AR609.cal.json"  # timing calibration curve, kept beside this program;
+                             #   delete it to recalibrate, or None to calibrate at every start
+
 # Create a byte array for the message itself & compute checksum
 def make_msg(I, S, T, H):
   msg = bytearray([
@@ -76,22 +99,31 @@ def make_msg(I, S, T, H):
   return msg
 
 # define optional callback for received codes to report recognized codes received
+#   This runs in pigpio's callback thread, so it only queues the packet
+#   and its timing metrics; the sink's writer thread formats and prints them
 def rx_callback(code, bits):
-   global rxcalls
-   print("\nFrom callback: Received msg with ", bits, " bits, ", end="")
-   print("Code = 0x{:X} = 0b{:40b} ==> ".format(code, code), end="")
-   b = code.to_bytes(5,'big')
-   i = b[0]
-   s = b[1]>>4
-   t1 = ( b[1]&0x0f )<<8
-   t2 = b[2]
-   t = (t1+t2)/10.0
-   h = b[3]
-   print("\tID=%d, s=%d, t=%5.1f, h=%d" % (i,s,t,h))
-   metric = rx.m._metrics()
-   print(metric)
+   log.packet("rx", MODEL, code, bits, **(rx.m._metrics() if rx is not None else {}))
+   if shm is not None:
+      shm.packet("rx", MODEL, code, bits, gpio=RX)
+   if bench is not None:
+      bench.heard(code, bits)
           
+# define callback for packets the transmit queue starts sending.
+#   Runs in the queue's worker thread as the packet goes on the air, so
+#   the log and the bench are given the actual start, not the queueing, time
+def tx_started(msg):
+   def started(t):
+      log.packet("tx", MODEL, msg, t=t)
+      if bench is not None:
+         bench.sent(msg, t)
+   return started
+
 # main code
+log = _433_sink.sink(LOGFILE)
+dbg = _433_log.log(DBGFILE, _433_log.level(DBGLEVEL))
+# "kill -USR1 <pid>" switches per-edge tracing on and off while running
+signal.signal(signal.SIGUSR1, lambda sig, frame:
+              dbg.set_level(_433_log.level(DBGLEVEL) if dbg.trace else _433_log.TRACE))
 pi = pigpio.pi() # Connect to local Pi.
 print("Emulation of an Acurite 609 temp/humidity sensor")
 print("ID={:>d}, Status={:>d}, Temp={:>5.1f}C, Hum=0..99".format(ID,ST,TEMP/10.0))
@@ -99,7 +131,15 @@ if not pi.connected:
   print("Can't connect to piogpid.  Is it running?")
   sys.exit(0)
 
-rx = _433_AR.rx(pi, gpio=RX, valid_pkt_callback=rx_callback)
+cap = None if CAPTURE is None else _433_cap.recorder(CAPTURE)
+shm = None if SHMFILE is None else _433_shm.publisher(SHMFILE)
+# everything rx_callback reads must exist before the receiver starts:
+#   a neighbour's sensor may be decoded at once, during the calibration
+bench = None
+rx = None
+rx = _433_AR.rx(pi, gpio=RX, valid_pkt_callback=rx_callback, capture=cap, log=dbg)
+calfile = None if CALFILE is None else os.path.join(os.path.dirname(os.path.abspath(__file__)), CALFILE)
+curve = _433_AR.load_curve(calfile) if calfile is not None and os.path.exists(calfile) else None
 tx = _433_AR.tx(pi,
                 gpio=TX,
                 repeats=REPEATS,
@@ -107,29 +147,67 @@ tx = _433_AR.tx(pi,
                 sync=SYNC,
                 gap=GAP,
                 t0=SHORT,
-                t1=LONG)
+                t1=LONG,
+                curve=curve,
+                log=dbg)
+if calfile is not None and curve is None:
+   _433_AR.save_curve(calfile, tx.curve, TX)
 
 print("Calibration: pigpiod wave timing ratio, real:expected, = {:.2f}".format(tx.joan))
+print("  by duration: " + ", ".join("{}us {:.3f}".format(us, r) for us, r in tx.curve)
+      + ("" if curve is None else " (from {})".format(CALFILE)))
+bench = None if not BENCH else _433_bench.bench(MODEL, MSGLEN,
+           dict(pulse=PULSE, sync=SYNC, gap=GAP, t0=SHORT, t1=LONG, repeats=REPEATS,
+                joan=round(tx.joan, 3)))
 
 # For now, just loop 'til CNTL-C
 cntr = -1
+b = None
+q = None
 try:
+   if BEACON:
+      # Fixed packet, sent by a script in pigpiod with no Python wake-ups
+      msg = make_msg(ID,ST,TEMP,0)
+      log.packet("tx", MODEL, msg, beacon=SLPTIME)
+      b = _433_beacon.beacon(pi, tx, msg, SLPTIME)
+      while True:
+         time.sleep(60)
+   # Packets are sent by the queue's worker thread, so this loop
+   #   never waits out their airtime
+   q = _433_txq.txq(tx)
    while (True):
       cntr += 1
       cntr %= 100
       msg = make_msg(ID,ST,TEMP,cntr)
-      print(CSIBLU,'\nSending message: 0x', end='')
-      for i in range(MSGLEN if (len(msg))>MSGLEN else len(msg)):
-         print('{:>02X} '.format(msg[i]), end='')
-      print(CSIBLK, " ==> ", end="")
-      tx.send(msg)
+      try:
+         q.enqueue(msg, started=tx_started(msg))
+      except queue.Full:
+         dbg.emit(_433_log.WARNING, "tx queue full; {} not sent", msg.hex())
       time.sleep(SLPTIME)
 except KeyboardInterrupt:
    stats = rx.m._stats()
+   stats['DaemonCalls'] = rx.daemon_calls    # pigpiod commands from the rx callback
+   stats['PerEdgeCalls'] = rx.per_edge_calls # ... had the watchdog been re-armed at every edge
    print(CSIRED,"\nOverall statistics\n   ",stats,CSIBLK)
+   print("Decode funnel\n   ",rx.snapshot())
+   if bench is not None:
+      print(bench.text())
+      if BENCHFILE is not None:
+         bench.write(BENCHFILE)
 
 #  ^C: shut things down
-tx.cancel()      # Cancel the transmitter.
+if b is not None:
+   b.stop()      # Stop the beacon script.
+if q is not None:
+   q.close()     # Send what is queued, and cancel the transmitter.
+else:
+   tx.cancel()   # Cancel the transmitter.
 rx.cancel()      # Cancel the receiver.
 pi.stop()        # Disconnect from local Pi.
+log.close()      # Write out any packets still queued.
+dbg.close()      # and any debug messages.
+if cap is not None:
+   cap.close()   # Record the edge count in the capture file.
+if shm is not None:
+   shm.close()
 sys.exit(0)
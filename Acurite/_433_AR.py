@@ -34,9 +34,15 @@ The transmit function allows the timings to be set as parameters,
     to send/receive 40-bit Acurite packets
 '''
 
+import sys
+import os
 import time
+import json
 import pigpio
 import math
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Common'))
+import _433_log
+from _433_log import TRACE, DEBUG
 
 # machine states
 SYNC_WAIT    = 0
@@ -53,6 +59,13 @@ SYNC     = 4
 GAP      = 5
 Intervals = ["SYNC_GAP", "PULSE", "SHORT", "LONG", "SYNC", "GAP"]
 
+# reasons the machine is reset, counted in mach.resets
+DOUBLE_PULSE = 0             #two pulses in a row
+UNEXPECTED   = 1             #interval (or unclassified edge) not valid in this state
+BAD_SYNC     = 2             #wrong number of SYNC_GAPs before the SYNC
+WRONG_LEN    = 3             #packet ended with other than MSGLEN bits
+Resets = ["DoublePulse", "Unexpected", "BadSync", "WrongLen"]
+
 # Set default waveform parameters for Acurite 609 transmission timings
 #  These are scaled after sending & receiving a test pulse train
 #  The pigpio library timings vary depending upon system configuration,
@@ -74,6 +87,8 @@ REPEATS     =    3
 #  Trailing should be set to 1 if pulses are 3v3-->0v0 (inverted)
 TRAILING    =    1           #Set to 0 if pulse voltages are 0->1 or to 1 if they're 1->0 
 MICROS      =  500           #Timing for calibration: 500usec high-low pulse
+CAL_POINTS  = [ e[2] for e in Timing_Table ]   #durations measured for the calibration curve
+CAL_SECS    =  0.2           #time spent measuring each of them
 
 TOLERANCE   =   17           #Timing tolerance for edge classification (as %)
 
@@ -82,9 +97,16 @@ TOLERANCE   =   17           #Timing tolerance for edge classification (as %)
 #  "edge" of length "interval" microsec just received
 #  and advances the machine state, depending on current state and token type
 class mach():
-   def __init__(self,callback=None):
+   def __init__(self,callback=None,log=_433_log.off):
       self.cb = callback
+      self.log = log
       self._reset()
+      self.sg_run     = 0         #(PULSE,SYNC_GAP) pairs just seen in a row
+      self.resyncs    = 0         #times a preamble was resumed rather than restarted
+      self.tokens     = 0         #Decode funnel:  edges given to the machine,
+      self.unclassified = 0       #  those that were no interval type,
+      self.preambles  = 0         #  preambles started,
+      self.resets     = [0]*len(Resets)   #  resets, by reason
       self.totpkt     = 0         #These track stats over all pkts
       self.totpul     = 0
       self.totpulavg  = 0.0
@@ -114,6 +136,7 @@ class mach():
       self.need_pulse = True
       
    def _next(self,token,interval=1):
+      self.tokens += 1
       #first, accumulate metrics for possible analysis
       if token == PULSE:
          self.pulsecnt  += 1
@@ -124,8 +147,10 @@ class mach():
          self.totpulstd2 = 0 if self.totpul<2 else ( (self.totpul-2)*self.totpulstd2 + ( self.totpul*(self.totpulavg - interval)**2)/(self.totpul - 1) )/(self.totpul - 1)
 
          if not self.need_pulse:    #two pulses in a row?  No way.
+            #  but the latest one may yet start a preamble, so keep it
+            self.resets[DOUBLE_PULSE] += 1
             self._reset()
-            return
+            self.sg_run = 0
          self.need_pulse = False
          return
       elif token == SHORT:
@@ -143,19 +168,35 @@ class mach():
          self.totlngavg  = interval if self.totlng<1 else ( (self.totlng - 1)*self.totlngavg + interval)/self.totlng
          self.totlngstd2 = 0 if self.totlng<2 else ( (self.totlng-2)*self.totlngstd2 + ( self.totlng*(self.totlngavg - interval)**2)/(self.totlng - 1) )/(self.totlng - 1)
 
+      #keep a short history: the number of (PULSE,SYNC_GAP) pairs seen in a row
+      #  ending with this interval, any of which may be the start of a preamble
+      if token == SYNC_GAP and not self.need_pulse:
+         self.sg_run += 1
+      else:
+         self.sg_run = 0
+
       if self.need_pulse:
-#         print("got an interval when we expected a pulse; reset")
+         if self.log.trace:
+            self.log.emit(TRACE, "got an interval when we expected a pulse; reset")
+         if token is None:
+            self.unclassified += 1
+         self.resets[UNEXPECTED] += 1
          self._reset()
          return
 
       #now evaluate state change: we have just a small number of valid transitions
       if ( self.state == SYNC_WAIT and token == SYNC_GAP ):
          self.sync_count += 1
-#         print("Checking SYNC_WAIT and SYNC_GAP; sync_count = ", self.sync_count)
+         if self.log.trace:
+            self.log.emit(TRACE, "Checking SYNC_WAIT and SYNC_GAP; sync_count = {}", self.sync_count)
+         if self.sync_count == 1:
+            self.preambles += 1
          if self.sync_count >=3:
             #should be 2 pulse+sync-gaps then 1 pulse+sync-interval
-            #  so 3 pulst+sync-gaps isn't our patern: reset machine
-            self._reset()
+            #  so 3 pulse+sync-gaps isn't our pattern, but the last two may
+            #  begin it: resume from them
+            self.resets[BAD_SYNC] += 1
+            self._resync()
          self.need_pulse = True
          return
 
@@ -168,18 +209,27 @@ class mach():
          else:
             #should have been 2 SYNC_GAPS followed by SYNC interval
             #  so <2 SYNC_GAPS followed by SYNC isn't our pattern: reset
+            self.resets[BAD_SYNC] += 1
             self._reset()
          self.need_pulse = True
          return
          
-      if ( self.state == DATA_COLLECT and token == GAP ):
-#         print("DATA_COLLECT + GAP with bit_count = ", self.bit_count)
+      if ( self.state == DATA_COLLECT and token == GAP ) or \
+         ( self.state == DATA_COLLECT and token == SYNC and self.bit_count == MSGLEN ):
+         #(a short inter-packet gap between back-to-back repeats may look like a SYNC)
+         if self.log.trace:
+            self.log.emit(TRACE, "DATA_COLLECT + GAP with bit_count = {}", self.bit_count)
          if self.bit_count==MSGLEN:
             #This is a valid packet.  Send result back to caller and reset for next
             self.totpkt += 1
-            self.cb(self.code, self.bit_count)
+            if self.cb is not None:
+               self.cb(self.code, self.bit_count)
          else:
-            print("SYNC OK; data collected != 40 bits, so packet not valid; ignore packet")
+            #SYNC OK, but data collected != 40 bits, so packet not valid; ignore packet
+            self.resets[WRONG_LEN] += 1
+            if self.log.debug:
+               self.log.emit(DEBUG, "SYNC OK; data collected = {} != {} bits, so packet not valid; ignore packet",
+                             self.bit_count, MSGLEN)
          #and reset machine in any case
          self._reset()
          return
@@ -192,9 +242,36 @@ class mach():
          self.need_pulse = True
          return
          
-      #by default, all other cases reset recognition machine
-      self._reset()
+      #by default, all other cases reset recognition machine, resuming from
+      #  a preamble that may have begun in the pulses just seen (a SYNC_GAP
+      #  in mid-packet, say, from a repeat that began before this one ended)
+      if token is None:
+         self.unclassified += 1
+      self.resets[UNEXPECTED] += 1
+      self._resync()
       return
+
+   def _resync(self):
+      #restart the machine at the latest consistent position:  after the last
+      #  (at most two) (PULSE,SYNC_GAP) pairs in the history, if any
+      n = min(self.sg_run, 2)
+      self._reset()
+      if n:
+         self.sync_count = n
+         self.resyncs += 1
+         self.preambles += 1
+
+   def snapshot(self):
+      #the decode funnel counters, as a dictionary
+      v = dict()
+      v['Tokens']       = self.tokens
+      v['Unclassified'] = self.unclassified
+      v['Preambles']    = self.preambles
+      v['Resyncs']      = self.resyncs
+      for i, r in enumerate(Resets):
+         v['Reset' + r] = self.resets[i]
+      v['Packets']      = self.totpkt
+      return v
    
    def _metrics(self):
       v = dict();
@@ -225,7 +302,8 @@ class mach():
 
 #   rx: A class to read wireless codes transmitted by 433 MHz transmitter
 class rx():
-   def __init__(self, pi, gpio, valid_pkt_callback=None, glitch=150):
+   def __init__(self, pi, gpio, valid_pkt_callback=None, glitch=150, capture=None,
+                prefilter=True, log=_433_log.off):
       """
       Instantiate with the Pi and the GPIO connected to the wireless
       receiver on the pin specified by "gpio"
@@ -238,12 +316,29 @@ class rx():
       A glitch filter will be used to remove edges shorter than
       "glitch" us long from the wireless stream.  This is intended
       to remove the bulk of radio noise.
+
+      If "capture" is given (a recorder from Common/_433_cap.py), every
+      raw edge seen is recorded to it for later analysis and replay.
+
+      While no preamble is under way, a cheap "prefilter" keeps edges
+      that can't start one (see _cbf) from the recognition machine;
+      "prefiltered" counts the edges it drops.
+
+      Debug messages, and with level TRACE each edge's state transition,
+      go to "log" (see Common/_433_log.py).
+
+      snapshot() returns the decode funnel counters:  edges seen, those
+      prefiltered, tokens given to the recognition machine, those
+      unclassified, preambles started and resumed, resets by reason,
+      and packets delivered.
       """
       #instantiate the recognition machine and record the valid-packet callback
-      self.m = mach(callback=valid_pkt_callback)
+      self.m = mach(callback=valid_pkt_callback, log=log)
+      self.log = log
       self.pi = pi
       self.gpio = gpio
       self.glitch = glitch
+      self._cap = None if capture is None else capture.put
 
       for e in Timing_Table:
          e[3] = int(e[2]*(1.0-TOLERANCE/100.))          #set low-bound for this interval type
@@ -256,6 +351,15 @@ class rx():
       
       self._tick_count = 0
       self._last_edge_tick = -1
+      self.edges = 0              # edges seen (not counting watchdog timeouts)
+      self._wd = False            # watchdog armed
+      self.daemon_calls = 0       # pigpiod commands made from the callback
+      self.per_edge_calls = 0     # those the callback would make re-arming at each edge
+      self.prefilter = prefilter
+      self.prefiltered = 0        # edges dropped by the prefilter
+      self._held = None           # idle: pulse length held for the prefilter
+      self._sg_lo = Timing_Table[SYNC_GAP][3]
+      self._sg_hi = Timing_Table[SYNC_GAP][4]
       self._cb = pi.callback(gpio, pigpio.EITHER_EDGE, self._cbf)
       
    def _class_edge(self,e):
@@ -288,9 +392,24 @@ class rx():
       "1" data bit.  The 40th bit is terminated by (PULSE,GAP) to signal the end 
       of that packet.  But we need to set a watchdog timer after that pulse (which
       signals the 40th bit) so that the packet can be processed before the next 
-      one begins.
+      one begins.  The watchdog is armed once, by the first packet of a
+      transmission to complete its bits, and disarmed when it times out
+      after the last, so the callback makes just two pigpiod calls per
+      transmission ("daemon_calls" counts them;  "per_edge_calls"
+      counts the calls re-arming the watchdog at every edge after the
+      40th bit, and disarming it at every gap, would have made).
 
       The start of packet is recognized by a sync preamble of 3 pulses.
+      While the machine is idle, only a pulse followed by a SYNC_GAP
+      interval can start one, and anything else would just reset it
+      again, so the prefilter holds each pulse until its interval
+      arrives and passes the pair on only if the interval is a
+      SYNC_GAP:  two integer comparisons per noise edge instead of a
+      classification, statistics updates, and a reset.
+      When a token doesn't fit, the machine doesn't simply start over:  it
+      resumes from the (PULSE,SYNC_GAP) pairs it has just seen, so a preamble
+      that began with noise, or a repeat that arrives before the packet in
+      progress ends, isn't lost ("resyncs" counts these).
       The end of packet is recognized when the 40th bit has been received and the gap
       that follows is at least GAP usec long or the watchdog times out.
 
@@ -304,40 +423,147 @@ class rx():
          -  transmitter sends the data packet "repeat" times before concluding transmission
       """
 
+      if self._cap is not None:
+         self._cap(gpio, level, tick)
+      if level != 2:
+         self.edges += 1
 # every other rising/falling edge triggers an analysis of the interval length
       edge_len = pigpio.tickDiff(self._last_edge_tick, tick)
       self._last_edge_tick = tick
       if self._last_edge_tick < 0:
          self._last_edge_tick = tick
          return
+      m = self.m
+      if self.prefilter and level != 2 and m.need_pulse and m.sync_count == 0 and m.state == SYNC_WAIT:
+         if level == TRAILING:                    # hold the pulse
+            self._held = edge_len
+            return
+         if self._held is None or not (self._sg_lo <= edge_len <= self._sg_hi):
+            self.prefiltered += 1 if self._held is None else 2
+            self._held = None
+            return
+         m._next(PULSE, self._held)               # a preamble may be starting
+         self._held = None
       if level == 2 or edge_len > 11000:          # watchdog timer
          edge_type = GAP
-         self.pi.set_watchdog(self.gpio,0)
+         self.per_edge_calls += 1
       elif level == TRAILING:                     # falling edge --> just saw pulse
          edge_type = PULSE
       else: 
          edge_type = self._class_edge(edge_len)
       if self.m.bit_count == MSGLEN:
+         self.per_edge_calls += 1
+      if self.m.bit_count == MSGLEN and not self._wd:
+         # pigpiod restarts the watchdog at every edge, so arming it once
+         #   covers this packet and the repeats that follow it
          self.pi.set_watchdog(self.gpio,11)
-#      print(States[self.m.state], edge_len, "NONE" if edge_type==None else Intervals[edge_type], "--> ", end="")
+         self._wd = True
+         self.daemon_calls += 1
+      log = self.log
+      if log.trace:
+         state = self.m.state
       self.m._next(edge_type,edge_len)
-#      print(States[self.m.state])
+      if log.trace:
+         log.emit(TRACE, "{} {} {} --> {}", States[state], edge_len,
+                  "NONE" if edge_type==None else Intervals[edge_type], States[self.m.state])
+      if level == 2 and self._wd:
+         # transmission over: disarm until the next one
+         self.pi.set_watchdog(self.gpio,0)
+         self._wd = False
+         self.daemon_calls += 1
+
+# Returns the decode funnel counters:  edges seen, those dropped by the prefilter,
+#   and the recognition machine's counters (see mach.snapshot())
+   def snapshot(self):
+      v = dict()
+      v['Edges']       = self.edges
+      v['Prefiltered'] = self.prefiltered
+      v.update(self.m.snapshot())
+      return v
 
 # Cancels the wireless code receiver.
    def cancel(self):
+      if self._wd:
+         self.pi.set_watchdog(self.gpio, 0)
+         self._wd = False
       self.pi.set_glitch_filter(self.gpio, 0) # Remove glitch filter.
       if self._cb is not None:
          self._cb.cancel()
       self._cb = None
 
 
+#  Calibration curve:  a list of [usec, ratio] points, sorted by usec, giving
+#    the ratio of actual to programmed time of a pigpio wave pulse of that
+#    length.  The ratio of other lengths is interpolated linearly between the
+#    points, and is that of the nearest end point beyond them.
+def calibrate(pi, gpio, points=CAL_POINTS):
+   """
+   Measures the actual/programmed timing ratio of square waves of each
+   of the durations "points" (us) on "gpio", and returns the curve.
+   Points whose wave can't be created are skipped;  raises RuntimeError
+   if none can be measured.
+   """
+   curve = []
+   for us in sorted(points):
+      n = max(10, min(65535, int(CAL_SECS*1000000/(2*us))))
+      pi.wave_add_generic(
+        [pigpio.pulse(1<<gpio,       0, us),
+         pigpio.pulse(      0, 1<<gpio, us)])
+      wid = pi.wave_create()
+      if wid < 0:
+         continue
+      start = time.time()
+      pi.wave_chain([255, 0, wid, 255, 1, n%256, n//256])  # send wave n times
+      while pi.wave_tx_busy():
+         time.sleep(0.001)
+      duration = time.time() - start
+      pi.wave_delete(wid)
+      curve.append([us, duration/(2.0*n*us/1000000.0)])
+   if not curve:
+      raise RuntimeError("calibration failed: pigpiod could create no wave on GPIO {}".format(gpio))
+   return curve
+
+def curve_ratio(curve, us):
+   """
+   Returns the actual/programmed timing ratio of "us" on "curve".
+   """
+   if not curve:
+      raise ValueError("empty calibration curve")
+   if us <= curve[0][0]:
+      return curve[0][1]
+   for (u0, r0), (u1, r1) in zip(curve, curve[1:]):
+      if us <= u1:
+         return r0 + (r1 - r0)*(us - u0)/(u1 - u0)
+   return curve[-1][1]
+
+def load_curve(path):
+   """
+   Returns the calibration curve saved in JSON file "path".
+   """
+   with open(path) as f:
+      curve = sorted([ list(p) for p in json.load(f)["curve"] ])
+   if not curve:
+      raise ValueError("{} holds an empty calibration curve".format(path))
+   return curve
+
+def save_curve(path, curve, gpio=None):
+   """
+   Saves calibration curve "curve", measured on "gpio", to JSON file "path".
+   """
+   if not curve:
+      raise ValueError("won't save an empty calibration curve")
+   with open(path, "w") as f:
+      json.dump({"gpio": gpio, "time": int(time.time()),
+                 "curve": [ [us, round(r, 5)] for us, r in curve ]}, f)
+      f.write("\n")
+
 #  tx: A class to transmit the wireless codes sent by 433 MHz wireless fobs.
 #  [HDT] modified for PPM: constant pulse width, variable inter-pulse gaps (marks)
 class tx():
    def __init__(self, pi, gpio, pulse=Timing_Table[PULSE][2],
                 repeats=REPEATS, bits=MSGLEN, gap=Timing_Table[GAP][2],
                 t0=Timing_Table[SHORT][2], t1=Timing_Table[LONG][2],
-                sync=Timing_Table[SYNC][2]):
+                sync=Timing_Table[SYNC][2], joan=None, curve=None, log=_433_log.off):
       """
       Instantiate with the Pi and the GPIO connected to the wireless
       transmitter on pin "gpio".
@@ -359,79 +585,92 @@ class tx():
       and long mark length (default LONG us) may be set as parameters.
 
       Calibrate pigpiod timing by computing ratio of actual time to
-        programmed time for a wave chain of known length
+        programmed time for wave chains of known length
       Taken from Joan, https://github.com/joan2937/pigpio/issues/331
+      The ratio isn't the same for all durations, so it is measured for
+        each of CAL_POINTS and each interval is scaled by the ratio
+        interpolated for its length on the resulting "curve" (see
+        calibrate()).  A curve measured before (see load_curve())
+        may be given as "curve" to skip the calibration.
+      If a single ratio is known, give it as "joan" instead (e.g.,
+        joan=1.0 when generating waveforms offline with the virtual Pi
+        in Common/_433_virt.py)
+      Each code sent, with its wave chain, is a DEBUG message to "log"
+        (see Common/_433_log.py)
       """
       
       # Calibrate timings (requested-to-actual) using transmitter pin
       pi.set_mode(gpio, pigpio.OUTPUT)
 
-      #create a pulse train of known duration for timing
-      pi.wave_add_generic(
-        [pigpio.pulse(1<<gpio,       0, MICROS), 
-         pigpio.pulse(      0, 1<<gpio, MICROS)])
-      wid = pi.wave_create()
-      if wid >= 0:
-         start = time.time()
-         pi.wave_chain([255, 0, wid, 255, 1, 200, 0]) # send wave 200 times
-         while pi.wave_tx_busy():
-            time.sleep(0.001)
-         duration = time.time() - start
-         pi.wave_delete(wid)
-      EXPECTED_SECS = 400.0 * MICROS / 1000000.0
-      joan = duration / EXPECTED_SECS
-
-      # set our parameters; scale timings per "joan" ratio of actual-to-expected timings
+      if curve is None:
+         curve = [[MICROS, joan]] if joan is not None else calibrate(pi, gpio)
+
+      # set our parameters; timings are scaled per the curve as the waves are made
       self.pi = pi
       self.gpio = gpio
       self.repeats = repeats
       self.bits = bits
-      self.joan = joan
-      self.gap = int(gap/joan)
-      self.t0 = int(t0/joan)
-      self.t1 = int(t1/joan)
-      self.pulse = int(pulse/joan)
-      self.sync = int(sync/joan)
+      self.curve = sorted([ list(p) for p in curve ])
+      self.log = log
+      self.joan = curve_ratio(self.curve, MICROS)
+      self.gap = gap
+      self.t0 = t0
+      self.t1 = t1
+      self.pulse = pulse
+      self.sync = sync
       
       self._make_waves()
 
       pi.set_mode(gpio, pigpio.OUTPUT)
       pi.set_pull_up_down(gpio, pigpio.PUD_DOWN)
       
+#   Returns the programmed length of an interval of "us" actual usec
+   def _scale(self, us):
+      return int(us/curve_ratio(self.curve, us))
+
 #   Generates the basic waveforms needed to transmit codes.
    def _make_waves(self):
+      # Each wave's pulses are kept too, for combined waveforms
+      #   (see Common/_433_multi.py)
+      self._pulses = dict()
+      pulse = self._scale(self.pulse)
+
       # Pre-amble Sync has 3 pulses with a sync gap after the third
       wf = []
-      wf.append(pigpio.pulse(1<<self.gpio, 0, self.pulse))
-      wf.append(pigpio.pulse(0, 1<<self.gpio, self.pulse))
-      wf.append(pigpio.pulse(1<<self.gpio, 0, self.pulse))
-      wf.append(pigpio.pulse(0, 1<<self.gpio, self.pulse))
-      wf.append(pigpio.pulse(1<<self.gpio, 0, self.pulse))
-      wf.append(pigpio.pulse(0, 1<<self.gpio, self.sync))
+      wf.append(pigpio.pulse(1<<self.gpio, 0, pulse))
+      wf.append(pigpio.pulse(0, 1<<self.gpio, pulse))
+      wf.append(pigpio.pulse(1<<self.gpio, 0, pulse))
+      wf.append(pigpio.pulse(0, 1<<self.gpio, pulse))
+      wf.append(pigpio.pulse(1<<self.gpio, 0, pulse))
+      wf.append(pigpio.pulse(0, 1<<self.gpio, self._scale(self.sync)))
       self.pi.wave_add_generic(wf)
       self._amble = self.pi.wave_create()
+      self._pulses[self._amble] = wf
 
       # Post-amble is a pulse followed by an inter-packet gap
       wf = []
-      wf.append(pigpio.pulse(1<<self.gpio, 0, self.pulse))
-      wf.append(pigpio.pulse(0, 1<<self.gpio, self.gap))
+      wf.append(pigpio.pulse(1<<self.gpio, 0, pulse))
+      wf.append(pigpio.pulse(0, 1<<self.gpio, self._scale(self.gap)))
       self.pi.wave_add_generic(wf)
       self._post = self.pi.wave_create()
+      self._pulses[self._post] = wf
       
       
       # "0" is a pulse followed by a short gap
       wf = []
-      wf.append(pigpio.pulse(1<<self.gpio, 0, self.pulse))
-      wf.append(pigpio.pulse(0, 1<<self.gpio, self.t0))
+      wf.append(pigpio.pulse(1<<self.gpio, 0, pulse))
+      wf.append(pigpio.pulse(0, 1<<self.gpio, self._scale(self.t0)))
       self.pi.wave_add_generic(wf)
       self._wid0 = self.pi.wave_create()
+      self._pulses[self._wid0] = wf
 
       # "1" is a pulse follwed by a long gap
       wf = []
-      wf.append(pigpio.pulse(1<<self.gpio, 0, self.pulse))
-      wf.append(pigpio.pulse(0, 1<<self.gpio, self.t1))
+      wf.append(pigpio.pulse(1<<self.gpio, 0, pulse))
+      wf.append(pigpio.pulse(0, 1<<self.gpio, self._scale(self.t1)))
       self.pi.wave_add_generic(wf)
       self._wid1 = self.pi.wave_create()
+      self._pulses[self._wid1] = wf
 
 #  Set the number of code repeats.
    def set_repeats(self, repeats):
@@ -455,24 +694,21 @@ class tx():
 
       self._make_waves()
 
-#  Transmit the code using pigpiod
-   def send(self, code):
+#  Build the wave chain that transmits the code
+   def _chain(self, code):
       chain = [255,0]
 
       #  Pre-amble of sync pulses & gap
       chain += [self._amble]
 
       #  Now the data bits
-      bs=""
       bit = (1<<(self.bits-1))
       for i in range(self.bits):
          bit = (1<<(7-i%8))
          if code[int(i/8)] & bit:
             chain += [self._wid1]
-            bs += "1"
          else:
             chain += [self._wid0]
-            bs += "0"
          bit = bit >> 1
 
       #[HDT] And finish with the terminal pulse and inter-packet gap
@@ -480,11 +716,14 @@ class tx():
 
       #  Repeat packet transmission specified # of times
       chain += [255, 1, self.repeats, 0]
+      return chain
 
-      print("Sending bit string of ",  self.bits, " bits: ", bs)
-#      print("Wave chain:")
-#      print(chain)
-      
+#  Transmit the code using pigpiod
+   def send(self, code):
+      #  Sent packets are logged by the caller (see Common/_433_sink.py)
+      chain = self._chain(code)
+      if self.log.debug:
+         self.log.emit(DEBUG, "tx {} chain {}", bytes(code).hex(), chain)
       self.pi.wave_chain(chain)
 
       while self.pi.wave_tx_busy():
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+# _433_beacon.py
+
+'''
+Daemon-resident beacons:  a device's fixed packet, sent every
+"period" seconds by a script stored in pigpiod, so that no Python
+code runs (and nothing needs to wake up) for each send.
+
+The tx object builds its waves and its wave chain as usual;  the
+chain, which refers to the waves already created in pigpiod, is then
+compiled into a pigpio script that loops forever:
+
+   tag 100   tick  sta v0          v0 = tick at the start of the send
+             wvcha <chain>         start the transmission
+   tag 101   tick  sub v0  sta v1  v1 = us since the start
+             lda p0  sub v1        us left in the period (p0)
+             div 1000              ... as ms
+             cmp 60000  jm 102     sleep at most a minute at a time
+             mils 60000  jmp 101
+   tag 102   cmp 1  jm 100         period over: send again
+             sta v2  mils v2  jmp 101
+
+Each period is timed from the start of the previous send on pigpio's
+microsecond tick, so the beacon doesn't drift by the airtime or by
+Python's scheduling, and pigpiod's own thread keeps the jitter to a
+few ms.  The packet can't change while the beacon runs;  to send a
+new payload, stop it and start another.
+
+Script parameters and variables are signed 32-bit, so the period can
+be at most MAXPERIOD us (about 35 minutes).
+
+  Use:
+     import _433_beacon
+     tx = _433_AR.tx(pi, gpio=16, ...)
+     b = _433_beacon.beacon(pi, tx, msg, period=30)
+     ...
+     b.stop()
+'''
+
+import time
+import pigpio
+
+import _433_virt
+
+#  Longest period, us:  the greatest signed 32-bit script parameter
+MAXPERIOD = 2**31 - 1
+
+def script(chain):
+   """
+   Returns the text of the pigpio script that sends wave chain
+   "chain" every p0 us.
+   """
+   return ("tag 100 tick sta v0 wvcha " + " ".join(str(c) for c in chain) +
+           " tag 101 tick sub v0 sta v1 lda p0 sub v1 div 1000"
+           " cmp 60000 jm 102 mils 60000 jmp 101"
+           " tag 102 cmp 1 jm 100 sta v2 mils v2 jmp 101")
+
+class beacon():
+   def __init__(self, pi, tx, code, period):
+      """
+      Starts sending "code" with transmitter "tx" every "period"
+      seconds from a script stored in pigpiod.
+      """
+      chain = tx._chain(code)
+      airtime = _433_virt.duration(_433_virt.expand(chain, tx._pulses))
+      us = int(period*1000000)
+      if us <= airtime:
+         raise ValueError("period {} s is shorter than the {} us packet".format(period, airtime))
+      if us > MAXPERIOD:
+         raise ValueError("period {} s is longer than the {:.0f} s a script can time".format(
+                          period, MAXPERIOD/1000000.0))
+      self.pi = pi
+      self.period = period
+      self.text = script(chain)
+      self.sid = pi.store_script(self.text.encode())
+      while pi.script_status(self.sid)[0] == pigpio.PI_SCRIPT_INITING:
+         time.sleep(0.01)
+      pi.run_script(self.sid, [us])
+
+   def running(self):
+      """
+      Returns True while the script is running (or sleeping).
+      """
+      return self.pi.script_status(self.sid)[0] in (pigpio.PI_SCRIPT_RUNNING,
+                                                    pigpio.PI_SCRIPT_WAITING)
+
+   def stop(self):
+      """
+      Stops the beacon and deletes its script.  The tx's waves are
+      left for the tx to delete (tx.cancel()).
+      """
+      if self.sid is not None:
+         self.pi.stop_script(self.sid)
+         self.pi.wave_tx_stop()
+         self.pi.delete_script(self.sid)
+         self.sid = None
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+# _433_bench.py
+
+'''
+Loopback benchmark:  checks the codes an emulator's receiver decodes
+against the codes its transmitter sent on the same Pi.
+
+Each send is kept in an index of transmissions still "in flight"
+(sent no more than "window" seconds ago).  Each code received is
+matched to its send:  to the in-flight send with the same code if
+there is one, else to the in-flight send it differs from in the
+fewest bits (if no more than a quarter of them), else it is counted
+as unmatched.  The first decode of a send gives its send-to-decode
+latency; every decode counts toward the packet error rate (PER, the
+share of decoded packets with any bit wrong) and adds its wrong bits
+to a per-bit-position error count (the "heatmap").  Sends none of
+whose repeats were decoded within the window count as lost.
+
+Delivery and latency statistics are kept by a _433_match.device, the
+same as for the logs compared by Tools/correlate.py.  The report is
+labeled with the protocol and the tx timing settings, so that runs at
+different settings can be compared;  write() appends it as a JSON
+line to a file that collects them.
+
+  Use:
+     import _433_bench
+     b = _433_bench.bench("RasPi", 80, dict(gap=1500, t0=500, t1=1000))
+     b.sent(msg)                  # just before tx.send(msg)
+     b.heard(code, bits)          # in the rx callback
+     print(b.text())
+     b.write("bench.json")
+'''
+
+import time
+import json
+import threading
+from collections import deque
+
+import _433_match
+
+class bench():
+   def __init__(self, model, bits, settings=None, window=5.0):
+      """
+      Benchmarks "bits"-bit packets of rtl_433 model "model" sent with
+      the tx "settings" (a dictionary, for the report), matching
+      decodes to sends made no more than "window" seconds earlier.
+      """
+      self.model = model
+      self.bits = bits
+      self.settings = dict(settings or {})
+      self.window = window
+      self.dev = _433_match.device(window)
+      self.decoded = 0
+      self.errored = 0
+      self.badlen = 0
+      self.lost = 0
+      self.heat = [0]*bits
+      self._flight = deque()       # [t_sent, code, times decoded], oldest first
+      self._lock = threading.Lock()
+
+   def _expire(self, now):
+      f = self._flight
+      while f and now - f[0][0] > self.window:
+         if f.popleft()[2] == 0:
+            self.lost += 1
+
+   def sent(self, code, t=None):
+      """
+      Records a send of "code" (bytes-like, or an integer of "bits"
+      bits) at time "t" (default now).
+      """
+      if t is None:
+         t = time.time()
+      if not isinstance(code, int):
+         code = int.from_bytes(bytes(code), 'big')
+      with self._lock:
+         self._expire(t)
+         self._flight.append([t, code, 0])
+         self.dev.sent += 1
+
+   def heard(self, code, bits, t=None):
+      """
+      Matches a decoded code of "bits" bits, received at time "t"
+      (default now), to its send.
+      """
+      if t is None:
+         t = time.time()
+      with self._lock:
+         self._expire(t)
+         if bits != self.bits:
+            self.badlen += 1
+            return
+         best = None
+         for e in reversed(self._flight):
+            if e[1] == code:
+               best, dist = e, 0
+               break
+            d = bin(e[1] ^ code).count("1")
+            if best is None or d < dist:
+               best, dist = e, d
+         if best is None or dist > self.bits//4:
+            self.dev.unmatched += 1
+            return
+         dev = self.dev
+         if best[2] == 0:
+            lat = t - best[0]
+            dev.delivered += 1
+            dev.latsum += lat
+            dev.hist[min(int(lat/_433_match.BIN), len(dev.hist)-1)] += 1
+         else:
+            dev.duplicates += 1
+         best[2] += 1
+         self.decoded += 1
+         if dist:
+            self.errored += 1
+            x = best[1] ^ code
+            for i in range(self.bits):
+               if x & (1<<(self.bits-1-i)):
+                  self.heat[i] += 1
+
+   def report(self, final=True):
+      """
+      Returns the benchmark results as a dictionary.  If "final", the
+      sends still in flight are settled first:  those not yet decoded
+      count as lost.
+      """
+      with self._lock:
+         if final:
+            self._expire(float("inf"))
+         v = { 'model'    : self.model,
+               'bits'     : self.bits,
+               'settings' : self.settings }
+         v.update(self.dev.summary())
+         v['lost']      = self.lost
+         v['decoded']   = self.decoded
+         v['errored']   = self.errored
+         v['per']       = round(self.errored/self.decoded, 4) if self.decoded else None
+         v['bad_length'] = self.badlen
+         v['heatmap']   = list(self.heat)
+         return v
+
+   def text(self, final=True):
+      """
+      Returns the report as printable text, with the bit error counts
+      laid out a byte per row.
+      """
+      v = self.report(final)
+      s = ["Loopback benchmark: {}  {}".format(self.model,
+           " ".join("{}={}".format(k, x) for k, x in sorted(self.settings.items())))]
+      s.append("   sent {}  lost {}  decoded {}  errored {}  PER {}  unmatched {}  bad length {}".format(
+               v['sent'], v['lost'], v['decoded'], v['errored'], v['per'], v['unmatched'], v['bad_length']))
+      s.append("   latency, sec:  mean {}  p50 {}  p90 {}  p99 {}".format(
+               v['lat_mean'], v['lat_p50'], v['lat_p90'], v['lat_p99']))
+      s.append("   bit errors by position:")
+      for i in range(0, self.bits, 8):
+         s.append("   {:>4}: ".format(i) + " ".join("{:>5}".format(n) for n in self.heat[i:i+8]))
+      return "\n".join(s)
+
+   def write(self, path, final=True):
+      """
+      Appends the report, as one JSON line, to file "path".
+      """
+      v = self.report(final)
+      v['time'] = time.strftime("%Y-%m-%d %H:%M:%S")
+      with open(path, "a") as f:
+         f.write(json.dumps(v) + "\n")
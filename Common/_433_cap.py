@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+# _433_cap.py
+
+'''
+Raw edge capture:  records every (gpio, level, tick) the pigpio
+callback of a receiver sees into preallocated, memory-mapped binary
+files, so a failed decode in the field can be looked at and replayed
+afterward.
+
+Each record is 8 bytes, little-endian:
+   tick   uint32   pigpio tick of the edge, us
+   gpio   uint8
+   level  uint8    0, 1, or 2 (watchdog timeout)
+   valid  uint16   1 for a recorded edge; 0 in unused space
+after a 32-byte header:
+   magic  8 bytes  b"433CAP\\x00\\x01"
+   size   uint32   record size (8)
+   pad    uint32
+   count  uint64   number of records (0 if the file wasn't closed)
+   start  float64  time.time() when the file was started
+
+Recording an edge is a single struct.pack_into() into the mapped
+file.  When a file is full, recording moves on to the next file of
+the set ("rotation"):  prefix.0000.cap, prefix.0001.cap, ...
+Setting "files" limits the set to that many files, the oldest being
+replaced by the newest.
+
+The next file is made, sized, and mapped ahead by a helper thread,
+under the name prefix.next.cap so that no file of the set is touched
+while the current one fills.  At rotation the callback only swaps
+mappings;  the helper thread then closes the full file and renames the
+new one into its place in the set (replacing the oldest, with a
+"files" limit), and makes the next one.  (If the next file isn't
+ready yet, the callback waits for it.)
+
+The files can be read back zero-copy as NumPy record arrays with
+load(), or as an edge stream for replay with edges().
+
+  Use:
+     import _433_cap
+     cap = _433_cap.recorder("field", records=1<<20)
+     rx = _433_AR.rx(pi, gpio=22, valid_pkt_callback=cb, capture=cap)
+     ...
+     cap.close()
+
+     a = _433_cap.load("field.0000.cap")      # a['tick'], a['level'], ...
+'''
+
+import os
+import glob
+import mmap
+import time
+import struct
+import threading
+
+MAGIC = b"433CAP\x00\x01"
+HDR   = struct.Struct("<8sIIQd")
+REC   = struct.Struct("<IBBH")
+HDRSIZE = 32
+
+class recorder():
+   def __init__(self, prefix, records=1<<20, files=None):
+      """
+      Records to files "prefix.NNNN.cap" of "records" edges each,
+      keeping at most "files" files (None: no limit).
+      """
+      self.prefix = prefix
+      self.records = records
+      self.files = files
+      self.count = 0             # edges recorded, over all files
+      self.stalls = 0            # rotations that had to wait for the next file
+      self._n = 0
+      self._pack = REC.pack_into
+      self._f, self._mm = self._make(self._name(0))
+      self._start()
+      self._next = None          # (file, mapping) made ahead, by the helper thread
+      self._t = None
+      self._ahead()
+
+   def _name(self, n):
+      if self.files:
+         n %= self.files
+      return "{}.{:04d}.cap".format(self.prefix, n)
+
+   def _ahead_name(self):
+      return "{}.next.cap".format(self.prefix)
+
+   def _make(self, path):
+      size = HDRSIZE + self.records*REC.size
+      f = open(path, "w+b")
+      f.truncate(size)
+      mm = mmap.mmap(f.fileno(), size)
+      HDR.pack_into(mm, 0, MAGIC, REC.size, 0, 0, 0.0)
+      return f, mm
+
+   def _start(self):
+      struct.pack_into("<d", self._mm, 24, time.time())
+      self._off = HDRSIZE
+      self._end = len(self._mm)
+
+   def _finish(self, f, mm, off):
+      HDR.pack_into(mm, 0, MAGIC, REC.size, 0,
+                    (off - HDRSIZE)//REC.size, struct.unpack_from("<d", mm, 24)[0])
+      mm.flush()
+      mm.close()
+      f.close()
+
+   def _ahead(self, old=None):
+      # in the helper thread:  close the full file "old", rename the
+      #   file now being filled into the set, and make the next one
+      def run(n):
+         if old is not None:
+            self._finish(*old)
+            os.replace(self._ahead_name(), self._name(n))
+         self._next = self._make(self._ahead_name())
+      self._t = threading.Thread(target=run, args=(self._n,), name="cap", daemon=True)
+      self._t.start()
+
+   def _rotate(self):
+      old = (self._f, self._mm, self._off)
+      self._n += 1
+      if self._next is None:
+         self.stalls += 1
+         self._t.join()
+      self._f, self._mm = self._next
+      self._next = None
+      self._start()
+      self._ahead(old)
+
+   def put(self, gpio, level, tick):
+      """
+      Records one edge.  Same arguments as a pigpio callback, so a
+      recorder may also be given directly to pi.callback().
+      """
+      o = self._off
+      if o >= self._end:
+         self._rotate()
+         o = self._off
+      self._pack(self._mm, o, tick, gpio, level, 1)
+      self._off = o + REC.size
+      self.count += 1
+
+   def close(self):
+      """
+      Closes the file being filled, recording its edge count, and
+      removes the next file made ahead, which holds no edges.
+      """
+      if self._mm is None:
+         return
+      if self._t is not None:
+         self._t.join()
+         self._t = None
+      if self._next is not None:
+         f, mm = self._next
+         mm.close()
+         f.close()
+         os.remove(self._ahead_name())
+         self._next = None
+      self._finish(self._f, self._mm, self._off)
+      self._mm = None
+
+def load(path):
+   """
+   Returns the records of a capture file as a read-only NumPy record
+   array mapped from the file (no copy), with fields tick, gpio,
+   level, and valid.
+   """
+   import numpy as np
+   with open(path, "rb") as f:
+      magic, size, pad, count, start = HDR.unpack(f.read(HDRSIZE))
+   if magic != MAGIC:
+      raise ValueError("{} is not an edge capture file".format(path))
+   dt = np.dtype([("tick", "<u4"), ("gpio", "u1"), ("level", "u1"), ("valid", "<u2")])
+   a = np.memmap(path, dtype=dt, mode="r", offset=HDRSIZE)
+   if count == 0:             # not closed cleanly: use the valid flags
+      count = int(np.count_nonzero(a["valid"]))
+   return a[:count]
+
+def files(prefix):
+   """
+   Returns the capture files of a set, oldest first.
+   """
+   return sorted(glob.glob(glob.escape(prefix) + ".[0-9][0-9][0-9][0-9].cap"),
+                 key=lambda p: os.path.getmtime(p))
+
+def edges(paths, gpio=None):
+   """
+   Generates (level, tick) edges from capture files, for replay on
+   the virtual Pi (_433_virt.pi.play).  Ticks are unwrapped into a
+   continuous microsecond count; watchdog timeouts are dropped since
+   the replaying receiver sets its own.  Reads the files without
+   NumPy, one record at a time.
+   """
+   if isinstance(paths, str):
+      paths = [paths]
+   last = None
+   base = 0
+   for path in paths:
+      with open(path, "rb") as f:
+         magic, size, pad, count, start = HDR.unpack(f.read(HDRSIZE))
+         if magic != MAGIC:
+            raise ValueError("{} is not an edge capture file".format(path))
+         mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+         n = count or (len(mm) - HDRSIZE)//REC.size
+         with memoryview(mm) as mv:
+            for tick, g, level, valid in REC.iter_unpack(mv[HDRSIZE:HDRSIZE + n*REC.size]):
+               if not valid:
+                  break
+               if level > 1 or (gpio is not None and g != gpio):
+                  continue
+               if last is not None and tick < last:
+                  base += 1<<32
+               last = tick
+               yield level, base + tick
+         mm.close()
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+# _433_host.py
+
+'''
+A receiver host:  one process watching several receivers, each on its
+own GPIO, with any of the emulated protocols decoded on each pin.
+
+Every (pin, protocol) pair gets its own rx object, and so its own
+independent decoder state machine.  The host registers one pigpio
+callback per pin, which hands each edge to the decoders on that pin,
+and all decoded packets go to a single sink (a _433_sink.sink, or
+anything with the same packet() method), tagged with their "gpio".
+
+Per-pin counters show how the host keeps up as pins and edge rates
+are added:  edges seen, packets decoded by each protocol, and the
+time spent decoding (total and per edge).
+
+  Use:
+     import _433_host, _433_sink
+     log = _433_sink.sink("rx.json")
+     h = _433_host.host(pi, log)
+     h.add(22, "AR")
+     h.add(23, "RPi")
+     h.add(23, "Mav")
+     ...
+     print(h.stats())
+     h.cancel()
+'''
+
+import time
+import pigpio
+
+import _433_proto
+
+class pin():
+   """
+   The decoders on one GPIO, and its counters.
+   """
+   def __init__(self, gpio):
+      self.gpio = gpio
+      self.rxs = []
+      self.edges = 0
+      self.busy_ns = 0
+      self.packets = dict()      # protocol --> packets decoded
+      self._fns = []             # decoders' callback functions
+      self._wdfns = []           # those that use watchdogs
+      self._cb = None
+      self._last = (time.time(), 0)
+
+   def _cbf(self, g, l, t):
+      t0 = time.perf_counter_ns()
+      if l == 2:                 # watchdog timeout: only for those that set one
+         for f in self._wdfns:
+            f(g, l, t)
+      else:
+         for f in self._fns:
+            f(g, l, t)
+         self.edges += 1
+      self.busy_ns += time.perf_counter_ns() - t0
+
+class host():
+   def __init__(self, pi, sink):
+      self.pi = pi
+      self.sink = sink
+      self.pins = dict()
+
+   def _callback(self, gpio, name):
+      model = _433_proto.model(name)
+      sink = self.sink
+      counts = self.pins[gpio].packets
+      counts[name] = 0
+      if name == "AR":
+         def cb(code, bits):
+            counts[name] += 1
+            sink.packet("rx", model, code, bits, gpio=gpio)
+      else:
+         def cb(code, bits, gap, t0, t1):
+            counts[name] += 1
+            sink.packet("rx", model, code, bits, gpio=gpio, gap=gap, t0=t0, t1=t1)
+      return cb
+
+   def add(self, gpio, name, glitch=150, **kw):
+      """
+      Adds a decoder for protocol "name" ("AR", "RPi", or "Mav") on
+      "gpio".  Other keyword arguments go to the protocol's rx class
+      (default:  the emulator's settings, _433_proto.RX).
+      The pin's glitch filter is the smallest asked for on that pin.
+      """
+      p = self.pins.get(gpio)
+      if p is None:
+         p = self.pins[gpio] = pin(gpio)
+      _433 = _433_proto.module(name)
+      kw = dict(_433_proto.RX.get(name, {}), **kw)
+      cb = self._callback(gpio, name)
+      if name == "AR":
+         rx = _433.rx(self.pi, gpio, valid_pkt_callback=cb, glitch=glitch, **kw)
+      else:
+         rx = _433.rx(self.pi, gpio, callback=cb, glitch=glitch, **kw)
+      # take the edges over from the rx's own callback
+      rx._cb.cancel()
+      rx._cb = None
+      p.rxs.append(rx)
+      p._fns.append(rx._cbf)
+      if name == "AR":
+         p._wdfns.append(rx._cbf)
+      self.pi.set_glitch_filter(gpio, min(r.glitch for r in p.rxs))
+      if p._cb is None:
+         p._cb = self.pi.callback(gpio, pigpio.EITHER_EDGE, p._cbf)
+      return rx
+
+   def stats(self):
+      """
+      Returns a snapshot of the per-pin counters.  "rate" is the edges
+      per second since the previous snapshot.
+      """
+      now = time.time()
+      v = dict()
+      for gpio, p in sorted(self.pins.items()):
+         t, n = p._last
+         edges = p.edges
+         p._last = (now, edges)
+         v[gpio] = { 'edges'    : edges,
+                     'rate'     : int((edges - n)/(now - t)) if now > t else 0,
+                     'packets'  : dict(p.packets),
+                     'busy_ms'  : p.busy_ns//1000000,
+                     'us_per_edge': round(p.busy_ns/1000.0/edges, 2) if edges else None }
+      return v
+
+   def cancel(self):
+      for gpio, p in self.pins.items():
+         if p._cb is not None:
+            p._cb.cancel()
+            p._cb = None
+         for rx in p.rxs:
+            rx.cancel()
+         self.pi.set_glitch_filter(gpio, 0)
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+# _433_log.py
+
+'''
+Leveled debug logging for the rx and tx classes, from per-edge traces
+of the decoders' state transitions (TRACE) down to warnings.
+
+The decoders run in pigpio's callback thread, once per edge, so a
+log message must cost nothing when its level is off and little when
+it is on.  A log has a flag for each level -- "trace", "debug",
+"info" -- and code on the hot path tests the flag before doing
+anything else:
+     if self.log.trace:
+        self.log.emit(_433_log.TRACE, "{} {} --> {}", state, edge_len, token)
+When the flag is False that is one attribute test;  the arguments
+are not even evaluated.  When it is True, emit() only queues the
+format and its arguments:  formatting and writing are done by the
+background writer thread of _433_sink.writer, and if the writer falls
+behind, messages are dropped and counted rather than stalling the
+decoder.
+
+The level may be changed at any time with set_level(), e.g. from a
+signal handler, and the flags change with it.  The rx and tx classes
+take a "log" argument;  by default they use "off", a log that is
+always disabled and writes nowhere.
+
+  Use:
+     import _433_log
+     dbg = _433_log.log("/dev/stderr", _433_log.INFO)
+     rx = _433_AR.rx(pi, 22, valid_pkt_callback=cb, log=dbg)
+     ...
+     dbg.set_level(_433_log.TRACE)       # every edge, from now on
+     ...
+     dbg.close()
+'''
+
+import time
+
+import _433_sink
+
+TRACE   =  5
+DEBUG   = 10
+INFO    = 20
+WARNING = 30
+OFF     = 100
+Levels = {TRACE: "TRACE", DEBUG: "DEBUG", INFO: "INFO", WARNING: "WARN", OFF: "OFF"}
+
+def level(name):
+   """
+   Returns the level named "name" (e.g., "trace"), or the level
+   itself if given a number.
+   """
+   if isinstance(name, int):
+      return name
+   for lv, n in Levels.items():
+      if n.lower() == name.lower() or (lv == WARNING and name.lower() == "warning"):
+         return lv
+   raise ValueError("unknown log level {}".format(name))
+
+class log(_433_sink.writer):
+   def __init__(self, path=None, level=INFO, maxq=4096):
+      """
+      Writes the messages of "level" and above to file "path" (None:
+      stdout), through a queue of at most "maxq" messages.
+      """
+      self.set_level(level)
+      _433_sink.writer.__init__(self, self._fmt, path, maxq)
+
+   def set_level(self, level):
+      """
+      Sets the level of the messages to be written, and the flags.
+      """
+      self.level = level
+      self.trace = level <= TRACE
+      self.debug = level <= DEBUG
+      self.info  = level <= INFO
+
+   def emit(self, level, fmt, *args):
+      """
+      Queues message "fmt", a str.format() string, with its "args",
+      if "level" is enabled;  never blocks.
+      """
+      if level >= self.level:
+         self.put((time.time(), level, fmt, args))
+
+   def _fmt(self, item):
+      t, level, fmt, args = item
+      return "{}.{:06d} {:<5} {}".format(time.strftime(_433_sink.TIMEFMT, time.localtime(t)),
+                                         int(t % 1 * 1000000), Levels.get(level, level),
+                                         fmt.format(*args))
+
+class _off():
+   """
+   A log that is always disabled.
+   """
+   level = OFF
+   trace = False
+   debug = False
+   info  = False
+
+   def set_level(self, level):
+      pass
+
+   def emit(self, level, fmt, *args):
+      pass
+
+   def close(self):
+      pass
+
+off = _off()
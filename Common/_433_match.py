@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+# _433_match.py
+
+'''
+This module matches packets the emulators sent against packets
+rtl_433 (or one of our own receivers) reported hearing, and keeps
+per-device delivery statistics.
+
+Packets are identified by a key of (model, id, payload fields),
+using the rtl_433 field names of the JSON-lines records written by
+_433_sink.py (see PAYLOAD_FIELDS there).  A received packet matches
+the most recent send with the same key that went out no more than
+"window" seconds earlier.  The first match of a send counts as a
+delivery, and its send-to-receive latency is recorded; later matches
+of the same send (repeats heard again) count as duplicates.  Packets
+heard that match no send are counted as unmatched.
+
+Deliveries, duplicates, and latencies are credited to the statistics
+current when the send was made, so with roll() each period's delivery
+ratio is that of the sends made in it, whenever they were heard.
+
+Only sends still inside the window are kept, and latencies are kept
+as a histogram of fixed 1 ms bins, so memory is bounded by the send
+rate times the window no matter how long the logs are.
+
+  Use:
+     import _433_match
+     m = _433_match.matcher(window=5.0)
+     m.sent(t, key)         # for each packet sent
+     m.heard(t, key)        # for each packet received
+     print(m.report())      # or m.roll() for rolling statistics
+'''
+
+import time
+import calendar
+from collections import deque
+
+import _433_sink
+
+#  Latency histogram bin width, in sec
+BIN = 0.001
+
+def parse_time(v):
+   """
+   Converts an rtl_433 "time" field to seconds since the epoch.
+   Accepts the default local "YYYY-MM-DD HH:MM:SS" format, with or
+   without fractional seconds (-M time:usec), the ISO form with "T"
+   (-M time:iso, local or with a "Z" suffix), and Unix times
+   (-M time:unix), as numbers or strings.
+   """
+   if isinstance(v, (int, float)):
+      return float(v)
+   try:
+      return float(v)
+   except ValueError:
+      pass
+   utc = v.endswith("Z")
+   if utc:
+      v = v[:-1]
+   if "." in v:
+      v, frac = v.split(".", 1)
+      frac = float("0." + frac)
+   else:
+      frac = 0.0
+   tm = time.strptime(v.replace("T", " "), "%Y-%m-%d %H:%M:%S")
+   return (calendar.timegm(tm) if utc else time.mktime(tm)) + frac
+
+def key(rec):
+   """
+   Returns the matching key of a JSON-lines record, or None if the
+   record is not of a model we emulate.  Temperatures are rounded to
+   0.1 degree since rtl_433 may print them with more digits.
+   """
+   model = rec.get("model")
+   fields = _433_sink.PAYLOAD_FIELDS.get(model)
+   if fields is None:
+      return None
+   k = [model]
+   for f in fields:
+      v = rec.get(f)
+      k.append(round(v, 1) if isinstance(v, float) else v)
+   return tuple(k)
+
+class device():
+   """
+   Delivery statistics for one (model, id) device.
+   """
+   def __init__(self, window):
+      self.sent       = 0
+      self.delivered  = 0
+      self.duplicates = 0
+      self.unmatched  = 0
+      self.latsum     = 0.0
+      self.hist       = [0]*(int(window/BIN) + 1)
+
+   def percentile(self, p):
+      """
+      Returns the latency, in sec, below which p% of deliveries fell.
+      """
+      if self.delivered == 0:
+         return None
+      want = p/100.0*self.delivered
+      n = 0
+      for i, c in enumerate(self.hist):
+         n += c
+         if n >= want:
+            return round((i+1)*BIN, 3)
+      return round(len(self.hist)*BIN, 3)
+
+   def summary(self):
+      v = dict()
+      v['sent']       = self.sent
+      v['delivered']  = self.delivered
+      v['pdr']        = round(self.delivered/self.sent, 4) if self.sent else None
+      v['duplicates'] = self.duplicates
+      v['dup_rate']   = round(self.duplicates/self.delivered, 4) if self.delivered else None
+      v['unmatched']  = self.unmatched
+      v['lat_mean']   = round(self.latsum/self.delivered, 4) if self.delivered else None
+      for p in (50, 90, 99):
+         v['lat_p%d' % p] = self.percentile(p)
+      return v
+
+class matcher():
+   def __init__(self, window=5.0):
+      """
+      Matches received packets to sends made no more than "window"
+      seconds before them.
+      """
+      self.window = window
+      self.devices = dict()
+      self._pending = dict()      # key --> deque of [t_sent, times heard, device]
+      self._last = dict()         # devices of the period before the last roll()
+      self._order = deque()       # (t_sent, key) of all pending, oldest first
+
+   def _device(self, k):
+      d = self.devices.get(k[:2])
+      if d is None:
+         d = self.devices[k[:2]] = device(self.window)
+      return d
+
+   def expire(self, now):
+      """
+      Forgets sends made more than "window" seconds before "now".
+      """
+      order = self._order
+      horizon = now - self.window
+      while order and order[0][0] < horizon:
+         t, k = order.popleft()
+         q = self._pending[k]
+         q.popleft()
+         if not q:
+            del self._pending[k]
+
+   def pending(self):
+      """
+      Returns the number of sends still waiting inside the window.
+      """
+      return len(self._order)
+
+   def sent(self, t, k):
+      """
+      Records a packet with key "k" sent at time "t".
+      """
+      self.expire(t)
+      d = self._device(k)
+      d.sent += 1
+      q = self._pending.get(k)
+      if q is None:
+         q = self._pending[k] = deque()
+      q.append([t, 0, d])
+      self._order.append((t, k))
+
+   def heard(self, t, k):
+      """
+      Records a packet with key "k" received at time "t".  Returns the
+      latency if it was the first delivery of a send, else None.
+      """
+      self.expire(t)
+      q = self._pending.get(k)
+      if q is not None:
+         for s in reversed(q):
+            if s[0] <= t:
+               d = s[2]                  # the statistics of the send's period
+               s[1] += 1
+               if s[1] > 1:
+                  d.duplicates += 1
+                  return None
+               lat = t - s[0]
+               d.delivered += 1
+               d.latsum += lat
+               d.hist[min(int(lat/BIN), len(d.hist)-1)] += 1
+               return lat
+      self._device(k).unmatched += 1
+      return None
+
+   def report(self, devices=None):
+      """
+      Returns a dictionary of per-device summaries keyed "model/id".
+      """
+      if devices is None:
+         devices = self.devices
+      return { "{}/{}".format(*k): d.summary()
+               for k, d in sorted(devices.items(), key=str) }
+
+   def roll(self):
+      """
+      Starts new statistics, and returns the report for the sends of
+      the period before the last roll().  A period's sends may still be
+      heard up to "window" seconds after it ends, so its report is held
+      back one period:  with periods at least "window" long, every send
+      in it has been matched or expired by the time it is returned.
+      """
+      r = self.report(self._last)
+      self._last = self.devices
+      self.devices = dict()
+      return r
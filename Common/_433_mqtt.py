@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+# _433_mqtt.py
+
+'''
+A minimal asyncio MQTT 3.1.1 client, enough to subscribe to rtl_433's
+MQTT feed and to publish our own statistics, without needing any
+package beyond the Python standard library.
+
+Only QoS 0 is supported:  CONNECT, SUBSCRIBE, PUBLISH, PINGREQ and
+DISCONNECT are sent, and CONNACK, SUBACK, PUBLISH and PINGRESP are
+understood.  The packet encode/decode helpers are also used by the
+broker stand-in, Tools/mqttstub.py.
+
+  Use:
+     import _433_mqtt
+     c = _433_mqtt.client("localhost", 1883)
+     await c.connect()
+     await c.subscribe("rtl_433/+/events")
+     async for topic, payload in c.messages():
+        ...
+     await c.publish("emulators/stats", b'{"pdr": 1.0}')
+'''
+
+import os
+import asyncio
+
+# MQTT control packet types (high nibble of the first byte)
+CONNECT     = 1
+CONNACK     = 2
+PUBLISH     = 3
+SUBSCRIBE   = 8
+SUBACK      = 9
+PINGREQ     = 12
+PINGRESP    = 13
+DISCONNECT  = 14
+
+def _str(s):
+   b = s.encode() if isinstance(s, str) else s
+   return len(b).to_bytes(2, 'big') + b
+
+def packet(ptype, body=b"", flags=0):
+   """
+   Returns the bytes of a control packet of type "ptype" with the
+   variable header and payload "body".
+   """
+   hdr = bytearray([ptype<<4 | flags])
+   n = len(body)
+   while True:                   # remaining length, 7 bits per byte
+      b = n & 0x7f
+      n >>= 7
+      hdr.append(b | 0x80 if n else b)
+      if not n:
+         break
+   return bytes(hdr) + body
+
+async def read_packet(reader):
+   """
+   Reads one control packet; returns (type, flags, body).
+   """
+   b0 = (await reader.readexactly(1))[0]
+   n = 0
+   shift = 0
+   while True:
+      b = (await reader.readexactly(1))[0]
+      n |= (b & 0x7f) << shift
+      shift += 7
+      if not b & 0x80:
+         break
+   body = await reader.readexactly(n) if n else b""
+   return b0>>4, b0 & 0x0f, body
+
+def parse_publish(flags, body):
+   """
+   Returns (topic, payload) of a PUBLISH packet body.
+   """
+   n = int.from_bytes(body[0:2], 'big')
+   topic = body[2:2+n].decode()
+   i = 2+n
+   if flags & 0x06:              # QoS > 0 carries a packet id
+      i += 2
+   return topic, body[i:]
+
+def matches(filt, topic):
+   """
+   True if "topic" matches the subscription filter "filt" (with
+   MQTT "+" and "#" wildcards).
+   """
+   f = filt.split("/")
+   t = topic.split("/")
+   for i, p in enumerate(f):
+      if p == "#":
+         return True
+      if i >= len(t) or (p != "+" and p != t[i]):
+         return False
+   return len(f) == len(t)
+
+class client():
+   def __init__(self, host="localhost", port=1883, client_id=None, keepalive=60):
+      self.host = host
+      self.port = port
+      self.client_id = client_id or "emul433-{}".format(os.getpid())
+      self.keepalive = keepalive
+      self._pid = 0
+      self._reader = None
+      self._writer = None
+      self._pinger = None
+
+   async def connect(self):
+      """
+      Opens the connection and waits for the broker's CONNACK.
+      """
+      self._reader, self._writer = await asyncio.open_connection(self.host, self.port)
+      body = ( _str("MQTT") + bytes([4, 0x02]) +        # level 4, clean session
+               self.keepalive.to_bytes(2, 'big') + _str(self.client_id) )
+      self._writer.write(packet(CONNECT, body))
+      await self._writer.drain()
+      ptype, flags, body = await read_packet(self._reader)
+      if ptype != CONNACK or body[1] != 0:
+         raise ConnectionError("MQTT connection refused by {}:{}".format(self.host, self.port))
+      self._pinger = asyncio.ensure_future(self._ping())
+
+   async def _ping(self):
+      while True:
+         await asyncio.sleep(self.keepalive/2)
+         self._writer.write(packet(PINGREQ))
+         await self._writer.drain()
+
+   async def subscribe(self, topic):
+      self._pid = self._pid % 0xffff + 1
+      body = self._pid.to_bytes(2, 'big') + _str(topic) + bytes([0])
+      self._writer.write(packet(SUBSCRIBE, body, 0x02))
+      await self._writer.drain()
+
+   async def publish(self, topic, payload, retain=False):
+      if isinstance(payload, str):
+         payload = payload.encode()
+      self._writer.write(packet(PUBLISH, _str(topic) + payload, 1 if retain else 0))
+      await self._writer.drain()
+
+   async def messages(self):
+      """
+      Generates (topic, payload) for each message received, until the
+      broker closes the connection.
+      """
+      try:
+         while True:
+            ptype, flags, body = await read_packet(self._reader)
+            if ptype == PUBLISH:
+               yield parse_publish(flags, body)
+      except asyncio.IncompleteReadError:
+         return
+
+   async def close(self):
+      if self._pinger is not None:
+         self._pinger.cancel()
+         self._pinger = None
+      if self._writer is not None:
+         self._writer.write(packet(DISCONNECT))
+         self._writer.close()
+         self._writer = None
@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+# _433_mrx.py
+
+'''
+A multi-protocol receiver:  one pigpio callback on one GPIO decodes
+the Acurite, RasPi, and Maverick protocols (any or all of them) at
+once, and reports each packet tagged with its protocol.
+
+Rather than one rx object per protocol, each measuring every edge and
+classifying it with its own tests, the edge length is computed once
+and classified once, for all the decoders together:  the edge-length
+bands of all the protocols are merged, when the receiver is made,
+into one sorted list of boundaries, and each interval between two
+boundaries is mapped to the tuple of symbols it means to each decoder
+(Acurite SYNC_GAP, PULSE, SHORT, ...;  pulse-width SHORT, LONG, END).
+One bisect of the edge length then classifies the edge for every
+protocol, and the decoders step their state machines on symbols.
+
+A decoder that is idle is handed only the symbols that can start a
+packet (an Acurite pulse, the end gap of a pulse-width protocol),
+so each protocol added costs an idle receiver little more than a
+tuple lookup per edge.
+
+The Acurite decoder is _433_AR's recognition machine, with the bands
+of its Timing_Table.  The pulse-width decoders use fixed bands around
+the short and long edge lengths of the emulators' tx settings
+(_433_proto.TX), with _433_pwm's default slack, rather than taking
+them from each packet's first bit as _433_pwm.rx does.
+
+  Use:
+     import _433_mrx
+     def cb(name, code, bits):
+        print(name, hex(code), bits)
+     r = _433_mrx.rx(pi, 22, cb)                 # or protocols=("AR", "Mav")
+     ...
+     print(r.stats())
+     r.cancel()
+'''
+
+import time
+import bisect
+import pigpio
+
+import _433_proto
+
+NEVER = 0xffffffff            # longer than any edge
+
+class ar():
+   """
+   The Acurite decoder:  _433_AR's recognition machine, stepped on
+   symbols.  While it is idle, a pulse is held until its interval
+   arrives, and the pair is passed on only if the interval is a
+   SYNC_GAP, as by _433_AR.rx's prefilter.
+   """
+   def __init__(self, callback, pi, gpio):
+      _433 = self._433 = _433_proto.module("AR")
+      self.m = _433.mach(callback=callback)
+      self.pi = pi
+      self.gpio = gpio
+      self.busy = False
+      self.armed = False         # watchdog set
+      self._held = None          # idle: pulse length held
+      self._PULSE = _433.PULSE
+      self._SYNC_GAP = _433.SYNC_GAP
+
+   def bands(self, level):
+      """
+      Returns the (symbol, low, high) bands of edges ending at
+      "level", first match first, as _433_AR.rx classifies them.
+      """
+      _433 = self._433
+      gap = [ (_433.GAP, 11001, NEVER) ]
+      if level == _433.TRAILING:
+         return gap + [ (_433.PULSE, 0, 11000) ]
+      tol = _433.TOLERANCE
+      return gap + [ (e[0], int(e[2]*(1.0-tol/100.)), int(e[2]*(1.0+tol/100.))) for e in _433.Timing_Table ]
+
+   def wakes(self, s):
+      return s == self._PULSE or s == self._SYNC_GAP
+
+   def step(self, s, edge_len):
+      m = self.m
+      if not self.busy:
+         if s == self._PULSE:
+            self._held = edge_len
+            return
+         held = self._held
+         self._held = None
+         if held is None or s != self._SYNC_GAP:
+            return
+         m._next(self._PULSE, held)
+      m._next(s, edge_len)
+      if m.bit_count == self._433.MSGLEN and not self.armed:
+         # armed once for a transmission, as by _433_AR.rx
+         self.pi.set_watchdog(self.gpio, 11)
+         self.armed = True
+      self.busy = not (m.need_pulse and m.sync_count == 0 and m.state == self._433.SYNC_WAIT)
+
+class pwm():
+   """
+   A pulse-width decoder (see _433_pwm.py) on fixed bands.
+   """
+   SHORT = 0
+   LONG  = 1
+   END   = 2
+
+   def __init__(self, callback, t0, t1, invert=False, end_gap=2750,
+                slack0=0.3, slack1=0.2, min_bits=8, max_bits=80):
+      self.cb = callback
+      ts, tl = min(t0, t1), max(t0, t1)
+      s0 = int(ts*slack0)
+      s1 = int(tl*slack1)
+      self._bands = [ (self.SHORT, ts - s0 + 1, ts + s0 - 1),
+                      (self.LONG , tl - s1 + 1, tl + s1 - 1),
+                      (self.END  , end_gap + 1, NEVER) ]
+      self._bit01 = 0 if invert else 1     # bit for long short
+      self._bit10 = 1 - self._bit01        # bit for short long
+      self.min_bits = min_bits
+      self.max_bits = max_bits
+      self.busy = False
+      self._e0 = None
+      self._code = 0
+      self._bits = 0
+
+   def bands(self, level):
+      return self._bands
+
+   def wakes(self, s):
+      return s == self.END
+
+   def step(self, s, edge_len):
+      if s == self.END:
+         n = self._bits
+         if self.busy and self.min_bits <= n <= self.max_bits:
+            self.cb(self._code, n)
+         self.busy = True
+         self._e0 = None
+         self._code = 0
+         self._bits = 0
+         return
+      if s is None:                       # in no band:  abort, as _433_pwm.rx does
+         self.busy = False
+         return
+      e0 = self._e0
+      if e0 is None:                      # first edge of the pair
+         self._e0 = s
+         return
+      self._e0 = None
+      if e0 == self.SHORT and s == self.LONG:
+         bit = self._bit10
+      elif e0 == self.LONG and s == self.SHORT:
+         bit = self._bit01
+      else:
+         self.busy = False
+         return
+      if self._bits >= self.max_bits:
+         self.busy = False                # too long
+         return
+      self._code = self._code << 1 | bit
+      self._bits += 1
+
+class rx():
+   def __init__(self, pi, gpio, callback=None, protocols=("AR", "RPi", "Mav"),
+                glitch=150, capture=None):
+      """
+      Decodes the "protocols" (names from _433_proto) received on
+      "gpio".  The callback is passed the protocol name, the code,
+      and the number of bits of each packet decoded.
+
+      "glitch" and "capture" are as for the protocols' rx classes.
+      """
+      self.pi = pi
+      self.gpio = gpio
+      self.cb = callback
+      self.glitch = glitch
+      self._cap = None if capture is None else capture.put
+      self.edges = 0
+      self.busy_ns = 0
+      self.packets = dict()      # protocol --> packets decoded
+
+      self._decs = []
+      self._ar = []              # Acurite decoders, which use the watchdog
+      for name in protocols:
+         self.packets[name] = 0
+         cb = self._callback(name)
+         if name == "AR":
+            d = ar(cb, pi, gpio)
+            self._ar.append(d)
+         else:
+            tx = _433_proto.TX[name]
+            kw = dict(_433_proto.RX.get(name, {}))
+            if name == "Mav":
+               kw["invert"] = True
+            d = pwm(cb, tx["t0"], tx["t1"], **kw)
+         self._decs.append(d)
+
+      # the shared classification:  for each level, the boundaries of
+      #   all the decoders' bands, and for each interval between them,
+      #   the (decoder, symbol, wakes) of every decoder
+      self._bounds = []
+      self._route = []
+      for level in (0, 1):
+         bands = [ d.bands(level) for d in self._decs ]
+         bounds = sorted({ b for bl in bands for s, lo, hi in bl for b in (lo, hi + 1) })
+         route = []
+         for lo in [0] + bounds:
+            r = []
+            for d, bl in zip(self._decs, bands):
+               s = next((s for s, blo, bhi in bl if blo <= lo <= bhi), None)
+               r.append((d, s, d.wakes(s)))
+            route.append(tuple(r))
+         self._bounds.append(bounds)
+         self._route.append(route)
+
+      pi.set_mode(gpio, pigpio.INPUT)
+      pi.set_glitch_filter(gpio, glitch)
+      self._last_edge_tick = pi.get_current_tick()
+      self._cb = pi.callback(gpio, pigpio.EITHER_EDGE, self._cbf)
+
+   def _callback(self, name):
+      counts = self.packets
+      def cb(code, bits):
+         counts[name] += 1
+         if self.cb is not None:
+            self.cb(name, code, bits)
+      return cb
+
+   def _cbf(self, g, l, t):
+      t0 = time.perf_counter_ns()
+      if self._cap is not None:
+         self._cap(g, l, t)
+      edge_len = (t - self._last_edge_tick) & 0xffffffff
+      self._last_edge_tick = t
+
+      if l == 2:                 # watchdog timeout: the end of an Acurite packet
+         for d in self._ar:
+            if d.armed:
+               d.step(d._433.GAP, edge_len)
+               self.pi.set_watchdog(self.gpio, 0)
+               d.armed = False
+      else:
+         for d, s, wakes in self._route[l][bisect.bisect_right(self._bounds[l], edge_len)]:
+            if wakes or d.busy:
+               d.step(s, edge_len)
+         self.edges += 1
+      self.busy_ns += time.perf_counter_ns() - t0
+
+   def stats(self):
+      """
+      Returns the counts of edges and of packets decoded by each
+      protocol, and the time spent decoding.
+      """
+      return { 'edges'      : self.edges,
+               'packets'    : dict(self.packets),
+               'busy_ms'    : self.busy_ns//1000000,
+               'us_per_edge': round(self.busy_ns/1000.0/self.edges, 2) if self.edges else None }
+
+   def cancel(self):
+      """
+      Cancels the receiver.
+      """
+      if self._cb is not None:
+         if any(d.armed for d in self._ar):
+            self.pi.set_watchdog(self.gpio, 0)
+         self.pi.set_glitch_filter(self.gpio, 0)
+         self._cb.cancel()
+         self._cb = None
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+# _433_multi.py
+
+'''
+Parallel transmission on several pins:  the packets of several
+emulated devices, each with its own transmitter on its own GPIO, sent
+at the same time as one combined pigpio waveform.
+
+A pigpio pulse switches a bitmask of GPIOs, but each tx class only
+ever switches its own pin, one wave chain at a time.  Here each
+device's chain (as its tx would send it) is expanded into the pulses
+it would put on the air, the devices' pulse timelines are merged by
+time into one list of pulses switching all the pins, and that is sent
+as a single wave.  The transmitters then key together, from one chain
+and one process, instead of taking turns.
+
+Each device may be given a start offset, in us, to stagger the
+transmissions (e.g. so that receivers sharing one antenna don't
+collide).  A combined wave must fit pigpio's limits (the pulses of
+wave_get_max_pulses(), and DMA control blocks); packets that don't
+should be sent in smaller groups.
+
+  Use:
+     import _433_multi
+     ar  = _433_AR.tx(pi, gpio=16)
+     mav = _433_Mav.tx(pi, gpio=20)
+     m = _433_multi.tx(pi)
+     m.send([(ar, msg1), (mav, msg2, 5000)])   # (tx, code[, offset us])
+'''
+
+import time
+import pigpio
+
+import _433_virt
+
+#  Pulses given to pigpio per wave_add_generic() call
+CHUNK = 1000
+
+def create(pi, wf):
+   """
+   Creates a wave of the pulses "wf", handing them to pigpio in
+   chunks, and returns its wave ID.
+   """
+   #  pigpio merges the pulses of each wave_add_generic() call into
+   #    the wave from its start, so each chunk after the first begins
+   #    with a delay to where it belongs
+   pi.wave_add_new()
+   t = 0
+   for i in range(0, len(wf), CHUNK):
+      chunk = wf[i:i+CHUNK]
+      if i:
+         chunk = [pigpio.pulse(0, 0, t)] + chunk
+      pi.wave_add_generic(chunk)
+      t += sum(p.delay for p in wf[i:i+CHUNK])
+   return pi.wave_create()
+
+class tx():
+   def __init__(self, pi):
+      """
+      Instantiate with the Pi that the transmitters are on.
+      """
+      self.pi = pi
+
+   def pulses(self, items):
+      """
+      Returns the combined list of pigpio pulses for "items", a list
+      of (tx, code) or (tx, code, offset) tuples, one per device.
+      """
+      timelines = []
+      used = 0
+      for item in items:
+         t, code = item[0], item[1]
+         offset = item[2] if len(item) > 2 else 0
+         if used & (1<<t.gpio):
+            raise ValueError("two devices on GPIO {}".format(t.gpio))
+         used |= 1<<t.gpio
+         timelines.append((offset, _433_virt.expand(t._chain(code), t._pulses)))
+      return [pigpio.pulse(on, off, us) for on, off, us in _433_virt.merge(timelines)]
+
+   def send(self, items):
+      """
+      Transmits the packets of "items" (see pulses()) together, and
+      waits for the transmission to end.
+      """
+      wf = self.pulses(items)
+      if len(wf) > self.pi.wave_get_max_pulses():
+         raise ValueError("{} pulses are too many for one wave; send fewer devices".format(len(wf)))
+
+      wid = create(self.pi, wf)
+
+      #  Sent packets are logged by the caller (see Common/_433_sink.py)
+      self.pi.wave_send_once(wid)
+      while self.pi.wave_tx_busy():
+         time.sleep(0.1)
+      self.pi.wave_delete(wid)
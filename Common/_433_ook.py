@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+# _433_ook.py
+
+'''
+Streaming reader for rtl_433 pulse-data files (".ook", as written by
+"rtl_433 -W file.ook" or converted from .cu8 recordings and analyzed
+at triq.org), turning them into edge streams for our receivers.
+
+A pulse-data file holds one or more packets, each a header of
+";"-comment lines (";ook 88 pulses", ";timescale 1us", ...) followed
+by lines of "pulse gap" lengths, and closed by ";end":
+   ;pulse data
+   ;version 1
+   ;timescale 1us
+   ;ook 88 pulses
+   504 476
+   ...
+   ;end
+
+The file is read line by line by generators, so files of any size can
+be replayed in constant memory.  Edges come out as (level, tick)
+pairs, where the tick is in microseconds from the start of the file;
+these can be fed to any of the rx classes (_433_AR.rx, _433_RPi.rx,
+_433_Mav.rx) running on the virtual Pi of _433_virt.py.
+
+  Use:
+     import _433_ook, _433_virt
+     vpi = _433_virt.pi()
+     rx = _433_AR.rx(vpi, gpio=22, valid_pkt_callback=cb)
+     vpi.play(22, _433_ook.edges("g001_433.92M_250k.ook", invert=True))
+
+Receivers that report a pulse as a low level (such as the Acurite
+receiver with TRAILING = 1) need "invert=True".
+'''
+
+#  Idle time inserted between the packets of a file, in us, so that
+#    each packet's end gap is seen even if the file records none
+PKT_GAP = 100000
+
+def pulses(path):
+   """
+   Generates (pulse, gap) lengths, in us, from a pulse-data file; a
+   (None, None) marks the end of each packet.
+   """
+   scale = 1.0
+   inpkt = False
+   with open(path, "r") as f:
+      for line in f:
+         line = line.strip()
+         if not line:
+            continue
+         if line[0] == ";":
+            w = line[1:].split()
+            if not w:
+               continue
+            if w[0] == "timescale" and len(w) > 1 and w[1].endswith("us"):
+               scale = float(w[1][:-2] or 1)
+            elif w[0] in ("ook", "fsk"):
+               if inpkt:
+                  yield None, None
+               inpkt = True
+            elif w[0] == "end":
+               if inpkt:
+                  yield None, None
+               inpkt = False
+            continue
+         w = line.split()
+         try:
+            p = int(round(float(w[0])*scale))
+            g = int(round(float(w[1])*scale)) if len(w) > 1 else 0
+         except ValueError:
+            continue
+         inpkt = True
+         yield p, g
+   if inpkt:
+      yield None, None
+
+def edges(path, invert=False, tick=0, pkt_gap=PKT_GAP):
+   """
+   Generates (level, tick) edges from a pulse-data file, starting at
+   "tick".  A pulse is level 1 (or 0 if "invert"), a gap the other.
+   """
+   on = 0 if invert else 1
+   off = 1 - on
+   for p, g in pulses(path):
+      if p is None:
+         tick += pkt_gap
+         continue
+      yield on, tick
+      tick += p
+      yield off, tick
+      tick += g
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+# _433_proto.py
+
+'''
+Registry of the device protocols emulated in this distribution, for
+the tools that need to drive more than one of them.
+
+For each protocol it records the directory and module of its _433
+library, the rtl_433 model name of its packets, and the transmitter
+settings the emulator program uses (kept here in step with the
+constants at the beginning of AR609.py, RasPi.py, and Mav.py), and
+the receiver settings they change from the rx classes' defaults.
+
+  Use:
+     import _433_proto
+     _433 = _433_proto.module("AR")            # imports Acurite/_433_AR.py
+     tx = _433.tx(pi, gpio=16, **_433_proto.TX["AR"])
+     name = _433_proto.by_model("RasPi")       # --> "RPi"
+'''
+
+import sys
+import os
+import importlib
+
+TOP = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+#  name:  (directory, module, rtl_433 model)
+PROTOCOLS = {
+   "AR" : ("Acurite", "_433_AR" , "Acurite-609TXC"),
+   "RPi": ("RasPi"  , "_433_RPi", "RasPi"),
+   "Mav": ("Mav"    , "_433_Mav", "Maverick-ET73")
+   }
+
+#  tx settings used by the emulator programs, for each protocol
+TX = {
+   "AR" : dict(repeats=5, pulse=505, sync=8940, gap=10200, t0=1006, t1=2000),
+   "RPi": dict(bits=80, repeats=3, gap=1500, t0=500, t1=1000),
+   "Mav": dict(bits=48, repeats=4, gap=3980, t0=1925, t1=1040)
+   }
+
+#  rx settings used by the emulator programs, where not the default
+RX = {
+   "RPi": dict(end_gap=1300)
+   }
+
+def module(name):
+   """
+   Imports and returns the _433 library module of protocol "name".
+   """
+   d, m, model = PROTOCOLS[name]
+   path = os.path.join(TOP, d)
+   if path not in sys.path:
+      sys.path.insert(0, path)
+   return importlib.import_module(m)
+
+def model(name):
+   return PROTOCOLS[name][2]
+
+def by_model(model):
+   """
+   Returns the protocol name for an rtl_433 model name, or None.
+   """
+   for name, p in PROTOCOLS.items():
+      if p[2] == model:
+         return name
+   return None
@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+# _433_pwm.py
+
+'''
+The pulse-width decoder shared by the RasPi (_433_RPi.py) and
+Maverick (_433_Mav.py) receivers, both descended from joan's pigpio
+433MHz fob decoder.
+
+Each bit is a pair of edges, one short and one long.  The first pair
+of a packet is taken as the template for the rest:  its shorter edge
+gives the short length and its longer the long length, each with a
+band of +/- "slack" around it.  Every later pair must be one short
+and one long edge, in either order; which order is a 0 is set by
+"invert":
+
+   invert=False:  short long = 0, long short = 1   (RasPi)
+   invert=True:   short long = 1, long short = 0   (Maverick)
+
+A packet ends at an edge longer than "end_gap" us, which must lie
+between the longest data edge and the gap between packets.
+
+The bounds are computed once, as integers, from the template pair,
+so each bit costs just two integer range tests.  Bits are set in a
+bytearray as they arrive, so codes may be of any length;  the
+callback is given the code as an integer, as before.
+
+  Use:
+     class rx(_433_pwm.rx):
+        ...
+     r = rx(pi, gpio, callback=cb, invert=True, end_gap=2750)
+'''
+
+import pigpio
+
+import _433_log
+from _433_log import TRACE, DEBUG
+
+class rx():
+   """
+   A class to read the wireless codes transmitted by 433 MHz
+   wireless fobs.
+   """
+   def __init__(self, pi, gpio, callback=None, min_bits=8, max_bits=80,
+                      glitch=150, capture=None, invert=False, end_gap=2750,
+                      slack0=0.3, slack1=0.2, log=_433_log.off):
+      """
+      Instantiate with the Pi and the GPIO connected to the wireless
+      receiver.
+
+      If specified the callback will be called whenever a new code
+      is received.  The callback will be passed the code, the number
+      of bits, the length (in us) of the gap, short pulse, and long
+      pulse.
+
+      Codes with bit lengths outside the range min_bits to max_bits
+      will be ignored.
+
+      A glitch filter will be used to remove edges shorter than
+      glitch us long from the wireless stream.  This is intended
+      to remove the bulk of radio noise.
+
+      If capture is given (a recorder from Common/_433_cap.py), every
+      raw edge seen is recorded to it for later analysis and replay.
+
+      "invert" sets the bit sense (see above), "end_gap" the edge
+      length (us) that ends a packet, and "slack0" and "slack1" the
+      tolerance of short and long edges, as fractions of their length.
+
+      Debug messages, and with level TRACE every edge, go to "log"
+      (see _433_log.py).
+      """
+      self.pi = pi
+      self.gpio = gpio
+      self.cb = callback
+      self.min_bits = min_bits
+      self.max_bits = max_bits
+      self.glitch = glitch
+      self.invert = invert
+      self.end_gap = end_gap
+      self.log = log
+      self._cap = None if capture is None else capture.put
+
+      # slack in thousandths, so the bounds are integer arithmetic
+      self._slack0 = int(1000*slack0)
+      self._slack1 = int(1000*slack1)
+      self._bit01 = 0 if invert else 1     # bit for long short
+      self._bit10 = 1 - self._bit01        # bit for short long
+
+      self._in_code = False
+      self._edge = 0
+      self._bits = 0
+      self._buf = bytearray((max_bits + 7)//8)
+      self._gap = 0
+      self._e0 = 0
+      self._ts = 0               # sums of the short and long edges
+      self._tl = 0
+
+      self._ready = False
+
+      pi.set_mode(gpio, pigpio.INPUT)
+      pi.set_glitch_filter(gpio, glitch)
+
+      self._last_edge_tick = pi.get_current_tick()
+      self._cb = pi.callback(gpio, pigpio.EITHER_EDGE, self._cbf)
+
+   def _calibrate(self, e0, e1):
+      """
+      The first pair of pulses is used as the template for
+      subsequent pulses.  They should be one short, one long, not
+      necessarily in that order.  The ratio between long and short
+      should really be 2 or more.  If less than 1.5 the pulses are
+      assumed to be noise.
+      """
+      if e0 < e1:
+         t0, t1 = e0, e1
+      else:
+         t0, t1 = e1, e0
+
+      if 2*t1 < 3*t0:
+         self._in_code = False
+         return
+
+      slack0 = t0*self._slack0//1000
+      slack1 = t1*self._slack1//1000
+      self._min_0 = t0 - slack0
+      self._max_0 = t0 + slack0
+      self._min_1 = t1 - slack1
+      self._max_1 = t1 + slack1
+
+   def _end(self):
+      """
+      Reports the code just ended, if its length is in range.
+      """
+      n = self._bits
+      if self.min_bits <= n <= self.max_bits:
+         nb = (n + 7)//8
+         self._lbits = n
+         self._lcode = int.from_bytes(self._buf[:nb], 'big') >> (8*nb - n)
+         self._lgap = self._gap
+         self._lt0 = self._ts//n
+         self._lt1 = self._tl//n
+         self._ready = True
+         if self.cb is not None:
+            self.cb(self._lcode, self._lbits,
+                    self._lgap, self._lt0, self._lt1)
+      elif n and self.log.debug:
+         self.log.emit(DEBUG, "code of {} bits ignored", n)
+
+   def _cbf(self, g, l, t):
+      """
+      Accumulates the code from pairs of short/long pulses.
+      The code end is assumed when an edge longer than "end_gap"
+      us is detected.
+      """
+      if self._cap is not None:
+         self._cap(g, l, t)
+      edge_len = (t - self._last_edge_tick) & 0xffffffff
+      self._last_edge_tick = t
+      if self.log.trace:
+         self.log.emit(TRACE, "edge {} level {} in_code {} bits {}",
+                       edge_len, l, self._in_code, self._bits)
+
+      if edge_len > self.end_gap:
+
+         if self._in_code:
+            self._end()
+
+         self._in_code = True
+         self._gap = edge_len
+         self._edge = 0
+         self._bits = 0
+         self._ts = self._tl = 0
+         self._buf[:] = bytes(len(self._buf))
+
+      elif self._in_code:
+
+         e = self._edge
+         self._edge = e + 1
+
+         if not e & 1: # Even edge.
+            self._e0 = edge_len
+            return
+
+         e0 = self._e0
+         if e == 1:
+            self._calibrate(e0, edge_len)
+            if not self._in_code:
+               return
+
+         if ( (self._min_0 < e0 < self._max_0) and
+              (self._min_1 < edge_len < self._max_1) ):
+            bit = self._bit10
+            self._ts += e0
+            self._tl += edge_len
+         elif ( (self._min_0 < edge_len < self._max_0) and
+                (self._min_1 < e0 < self._max_1) ):
+            bit = self._bit01
+            self._ts += edge_len
+            self._tl += e0
+         else:
+            self._in_code = False
+            return
+
+         n = self._bits
+         if n >= self.max_bits:
+            self._in_code = False  # too long
+            return
+         if bit:
+            self._buf[n >> 3] |= 0x80 >> (n & 7)
+         self._bits = n + 1
+
+   def ready(self):
+      """
+      Returns True if a new code is ready.
+      """
+      return self._ready
+
+   def code(self):
+      """
+      Returns the last received code.
+      """
+      self._ready = False
+      return self._lcode
+
+   def details(self):
+      """
+      Returns details of the last receieved code.  The details
+      consist of the code, the number of bits, the length (in us)
+      of the gap, short pulse, and long pulse.
+      """
+      self._ready = False
+      return self._lcode, self._lbits, self._lgap, self._lt0, self._lt1
+
+   def cancel(self):
+      """
+      Cancels the wireless code receiver.
+      """
+      if self._cb is not None:
+         self.pi.set_glitch_filter(self.gpio, 0) # Remove glitch filter.
+         self._cb.cancel()
+         self._cb = None
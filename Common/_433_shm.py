@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+# _433_shm.py
+
+'''
+Shared-memory publishing of decoded packets, so that any number of
+local processes (dashboards, loggers, correlators) can follow the
+packets a receiver decodes, each at its own pace, without editing the
+receiver or running another one.
+
+The receiver publishes each packet into a ring of fixed-size records
+in a memory-mapped file, normally on /dev/shm (a RAM file system).
+Publishing is a few struct.pack_into() calls into the mapping, done
+right in the pigpio callback:  no locks, no system calls, and nothing
+that can wait on a consumer.  Consumers map the same file read-only
+and read the records in place;  each keeps its own position, so they
+do not see or slow each other, and none of them can slow the
+receiver.  A consumer that falls more than a ring's length behind
+loses the records overwritten, and counts them.
+
+Each record is 64 bytes, little-endian:
+   seq    uint64   sequence number of the packet, from 1;  0 while
+                   the record is being written
+   time   float64  time.time() when the packet was published
+   gpio   uint8
+   dir    uint8    0 for "rx", 1 for "tx"
+   bits   uint16   number of bits in the packet
+   nbytes uint16   number of bytes of data used
+   pad    uint16
+   model  16s      rtl_433 model name, NUL-padded
+   data   24s      the packet, big-endian, NUL-padded
+after a 64-byte header:
+   magic  8 bytes  b"433SHM\\x00\\x01"
+   size   uint32   record size (64)
+   slots  uint32   number of records in the ring
+   head   uint64   sequence number of the last packet published
+   start  float64  time.time() when the ring was made
+   pid    uint32   process ID of the publisher
+
+The publisher writes a record's seq as 0, then its fields, then its
+seq, and last the header's head.  A consumer reads the record and
+then its seq again:  if either seq is not the one it expected, the
+publisher has lapped it and the record is counted as lost.
+
+A publisher that restarts makes a new file in place of the old one;
+consumers notice and follow the new one.
+
+  Use:
+     import _433_shm
+     shm = _433_shm.publisher("/dev/shm/AR609.433")
+     def cb(code, bits):
+        shm.packet("rx", "Acurite-609TXC", code, bits)
+     ...
+     shm.close()
+
+     sub = _433_shm.subscriber("/dev/shm/AR609.433")
+     for seq, t, gpio, dir, model, bits, data in sub.packets():
+        print(model, data.hex(), bits)
+'''
+
+import os
+import mmap
+import time
+import struct
+
+MAGIC = b"433SHM\x00\x01"
+HDR   = struct.Struct("<8sIIQdI")
+REC   = struct.Struct("<QdBBHHH16s24s")
+SEQ   = struct.Struct("<Q")
+HDRSIZE = 64
+HEAD  = 16                    # offset of head in the header
+DATA  = 24                    # greatest packet, bytes
+DIRS  = ("rx", "tx")
+
+#  Polling interval of a consumer waiting for packets, sec
+POLL = 0.05
+
+class publisher():
+   def __init__(self, path, slots=4096):
+      """
+      Publishes packets into a ring of "slots" records in file "path"
+      (e.g. "/dev/shm/AR609.433"), made anew.
+      """
+      self.path = path
+      self.slots = slots
+      self.count = 0             # packets published
+      size = HDRSIZE + slots*REC.size
+      # made under another name and renamed, so consumers of an old
+      #   ring never see it shrink under them
+      tmp = "{}.{}.tmp".format(path, os.getpid())
+      self._f = open(tmp, "w+b")
+      self._f.truncate(size)
+      self._mm = mmap.mmap(self._f.fileno(), size)
+      HDR.pack_into(self._mm, 0, MAGIC, REC.size, slots, 0, time.time(), os.getpid())
+      os.replace(tmp, path)
+      self._pack = REC.pack_into
+      self._seq = SEQ.pack_into
+
+   def packet(self, dir, model, code, bits=None, gpio=0, **extra):
+      """
+      Publishes one packet, "tx" or "rx" per "dir", of the given
+      model;  "code" is an int of "bits" bits, or bytes.  Same
+      arguments as _433_sink.sink.packet(), but other keyword
+      arguments are ignored.  Packets longer than 24 bytes are cut.
+      """
+      if isinstance(code, int):
+         data = code.to_bytes((bits+7)//8, 'big')
+      else:
+         data = bytes(code)
+         if bits is None:
+            bits = 8*len(data)
+      n = self.count + 1
+      o = HDRSIZE + (n - 1) % self.slots * REC.size
+      mm = self._mm
+      self._seq(mm, o, 0)
+      self._pack(mm, o, 0, time.time(), gpio, dir == "tx", bits,
+                 min(len(data), DATA), 0, model.encode()[:16], data[:DATA])
+      self._seq(mm, o, n)
+      self._seq(mm, HEAD, n)
+      self.count = n
+
+   def close(self):
+      """
+      Closes the ring;  the file is left for consumers still reading
+      it (it is made anew when the publisher restarts).
+      """
+      if self._mm is not None:
+         self._mm.close()
+         self._f.close()
+         self._mm = None
+
+class subscriber():
+   def __init__(self, path, old=False):
+      """
+      Follows the packets published in file "path":  from the next
+      one published, or with "old" from the oldest still in the ring.
+      Waits for the file to be made.
+      """
+      self.path = path
+      self.lost = 0              # records overwritten before they were read
+      self.count = 0             # packets read
+      self._mm = None
+      self._open(old)
+
+   def _open(self, old):
+      while True:
+         try:
+            with open(self.path, "rb") as f:
+               magic, size, slots, head, start, pid = HDR.unpack(f.read(HDR.size))
+               if magic != MAGIC:
+                  raise ValueError("{} is not a packet ring".format(self.path))
+               if size != REC.size:
+                  raise ValueError("{}: records of {} bytes, not {}".format(self.path, size, REC.size))
+               self._ino = os.fstat(f.fileno()).st_ino
+               mm = mmap.mmap(f.fileno(), HDRSIZE + slots*size, access=mmap.ACCESS_READ)
+            break
+         except FileNotFoundError:
+            time.sleep(POLL)
+      if self._mm is not None:
+         self._mm.close()
+      self._mm = mm
+      self.slots = slots
+      self.start = start
+      self.pid = pid
+      head = SEQ.unpack_from(mm, HEAD)[0]
+      self._next = max(1, head - slots + 1) if old else head + 1
+
+   def _replaced(self):
+      try:
+         return os.stat(self.path).st_ino != self._ino
+      except FileNotFoundError:
+         return False
+
+   def poll(self):
+      """
+      Returns the packets published since the last call, as tuples
+      (seq, time, gpio, dir, model, bits, data).
+      """
+      mm = self._mm
+      head = SEQ.unpack_from(mm, HEAD)[0]
+      if head < self._next and self._replaced():
+         self._open(True)        # the publisher restarted: its ring is all new
+         mm = self._mm
+         head = SEQ.unpack_from(mm, HEAD)[0]
+      out = []
+      n = self._next
+      while n <= head:
+         if n <= head - self.slots:       # overwritten already
+            self.lost += head - self.slots + 1 - n
+            n = head - self.slots + 1
+         o = HDRSIZE + (n - 1) % self.slots * REC.size
+         seq, t, gpio, dir, bits, nbytes, pad, model, data = REC.unpack_from(mm, o)
+         if seq != n or SEQ.unpack_from(mm, o)[0] != n:
+            # overwritten while being read
+            self.lost += 1
+            n += 1
+            head = SEQ.unpack_from(mm, HEAD)[0]
+            continue
+         out.append((seq, t, gpio, DIRS[dir], model.rstrip(b"\0").decode(), bits, data[:nbytes]))
+         n += 1
+      self._next = n
+      self.count += len(out)
+      return out
+
+   def packets(self, wait=POLL):
+      """
+      Generates the packets as they are published, polling every
+      "wait" seconds while there are none.
+      """
+      while True:
+         got = self.poll()
+         if not got:
+            time.sleep(wait)
+         yield from got
+
+   def close(self):
+      if self._mm is not None:
+         self._mm.close()
+         self._mm = None
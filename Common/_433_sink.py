@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+# _433_sink.py
+
+'''
+This module provides a buffered, structured output sink for the
+433MHz emulators.  Every packet sent or received is written as one
+JSON object per line ("JSON lines"), using the field names that
+rtl_433 itself uses with "-F json", so that the emulator logs and
+the rtl_433 logs can be compared mechanically.
+
+The pigpio callback thread (and the transmit loop) only queue a
+small tuple; decoding the payload into fields, formatting, and file
+I/O are all done by a background writer thread, so printing never
+stalls packet decoding.
+
+  Use:
+     import _433_sink
+     log = _433_sink.sink("AR609.json")        # None writes to stdout
+     log.packet("tx", "Acurite-609TXC", msg)   # msg as a bytearray
+     log.packet("rx", "Acurite-609TXC", code, bits, pulseavg=505)
+     ...
+     log.close()                               # drain & close at exit
+
+A record looks like the rtl_433 output for the same device, plus
+a few fields of our own:
+  "dir"   "tx" for sent packets, "rx" for packets we decoded
+  "bits"  number of bits in the packet
+  "data"  the packet as a hex string (rtl_433 "-F json" with
+          flex decoders uses the same name)
+Any keyword arguments given to packet() are added as-is.
+'''
+
+import sys
+import time
+import json
+import queue
+import threading
+
+#  rtl_433 "time" field format (local time, "-M time:usec")
+TIMEFMT = "%Y-%m-%d %H:%M:%S"
+
+#  CRC-8 used by the RasPi packets (poly 0x97, init 0; see RasPi/libcrc8.py)
+def _crc8(b, n, poly=0x97):
+   rem = 0
+   for i in range(n):
+      rem ^= b[i]
+      for j in range(8):
+         rem = ((rem<<1) ^ poly) & 0xff if rem & 0x80 else (rem<<1) & 0xff
+   return rem
+
+#  Decoders from packet bytes to rtl_433 fields, one per device model.
+#  Each returns the model-specific fields, or just the model name if
+#    the packet is too short to decode.
+#  Fields are named and scaled as rtl_433 names and scales them.
+def acurite_609(b):
+   # ID ST TT HH CS: 4-bit status, 12-bit signed temp in 0.1C, checksum
+   v = {"model": "Acurite-609TXC"}
+   if len(b) < 5:
+      return v
+   t = ( (b[1]&0x0f)<<8 ) | b[2]
+   if t & 0x800:
+      t -= 0x1000
+   v["id"]            = b[0]
+   v["battery_ok"]    = 1 if b[1] & 0x40 else 0
+   v["temperature_C"] = t/10.0
+   v["humidity"]      = b[3]
+   v["status"]        = b[1]>>4
+   if ( (b[0] + b[1] + b[2] + b[3]) & 0xff ) == b[4]:
+      v["mic"] = "CHECKSUM"
+   return v
+
+def maverick_et73(b):
+   # II 11 12 22 xx xx: ID, two 12-bit signed temps in 0.1C
+   v = {"model": "Maverick-ET73"}
+   if len(b) < 4:
+      return v
+   t1 = ( b[1]<<4 ) | ( b[2]>>4 )
+   t2 = ( (b[2]&0x0f)<<8 ) | b[3]
+   if t1 & 0x800:
+      t1 -= 0x1000
+   if t2 & 0x800:
+      t2 -= 0x1000
+   v["id"]              = b[0]
+   v["temperature_1_C"] = t1/10.0
+   v["temperature_2_C"] = t2/10.0
+   return v
+
+def raspi(b):
+   # TI DD DD DD DD DD DD DD DD CC: type & ID nibbles, 8 data bytes, CRC-8
+   v = {"model": "RasPi"}
+   if len(b) < 10:
+      return v
+   v["id"]      = b[0]&0x0f
+   v["type"]    = b[0]>>4
+   v["payload"] = bytes(b[1:9]).hex()
+   if _crc8(b, 9) == b[9]:
+      v["mic"] = "CRC"
+   return v
+
+MODELS = {
+   "Acurite-609TXC": acurite_609,
+   "Maverick-ET73" : maverick_et73,
+   "RasPi"         : raspi
+   }
+
+#  Fields that identify a packet's payload for each model, used when
+#    matching our records against rtl_433's
+PAYLOAD_FIELDS = {
+   "Acurite-609TXC": ("id", "temperature_C", "humidity", "status"),
+   "Maverick-ET73" : ("id", "temperature_1_C", "temperature_2_C"),
+   "RasPi"         : ("id", "type", "payload")
+   }
+
+def record(t, dir, model, code, bits=None, extra=None):
+   """
+   Builds the rtl_433-style dictionary for one packet.  "code" may
+   be a bytes-like packet (bits defaults to 8 per byte) or an integer
+   code of "bits" bits, as delivered to the rx callbacks.
+   """
+   if isinstance(code, int):
+      b = code.to_bytes((bits+7)//8, 'big')
+   else:
+      b = bytes(code)
+      if bits is None:
+         bits = 8*len(b)
+   v = {"time": time.strftime(TIMEFMT, time.localtime(t)) +
+                ".{:06d}".format(int((t%1)*1000000))}
+   dec = MODELS.get(model)
+   v.update(dec(b) if dec is not None else {"model": model})
+   v["dir"]  = dir
+   v["bits"] = bits
+   v["data"] = b.hex()
+   if extra:
+      v.update(extra)
+   return v
+
+class writer():
+   """
+   A background thread that writes lines to a buffered file.  Items
+   are queued with put() and turned into text by "fmt" in the writer
+   thread.  The queue is bounded: if the writer falls behind by more
+   than "maxq" items, new items are dropped and counted rather than
+   blocking the caller.
+   """
+   def __init__(self, fmt, path=None, maxq=1024):
+      self.fmt = fmt
+      self.path = path
+      self.dropped = 0
+      self.written = 0
+      self._q = queue.Queue(maxq)
+      if path is None:
+         self._f = sys.stdout
+      else:
+         self._f = open(path, "a", buffering=65536)
+      self._t = threading.Thread(target=self._run, daemon=True)
+      self._t.start()
+
+   def put(self, item):
+      """
+      Queues an item for writing; never blocks.
+      """
+      try:
+         self._q.put_nowait(item)
+      except queue.Full:
+         self.dropped += 1
+
+   def _run(self):
+      q = self._q
+      f = self._f
+      while True:
+         item = q.get()
+         while True:
+            if item is None:
+               f.flush()
+               return
+            f.write(self.fmt(item))
+            f.write("\n")
+            self.written += 1
+            try:
+               item = q.get_nowait()
+            except queue.Empty:
+               break
+         # queue drained: push this batch out so the log can be tailed
+         f.flush()
+
+   def close(self):
+      """
+      Writes out everything queued so far and stops the writer thread.
+      """
+      if self._t is None:
+         return
+      self._q.put(None)
+      self._t.join()
+      self._t = None
+      if self.path is not None:
+         self._f.close()
+
+class sink(writer):
+   """
+   A writer of rtl_433-compatible JSON lines, one per packet.
+   """
+   def __init__(self, path=None, maxq=1024):
+      writer.__init__(self, self._fmt, path, maxq)
+
+   def _fmt(self, item):
+      return json.dumps(record(*item))
+
+   def packet(self, dir, model, code, bits=None, t=None, **extra):
+      """
+      Logs one packet, "tx" or "rx" per "dir", of the given model,
+      at time "t" (default now).  Only the arguments are queued here;
+      all formatting is done by the writer thread.
+      """
+      if not isinstance(code, int):
+         code = bytes(code)           # caller may reuse its buffer
+      self.put((time.time() if t is None else t, dir, model, code, bits, extra))
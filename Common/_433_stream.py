@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+# _433_stream.py
+
+'''
+Gapless streaming transmission:  packets sent back to back, each
+starting exactly one inter-packet gap (the gap at the end of the
+packet before it) after the previous one, for as long as packets keep
+coming.
+
+tx.send() builds a wave chain, hands it to pigpiod, and polls until
+the transmission ends, so the time between packets is the gap plus
+however long the polling and the next send() take.  Here each
+packet's chain (as its tx would send it, inter-packet gap included)
+is expanded into a single wave, and the waves are double-buffered:
+while one packet is on the air, the next one's wave is created and
+queued behind it with pigpio's WAVE_MODE_ONE_SHOT_SYNC, which starts
+it the moment the current wave ends.  pigpio's wave_tx_at() tells
+which wave is on the air, so a wave is deleted only once the one
+after it has started.  (pigpio reuses a deleted wave's resources for
+a new wave of the same size, which the packets of one tx are.)
+
+send() returns once the packet is queued, with the time, time.time(),
+that it is due to start;  it waits only while two packets are already
+queued.  A packet queued after the one before it has ended starts
+late, and is counted as an underrun.
+
+  Use:
+     import _433_stream
+     s = _433_stream.stream(_433_RPi.tx(pi, gpio=16, ...))
+     for msg in packets:
+        s.send(msg)
+     s.close()                    # waits for the last packet to end
+     print(s.stats())
+'''
+
+import time
+import pigpio
+
+import _433_virt
+import _433_multi
+
+#  Polling interval for the start of a queued wave, sec
+POLL = 0.001
+
+class stream():
+   def __init__(self, tx):
+      """
+      Streams packets from transmitter "tx" (a _433_AR, _433_RPi, or
+      _433_Mav tx object).
+      """
+      self.tx = tx
+      self.pi = tx.pi
+      self.sent = 0
+      self.underruns = 0
+      self._build_ns = 0
+      self._waves = []           # (wid, start, end) of the waves sent, oldest first
+
+   def wave(self, msg):
+      """
+      Creates the wave of packet "msg"; returns its wave ID and its
+      length in us.
+      """
+      tx = self.tx
+      pulses = _433_virt.expand(tx._chain(msg), tx._pulses)
+      wf = [pigpio.pulse(on, off, us) for on, off, us in _433_virt.merge([(0, pulses)])]
+      if len(wf) > self.pi.wave_get_max_pulses():
+         raise ValueError("{} pulses are too many for one wave".format(len(wf)))
+      return _433_multi.create(self.pi, wf), _433_virt.duration(wf)
+
+   def _wait_ended(self, wid, end):
+      # sleep to just before the wave is due to end, then watch for it
+      time.sleep(max(0.0, end - time.time() - 2*POLL))
+      while self.pi.wave_tx_at() == wid:
+         time.sleep(POLL)
+
+   def send(self, msg):
+      """
+      Queues packet "msg" to follow the packets already sent, and
+      returns the time it is due to start.
+      """
+      t0 = time.perf_counter_ns()
+      wid, us = self.wave(msg)   # while the packet before is on the air
+      self._build_ns += time.perf_counter_ns() - t0
+
+      if len(self._waves) == 2:
+         # no room until the oldest has ended, and the next has started
+         old, start, end = self._waves[0]
+         self._wait_ended(old, end)
+         self.pi.wave_delete(old)
+         self._waves.pop(0)
+
+      now = time.time()
+      if self._waves and self._waves[-1][2] > now:
+         start = self._waves[-1][2]
+      else:
+         if self._waves:
+            self.underruns += 1
+         start = now
+      self.pi.wave_send_using_mode(wid, pigpio.WAVE_MODE_ONE_SHOT_SYNC)
+      self._waves.append((wid, start, start + us/1000000.0))
+      self.sent += 1
+      return start
+
+   def stats(self):
+      return { 'sent'      : self.sent,
+               'underruns' : self.underruns,
+               'build_us'  : self._build_ns//1000//self.sent if self.sent else None }
+
+   def close(self):
+      """
+      Waits for the packets sent to end, and deletes their waves.
+      """
+      if self._waves:
+         time.sleep(max(0.0, self._waves[-1][2] - time.time()))
+         while self.pi.wave_tx_busy():
+            time.sleep(POLL)
+      for wid, start, end in self._waves:
+         self.pi.wave_delete(wid)
+      self._waves = []
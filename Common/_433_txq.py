@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+# _433_txq.py
+
+'''
+A background transmit queue:  packets are handed to a worker thread
+that owns the transmitter and its pigpio waves, so that whoever makes
+the packets (a sensor sampler, say) never waits out their airtime.
+
+enqueue() returns at once with a concurrent.futures.Future, which the
+worker resolves with the (start, end) times, time.time(), of the
+packet's transmission, repeats included.  The Future is resolved
+only once the packet is off the air, by when a receiver may well have
+decoded it, so enqueue() also takes a "started" function, which the
+worker calls with the start time just as the packet goes on the air:
+that is the place to log the send or record it for matching.
+
+The queue holds at most "maxq" packets:  when it is full, enqueue()
+waits up to "timeout" seconds for room (default:  not at all) and then
+raises queue.Full, so a producer that outruns the air is told so
+rather than piling packets up without limit.  depth() gives the number of packets
+waiting, and stats() the counts of packets queued, sent, and refused,
+with the greatest depth seen;  the counters are kept under a lock,
+so a stats() snapshot is consistent.
+
+Once a tx object is given to a queue, only the worker uses it:  it
+sends the packets (logging each one's chain at DEBUG to the tx's log,
+as tx.send() does) and, at close(), cancels the tx, deleting its waves.
+
+  Use:
+     import _433_txq
+     q = _433_txq.txq(_433_RPi.tx(pi, gpio=16, ...), maxq=8)
+     f = q.enqueue(msg, started=lambda t: log.packet("tx", MODEL, msg, t=t))
+     ...
+     start, end = f.result()            # or f.add_done_callback(...)
+     q.close()
+'''
+
+import time
+import queue
+import threading
+from concurrent.futures import Future
+
+import _433_virt
+import _433_log
+
+#  Polling interval for the end of a transmission, sec
+POLL = 0.001
+
+class txq():
+   def __init__(self, tx, maxq=16):
+      """
+      Sends the packets queued for transmitter "tx" (a _433_AR,
+      _433_RPi, or _433_Mav tx object), holding at most "maxq".
+      """
+      self.tx = tx
+      self.maxq = maxq
+      self.queued = 0
+      self.sent = 0
+      self.refused = 0
+      self.maxdepth = 0
+      self._lock = threading.Lock()    # for the counters
+      self._q = queue.Queue(maxq)
+      self._t = threading.Thread(target=self._run, name="txq", daemon=True)
+      self._t.start()
+
+   def enqueue(self, msg, timeout=0, started=None):
+      """
+      Queues packet "msg" for transmission and returns a Future for
+      its (start, end) times.  "started", if given, is called in the
+      worker thread with the start time as the packet goes on the air.
+      If the queue is full, waits up to "timeout" seconds (None: for
+      as long as it takes) for room, then raises queue.Full.
+      """
+      f = Future()
+      try:
+         if timeout == 0:
+            self._q.put_nowait((msg, f, started))
+         else:
+            self._q.put((msg, f, started), timeout=timeout)
+      except queue.Full:
+         with self._lock:
+            self.refused += 1
+         raise
+      with self._lock:
+         self.queued += 1
+         self.maxdepth = max(self.maxdepth, self._q.qsize())
+      return f
+
+   def depth(self):
+      """
+      Returns the number of packets waiting to be sent.
+      """
+      return self._q.qsize()
+
+   def stats(self):
+      with self._lock:
+         return { 'queued'  : self.queued,
+                  'sent'    : self.sent,
+                  'refused' : self.refused,
+                  'depth'   : self.depth(),
+                  'maxdepth': self.maxdepth }
+
+   def _send(self, msg, started):
+      tx = self.tx
+      pi = tx.pi
+      chain = tx._chain(msg)
+      if tx.log.debug:
+         tx.log.emit(_433_log.DEBUG, "tx {} chain {}", bytes(msg).hex(), chain)
+      airtime = _433_virt.duration(_433_virt.expand(chain, tx._pulses))/1000000.0
+      start = time.time()
+      if started is not None:
+         started(start)
+      pi.wave_chain(chain)
+      # sleep through the airtime, then watch closely for the end
+      time.sleep(max(0.0, start + airtime - time.time() - 2*POLL))
+      while pi.wave_tx_busy():
+         time.sleep(POLL)
+      return start, time.time()
+
+   def _run(self):
+      while True:
+         item = self._q.get()
+         if item is None:
+            break
+         msg, f, started = item
+         if not f.set_running_or_notify_cancel():
+            continue
+         try:
+            times = self._send(msg, started)
+            with self._lock:
+               self.sent += 1
+            f.set_result(times)
+         except Exception as e:
+            f.set_exception(e)
+      self.tx.cancel()
+
+   def close(self):
+      """
+      Sends the packets still queued, then stops the worker and
+      cancels the tx.
+      """
+      if self._t is not None:
+         self._q.put(None)
+         self._t.join()
+         self._t = None
@@ -0,0 +1,320 @@
+#!/usr/bin/env python3
+# _433_virt.py
+
+'''
+A virtual Pi:  a stand-in for a pigpio.pi() connection that lets the
+emulators' tx classes run without a Pi, a transmitter, or pigpiod.
+
+The tx classes build their waveforms and wave chains exactly as they
+do on a Pi; instead of going to the GPIO pins, each chain sent is
+expanded into the list of pulses it would have put on the air and
+recorded, in virtual time, in "sent".  Nothing waits for airtime:
+wave_tx_busy() is always False and the virtual clock simply advances
+by the length of each transmission.
+
+The rx classes work on it, too:  edges are fed in with play() (or
+edge()) and are delivered to the receivers' callbacks in virtual time,
+with the glitch filters and watchdogs the receivers set applied as
+pigpiod would apply them.  Edge ticks are plain microsecond counts
+(they are wrapped to 32 bits, as pigpio's are, only when delivered).
+
+  Use:
+     import _433_virt
+     vpi = _433_virt.pi()
+     tx = _433_AR.tx(vpi, gpio=16, joan=1.0)  # no calibration offline
+     tx.send(msg)
+     for level, usec in _433_virt.levels(vpi.sent[-1][1], 16):
+        ...
+
+     rx = _433_AR.rx(vpi, gpio=22, valid_pkt_callback=cb)
+     vpi.play(22, edges)                      # (level, tick) pairs
+
+Pulses are pigpio.pulse objects (or anything with gpio_on, gpio_off,
+and delay attributes).  As in pigpio, each wave_add_generic() merges its
+pulses, in time, into the wave being built and wave_create() turns it
+into a wave ID.
+Chains may use the loop (255 0 ... 255 1 x y) and delay (255 2 x y)
+commands; "loop forever" (255 3) is played once.
+'''
+
+# Same values as pigpio's
+OUTPUT  = 1
+TIMEOUT = 2                   # "level" reported when a watchdog expires
+NO_TX_WAVE = 9999             # wave_tx_at() when no wave is being sent
+TICKS   = 1<<32               # pigpio ticks are 32-bit microseconds
+MAX_PULSES = 12000            # most pulses in one wave
+
+#  Expands a wave chain into the list of pulses it transmits.
+#    "waves" maps wave IDs to their pulse lists; delays (255 2 x y)
+#    are returned as (0, 0, usec) tuples.
+def expand(chain, waves):
+   stack = [[]]
+   i = 0
+   n = len(chain)
+   while i < n:
+      c = chain[i]
+      if c != 255:
+         stack[-1].extend(waves[c])
+         i += 1
+         continue
+      cmd = chain[i+1]
+      if cmd == 0:                       # loop start
+         stack.append([])
+         i += 2
+      elif cmd == 1:                     # loop end, repeat x + 256*y times
+         body = stack.pop()
+         stack[-1].extend(body*(chain[i+2] + 256*chain[i+3]))
+         i += 4
+      elif cmd == 2:                     # delay x + 256*y us
+         stack[-1].append((0, 0, chain[i+2] + 256*chain[i+3]))
+         i += 4
+      else:                              # loop forever: play once
+         while len(stack) > 1:
+            body = stack.pop()
+            stack[-1].extend(body)
+         i += 2
+   while len(stack) > 1:                  # unterminated loop: play once
+      body = stack.pop()
+      stack[-1].extend(body)
+   return stack[0]
+
+def _fields(p):
+   if isinstance(p, tuple):
+      return p
+   return p.gpio_on, p.gpio_off, p.delay
+
+#  Converts a list of pulses into (level, usec) steps for one gpio,
+#    merging consecutive steps at the same level
+def levels(pulses, gpio, level=0):
+   bit = 1<<gpio
+   out = []
+   for p in pulses:
+      on, off, us = _fields(p)
+      if on & bit:
+         level = 1
+      elif off & bit:
+         level = 0
+      if out and out[-1][0] == level:
+         out[-1][1] += us
+      else:
+         out.append([level, us])
+   return [tuple(s) for s in out]
+
+#  Returns the total duration, in us, of a list of pulses
+def duration(pulses):
+   return sum(_fields(p)[2] for p in pulses)
+
+#  Merges several pulse lists, each starting "offset" us into the
+#    result, into one list of (gpio_on, gpio_off, usec) tuples, as
+#    pigpio merges the pulses of successive wave_add_generic() calls.
+#    "timelines" is a list of (offset, pulses).
+def merge(timelines):
+   events = dict()                        # tick --> [gpio_on, gpio_off]
+   end = 0
+   for offset, pulses in timelines:
+      t = offset
+      for p in pulses:
+         on, off, us = _fields(p)
+         if on or off:
+            e = events.get(t)
+            if e is None:
+               events[t] = [on, off]
+            else:
+               e[0] |= on
+               e[1] |= off
+         t += us
+      end = max(end, t)
+   ticks = sorted(events)
+   out = []
+   if not ticks or ticks[0] > 0:
+      out.append((0, 0, (ticks[0] if ticks else end)))
+   for i, t in enumerate(ticks):
+      nxt = ticks[i+1] if i+1 < len(ticks) else end
+      on, off = events[t]
+      out.append((on, off, nxt - t))
+   return out
+
+class _callback():
+   def __init__(self, pi, gpio, func):
+      self.pi = pi
+      self.gpio = gpio
+      self.func = func
+
+   def cancel(self):
+      cbs = self.pi._cbs.get(self.gpio, [])
+      if self in cbs:
+         cbs.remove(self)
+
+class _input():
+   """
+   Input state of one gpio:  callbacks, glitch filter, and watchdog.
+   """
+   def __init__(self):
+      self.level = None          # last level reported
+      self.glitch = 0
+      self.pending = None        # (level, tick) not yet steady for "glitch" us
+      self.wd = 0                # watchdog timeout, us; 0 if none
+      self.wd_due = None
+
+class pi():
+   def __init__(self, tick=0):
+      self.connected = True
+      self.tick = tick
+      self.sent = []            # (start tick, pulses) of each chain sent
+      self._new = []
+      self._waves = dict()
+      self._cbs = dict()        # gpio --> list of _callback
+      self._in = dict()         # gpio --> _input
+
+   def _input(self, gpio):
+      g = self._in.get(gpio)
+      if g is None:
+         g = self._in[gpio] = _input()
+      return g
+
+   def stop(self):
+      self.connected = False
+
+   def get_current_tick(self):
+      return self.tick % TICKS
+
+   def advance(self, usec):
+      """
+      Moves the virtual clock on by "usec" microseconds.
+      """
+      self.tick += int(usec)
+
+   def set_mode(self, gpio, mode):
+      return 0
+
+   def set_pull_up_down(self, gpio, pud):
+      return 0
+
+   def set_glitch_filter(self, gpio, steady):
+      self._input(gpio).glitch = steady
+      return 0
+
+   def set_watchdog(self, gpio, wdog_timeout):
+      g = self._input(gpio)
+      g.wd = 1000*wdog_timeout
+      g.wd_due = self.tick + g.wd if g.wd else None
+      return 0
+
+   def callback(self, gpio, edge=0, func=None):
+      cb = _callback(self, gpio, func)
+      self._cbs.setdefault(gpio, []).append(cb)
+      return cb
+
+   def _report(self, gpio, level, tick):
+      for cb in list(self._cbs.get(gpio, [])):
+         cb.func(gpio, level, tick % TICKS)
+
+   def run(self, tick):
+      """
+      Advances the virtual clock to "tick", reporting the glitch-filtered
+      edges that have become steady and any watchdogs that expire on
+      the way, in time order.
+      """
+      while True:
+         g = gp = None
+         due = tick
+         for gpio, i in self._in.items():
+            if i.pending is not None and i.pending[1] + i.glitch <= due:
+               g, gp, due, what = i, gpio, i.pending[1] + i.glitch, 0
+            if i.wd_due is not None and i.wd_due < due:
+               g, gp, due, what = i, gpio, i.wd_due, 1
+         if g is None:
+            break
+         self.tick = due
+         if what:                            # watchdog expired
+            g.wd_due = due + g.wd
+            self._report(gp, TIMEOUT, due)
+         else:                               # edge is steady: report it
+            level, t = g.pending
+            g.pending = None
+            g.level = level
+            if g.wd:
+               g.wd_due = t + g.wd
+            self._report(gp, level, t)
+      self.tick = max(self.tick, tick)
+
+   def edge(self, gpio, level, tick):
+      """
+      Feeds the receiver on "gpio" a change to "level" at time "tick".
+      """
+      self.run(tick)
+      g = self._input(gpio)
+      if g.pending is not None:
+         # previous change didn't last "glitch" us: pigpiod would ignore it
+         g.pending = None
+      if level != g.level:
+         g.pending = (level, tick)
+      if g.glitch == 0:
+         self.run(tick)
+
+   def play(self, gpio, edges, linger=100000):
+      """
+      Feeds a stream of (level, tick) edges to the receiver on "gpio",
+      then lets "linger" us pass so the last packet can be completed.
+      """
+      for level, tick in edges:
+         self.edge(gpio, level, tick)
+      self.run(self.tick + linger)
+
+   def wave_clear(self):
+      self._new = []
+      self._waves = dict()
+      return 0
+
+   def wave_add_new(self):
+      self._new = []
+      return 0
+
+   def wave_add_generic(self, pulses):
+      if self._new:
+         # as pigpio does, merge with the pulses already added
+         self._new = merge([(0, self._new), (0, pulses)])
+      else:
+         self._new = list(pulses)
+      return len(self._new)
+
+   def wave_get_max_pulses(self):
+      return MAX_PULSES
+
+   def wave_create(self):
+      wid = 0
+      while wid in self._waves:
+         wid += 1
+      self._waves[wid] = self._new
+      self._new = []
+      return wid
+
+   def wave_delete(self, wid):
+      self._waves.pop(wid, None)
+      return 0
+
+   def wave_get_micros(self):
+      return duration(self._new)
+
+   def wave_chain(self, chain):
+      pulses = expand(chain, self._waves)
+      self.sent.append((self.tick, pulses))
+      self.advance(duration(pulses))
+      return 0
+
+   def wave_send_once(self, wid):
+      return self.wave_chain([wid])
+
+   def wave_send_using_mode(self, wid, mode):
+      # each send starts where the last ended, so the _SYNC modes
+      #   are the same as the others
+      return self.wave_chain([wid])
+
+   def wave_tx_at(self):
+      return NO_TX_WAVE
+
+   def wave_tx_busy(self):
+      return 0
+
+   def wave_tx_stop(self):
+      return 0
@@ -16,9 +16,20 @@
 # Public Domain
 
 import sys
+import os
 import time
+import queue
+import signal
 import pigpio
 import _433_Mav as _433
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Common'))
+import _433_sink
+import _433_cap
+import _433_bench
+import _433_beacon
+import _433_log
+import _433_shm
+import _433_txq
 
 # GPIO pins on the Pi to use for transmit/receive
 TX=16
@@ -26,6 +37,15 @@ RX=22
 
 MSGLEN = 48    # Mav msgs are 48 bits
 SLPTIME= 5    # Sleep 60 sec between beacons
+MODEL = "Maverick-ET73"   # rtl_433 model name for logged packets
+LOGFILE = None            # JSON-lines packet log file; None logs to stdout
+CAPTURE = None            # raw edge capture file prefix; None for no capture
+SHMFILE = None            # shared-memory ring of received packets, e.g. "/dev/shm/Mav.433"; None for none
+BENCH = False             # loopback benchmark: check codes received against those sent
+BENCHFILE = None          # file to append benchmark reports to (JSON lines); None for none
+BEACON = False            # True: pigpiod itself sends a fixed packet every SLPTIME sec
+DBGLEVEL = "INFO"         # debug log level (TRACE, DEBUG, INFO, WARN); kill -USR1 toggles TRACE
+DBGFILE = "/dev/stderr"   # debug log file
 
 # Create a byte array for the message itself & compute checksum
 def make_msg(I, T1, T2):
@@ -41,34 +61,81 @@ def make_msg(I, T1, T2):
   return msg
 
 # define optional callback for received codes.
+#   Runs in pigpio's callback thread, so just queue the packet for the sink
 def rx_callback(code, bits, gap, t0, t1):
-   print("Received msg with {} bits (gap={} t0={} t1={})  ".format(bits, gap, t0, t1), end='')
-   print("Msg code=0x ", end='')
-   l = bits if (bits<=MSGLEN) else MSGLEN;
-   for i in range( int( (l+7)/8 ) ):
-       print('{:02x} '.format( (code>>(int ((l+7)/8)*8-i*8-8) & 0xff )), end='')
-   print('')
+   log.packet("rx", MODEL, code, bits, gap=gap, t0=t0, t1=t1)
+   if shm is not None:
+      shm.packet("rx", MODEL, code, bits, gpio=RX)
+   if bench is not None:
+      bench.heard(code, bits)
 
+# define callback for packets the transmit queue starts sending.
+#   Runs in the queue's worker thread as the packet goes on the air, so
+#   the log and the bench are given the actual start, not the queueing, time
+def tx_started(msg):
+   def started(t):
+      log.packet("tx", MODEL, msg, t=t)
+      if bench is not None:
+         bench.sent(msg, t)
+   return started
+
+log = _433_sink.sink(LOGFILE)
+dbg = _433_log.log(DBGFILE, _433_log.level(DBGLEVEL))
+# "kill -USR1 <pid>" switches per-edge tracing on and off while running
+signal.signal(signal.SIGUSR1, lambda sig, frame:
+              dbg.set_level(_433_log.level(DBGLEVEL) if dbg.trace else _433_log.TRACE))
 pi = pigpio.pi() # Connect to local Pi.
-rx = _433.rx(pi, gpio=RX, callback=rx_callback)
-tx = _433.tx(pi, gpio=TX, bits=48, repeats=4, gap=3980, t0=1925, t1=1040)
+cap = None if CAPTURE is None else _433_cap.recorder(CAPTURE)
+shm = None if SHMFILE is None else _433_shm.publisher(SHMFILE)
+# everything rx_callback reads must exist before the receiver starts
+bench = None
+rx = _433.rx(pi, gpio=RX, callback=rx_callback, capture=cap, log=dbg)
+tx = _433.tx(pi, gpio=TX, bits=48, repeats=4, gap=3980, t0=1925, t1=1040, log=dbg)
+bench = None if not BENCH else _433_bench.bench(MODEL, MSGLEN,
+          dict(gap=3980, t0=1925, t1=1040, repeats=4))
 
 # For now, just loop forever or 'til kbd interrupt
+b = None
+q = None
 try:
+  if BEACON:
+    # Fixed packet, sent by a script in pigpiod with no Python wake-ups
+    msg = make_msg(1, 20., -20.1)
+    log.packet("tx", MODEL, msg, beacon=SLPTIME)
+    b = _433_beacon.beacon(pi, tx, msg, SLPTIME)
+    while True:
+      time.sleep(60)
+  # Packets are sent by the queue's worker thread, so this loop
+  #   never waits out their airtime
+  q = _433_txq.txq(tx)
   cntr = 0
   while True:
     # Make msg with ID=<sequential counter>, Temp1=20C, Temp2=-20.1C
     cntr += 1
     cntr %= 100
     msg = make_msg(cntr, 20., -20.1)
-    print('Sending message: 0x', end='')
-    for i in range(MSGLEN if (len(msg))>MSGLEN else len(msg)):
-      print('{:<x} '.format(msg[i]), end='')
-    print('')
-    tx.send(msg)
+    try:
+      q.enqueue(msg, started=tx_started(msg))
+    except queue.Full:
+      dbg.emit(_433_log.WARNING, "tx queue full; {} not sent", msg.hex())
     time.sleep(SLPTIME)
 except KeyboardInterrupt:
-  tx.cancel()      # Cancel the transmitter.
+  if bench is not None:
+    print(bench.text())
+    if BENCHFILE is not None:
+      bench.write(BENCHFILE)
+  if b is not None:
+    b.stop()       # Stop the beacon script.
+  if q is not None:
+    q.close()      # Send what is queued, and cancel the transmitter.
+  else:
+    tx.cancel()    # Cancel the transmitter.
   rx.cancel()      # Cancel the receiver.
   pi.stop()        # Disconnect from local Pi.
+  log.close()      # Write out any packets still queued.
+  dbg.close()      # and any debug messages.
+  if cap is not None:
+    cap.close()    # Record the edge count in the capture file.
+  if shm is not None:
+    shm.close()
 
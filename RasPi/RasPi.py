@@ -22,10 +22,22 @@
 # Public Domain
 
 import sys
+import os
 import time
+import queue
+import signal
 import pigpio
 import _433_RPi as _433
-import libcrc8 as crc
+import libpayload
+import libsense
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Common'))
+import _433_sink
+import _433_cap
+import _433_bench
+import _433_beacon
+import _433_log
+import _433_shm
+import _433_txq
 
 # GPIO pins on the Pi to use for transmit/receive
 TX=16
@@ -35,58 +47,115 @@ RX=22
 GAP=1500        #was 2000
 SHORT=500      #was 1050
 LONG=1000        #was 525
+END_GAP=1300    # rx: edge (us) that ends a packet; between LONG and GAP
 MSGLEN = 80    # Raspi msgs are 80 bits
 MSG_RPT = 3     # Send 5 times
 SLPTIME= 5      # Sleep 60 sec between beacons
+MODEL = "RasPi" # rtl_433 model name for logged packets
+LOGFILE = None  # JSON-lines packet log file; None logs to stdout
+CAPTURE = None  # raw edge capture file prefix; None for no capture
+SHMFILE = None  # shared-memory ring of received packets, e.g. "/dev/shm/RasPi.433"; None for none
+BENCH = False   # loopback benchmark: check codes received against those sent
+BENCHFILE = None  # file to append benchmark reports to (JSON lines); None for none
+BEACON = False  # True: pigpiod itself sends a fixed packet every SLPTIME sec
+DBGLEVEL = "INFO"  # debug log level (TRACE, DEBUG, INFO, WARN); kill -USR1 toggles TRACE
+DBGFILE = "/dev/stderr"  # debug log file
+HEALTH = False  # True: send CPU health (type 1) messages, sampled ahead of each send
 
-# Create a byte array for the message itself & compute checksum
-def make_msg(T, I, D):
-  msg = bytearray([
-     ( (T&0x0f)<<4 | (I&0xf) ),
-     ( D[0] ),
-     ( D[1] ),
-     ( D[2] ),
-     ( D[3] ),
-     ( D[4] ),
-     ( D[5] ),
-     ( D[6] ),
-     ( D[7] ),
-     ( 0x00 ) ])
-  msg[9] = crc.crc8(msg,9,0x00)
-  return msg
+# Messages are packed by libpayload from each type's field schema:
+#   type 1, CPU health, from a libsense sample;
+#   type 15, a counter and a fixed test pattern
+PATTERN = 0x01020304050607
 
 # define optional callback for received codes.
+#   Runs in pigpio's callback thread, so just queue the packet for the sink
 def rx_callback(code, bits, gap, t0, t1):
-   print("Received msg with {} bits (gap={} t0={} t1={})  ".format(bits, gap, t0, t1), end='')
-   print("Msg code=0x ", end='')
-   l = bits if (bits<=MSGLEN) else MSGLEN;
-   for i in range( int( (l+7)/8 ) ):
-       print('{:02x} '.format( (code>>(int ((l+7)/8)*8-i*8-8) & 0xff )), end='')
-   print('')
+   log.packet("rx", MODEL, code, bits, gap=gap, t0=t0, t1=t1)
+   if shm is not None:
+      shm.packet("rx", MODEL, code, bits, gpio=RX)
+   if bench is not None:
+      bench.heard(code, bits)
 
+# define callback for packets the transmit queue starts sending.
+#   Runs in the queue's worker thread as the packet goes on the air, so
+#   the log and the bench are given the actual start, not the queueing, time
+def tx_started(msg):
+   def started(t):
+      log.packet("tx", MODEL, msg, t=t)
+      if bench is not None:
+         bench.sent(msg, t)
+   return started
+
+log = _433_sink.sink(LOGFILE)
+dbg = _433_log.log(DBGFILE, _433_log.level(DBGLEVEL))
+# "kill -USR1 <pid>" switches per-edge tracing on and off while running
+signal.signal(signal.SIGUSR1, lambda sig, frame:
+              dbg.set_level(_433_log.level(DBGLEVEL) if dbg.trace else _433_log.TRACE))
 pi = pigpio.pi() # Connect to local Pi.
-rx = _433.rx(pi, gpio=RX, callback=rx_callback)
-tx = _433.tx(pi, gpio=TX, bits=MSGLEN, repeats=MSG_RPT, gap=GAP, t0=SHORT, t1=LONG)
+cap = None if CAPTURE is None else _433_cap.recorder(CAPTURE)
+shm = None if SHMFILE is None else _433_shm.publisher(SHMFILE)
+# everything rx_callback reads must exist before the receiver starts
+bench = None
+rx = _433.rx(pi, gpio=RX, callback=rx_callback, capture=cap, end_gap=END_GAP, log=dbg)
+tx = _433.tx(pi, gpio=TX, bits=MSGLEN, repeats=MSG_RPT, gap=GAP, t0=SHORT, t1=LONG, log=dbg)
+bench = None if not BENCH else _433_bench.bench(MODEL, MSGLEN,
+           dict(gap=GAP, t0=SHORT, t1=LONG, repeats=MSG_RPT))
 
 # For now, just loop forever or 'til kbd interrupt
+b = None
+q = None
+smp = None
 try:
+   if BEACON:
+      # Fixed packet, sent by a script in pigpiod with no Python wake-ups
+      msg = libpayload.pack(15, 13, {"counter": 0, "data": PATTERN})
+      log.packet("tx", MODEL, msg, beacon=SLPTIME)
+      b = _433_beacon.beacon(pi, tx, msg, SLPTIME)
+      while True:
+         time.sleep(60)
+   if HEALTH:
+      # Samples are read in the sampler's thread, just ahead of each send
+      smp = libsense.sampler(["thermal", "uptime", "loadavg"], SLPTIME)
+   # Packets are sent by the queue's worker thread, so this loop never
+   #   waits out their airtime and each deadline is met however long it is
+   q = _433_txq.txq(tx)
    cntr = 0
    while True:
-      # Make msg with Type=0, ID=13, first data byte as counter
-      cntr = cntr+1 if cntr<256 else 0
-      S = bytearray( [ (cntr&0xff), 0x01, 0x02, 0x03, 0x04, 0x05, 0x06, 0x07] )
-      msg = make_msg(0x0f, 13, S)
-      if 8*len(msg) != MSGLEN:
-         print('!!Message length = ', 8*len(msg), ' should be 80')
-      print('Sending message: 0x', end='')
-      for i in range(0,10):
-         print('{:02x} '.format(msg[i]), end='')
-      print('')
-      tx.send(msg)
-      time.sleep(SLPTIME)
+      if HEALTH:
+         # Make msg with Type=1, ID=13, CPU health data; send on time
+         deadline, s = smp.next()
+         msg = libpayload.pack(1, 13, s)
+         time.sleep(max(0, deadline - time.time()))
+      else:
+         # Make msg with Type=15, ID=13, first data byte as counter
+         cntr = cntr+1 if cntr<256 else 0
+         msg = libpayload.pack(15, 13, {"counter": cntr, "data": PATTERN})
+      try:
+         q.enqueue(msg, started=tx_started(msg))
+      except queue.Full:
+         dbg.emit(_433_log.WARNING, "tx queue full; {} not sent", msg.hex())
+      if not HEALTH:
+         time.sleep(SLPTIME)
 except KeyboardInterrupt:
-   tx.cancel()      # Cancel the transmitter.
+   if bench is not None:
+      print(bench.text())
+      if BENCHFILE is not None:
+         bench.write(BENCHFILE)
+   if b is not None:
+      b.stop()      # Stop the beacon script.
+   if smp is not None:
+      smp.stop()    # Stop the sampler.
+   if q is not None:
+      q.close()     # Send what is queued, and cancel the transmitter.
+   else:
+      tx.cancel()   # Cancel the transmitter.
    rx.cancel()      # Cancel the receiver.
    pi.stop()        # Disconnect from local Pi.
+   log.close()      # Write out any packets still queued.
+   dbg.close()      # and any debug messages.
+   if cap is not None:
+      cap.close()   # Record the edge count in the capture file.
+   if shm is not None:
+      shm.close()
    quit()
   
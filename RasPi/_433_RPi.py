@@ -13,6 +13,7 @@ LONG   = 2000
 GAP    = 3000
 MSGLEN = 80
 REPEATS= 3
+END_GAP= 2750   # edge (us) longer than any data edge, that ends a packet
 
 """
 This module provides two classes to use with wireless 433MHz fobs.
@@ -20,199 +21,31 @@ The rx class decodes received fob codes. The tx class transmits
 fob codes.
 """
 
+import sys
+import os
 import time
 import pigpio
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Common'))
+import _433_pwm
+import _433_log
 
-class rx():
+class rx(_433_pwm.rx):
    """
    A class to read the wireless codes transmitted by 433 MHz
-   wireless fobs.
+   wireless fobs:  short long = 0, long short = 1 (see
+   Common/_433_pwm.py).
    """
    def __init__(self, pi, gpio, callback=None,
-                      min_bits=8, max_bits=MSGLEN, glitch=150):
+                      min_bits=8, max_bits=MSGLEN, glitch=150, capture=None,
+                      end_gap=END_GAP, slack0=0.3, slack1=0.2, log=_433_log.off):
       """
       Instantiate with the Pi and the GPIO connected to the wireless
-      receiver.
-
-      If specified the callback will be called whenever a new code
-      is received.  The callback will be passed the code, the number
-      of bits, the length (in us) of the gap, short pulse, and long
-      pulse.
-
-      Codes with bit lengths outside the range min_bits to max_bits
-      will be ignored.
-
-      A glitch filter will be used to remove edges shorter than
-      glitch us long from the wireless stream.  This is intended
-      to remove the bulk of radio noise.
-      """
-      self.pi = pi
-      self.gpio = gpio
-      self.cb = callback
-      self.min_bits = min_bits
-      self.max_bits = max_bits
-      self.glitch = glitch
-
-      self._in_code = False
-      self._edge = 0
-      self._code = 0
-      self._gap = 0
-
-      self._ready = False
-
-      pi.set_mode(gpio, pigpio.INPUT)
-      pi.set_glitch_filter(gpio, glitch)
-
-      self._last_edge_tick = pi.get_current_tick()
-      self._cb = pi.callback(gpio, pigpio.EITHER_EDGE, self._cbf)
-
-   def _timings(self, e0, e1):
-      """
-      Accumulates the short and long pulse length so that an
-      average short/long pulse length can be calculated. The
-      figures may be used to tune the transimission settings.
-      """
-      if e0 < e1:
-         shorter = e0
-         longer = e1
-      else:
-         shorter = e1
-         longer = e0
-
-      if self._bits:
-         self._t0 += shorter
-         self._t1 += longer
-      else:
-         self._t0 = shorter
-         self._t1 = longer
-
-      self._bits += 1
-
-   def _calibrate(self, e0, e1):
-      """
-      The first pair of pulses is used as the template for
-      subsequent pulses.  They should be one short, one long, not
-      necessarily in that order.  The ratio between long and short
-      should really be 2 or more.  If less than 1.5 the pulses are
-      assumed to be noise.
-      """
-      self._bits = 0
-      self._timings(e0, e1)
-      self._bits = 0
-
-      ratio = float(self._t1)/float(self._t0)
-
-      if ratio < 1.5:
-         self._in_code = False
-
-      slack0 = int(0.3 * self._t0)
-      slack1 = int(0.2 * self._t1)
-
-      self._min_0 = self._t0 - slack0
-      self._max_0 = self._t0 + slack0
-      self._min_1 = self._t1 - slack1
-      self._max_1 = self._t1 + slack1
-
-   def _test_bit(self, e0, e1):
-      """
-      Returns the bit value represented by the sequence of pulses.
-
-      0: short long
-      1: long short
-      2: illegal sequence
-      """
-      self._timings(e0, e1)
-
-      if   ( (self._min_0 < e0 < self._max_0) and
-             (self._min_1 < e1 < self._max_1) ):
-         return 0
-      elif ( (self._min_0 < e1 < self._max_0) and
-             (self._min_1 < e0 < self._max_1) ):
-         return 1
-      else:
-         return 2
-
-   def _cbf(self, g, l, t):
-      """
-      Accumulates the code from pairs of short/long pulses.
-      The code end is assumed when an edge greater than 5 ms
-      is detected.
-      """
-      edge_len = pigpio.tickDiff(self._last_edge_tick, t)
-      self._last_edge_tick = t
-
-      if edge_len > 2750: # 5000 us, 5 ms.
-
-         if self._in_code:
-            if self.min_bits <= self._bits <= self.max_bits:
-               self._lbits = self._bits
-               self._lcode = self._code
-               self._lgap = self._gap
-               self._lt0 = int(self._t0/self._bits)
-               self._lt1 = int(self._t1/self._bits)
-               self._ready = True
-               if self.cb is not None:
-                  self.cb(self._lcode, self._lbits,
-                          self._lgap, self._lt0, self._lt1)
-
-         self._in_code = True
-         self._gap = edge_len
-         self._edge = 0
-         self._bits = 0
-         self._code = 0
-
-      elif self._in_code:
-
-         if self._edge == 0:
-            self._e0 = edge_len
-         elif self._edge == 1:
-            self._calibrate(self._e0, edge_len)
-
-         if self._edge % 2: # Odd edge.
-
-            bit = self._test_bit(self._even_edge_len, edge_len)
-            self._code = self._code << 1
-            if bit == 1:
-               self._code += 1
-            elif bit != 0:
-               self._in_code = False
-
-         else: # Even edge.
-
-            self._even_edge_len = edge_len
-
-         self._edge += 1
-
-   def ready(self):
-      """
-      Returns True if a new code is ready.
+      receiver.  The arguments are those of _433_pwm.rx; "end_gap"
+      (default END_GAP us) is the edge length that ends a packet.
       """
-      return self._ready
-
-   def code(self):
-      """
-      Returns the last received code.
-      """
-      self._ready = False
-      return self._lcode
-
-   def details(self):
-      """
-      Returns details of the last receieved code.  The details
-      consist of the code, the number of bits, the length (in us)
-      of the gap, short pulse, and long pulse.
-      """
-      self._ready = False
-      return self._lcode, self._lbits, self._lgap, self._lt0, self._lt1
-
-   def cancel(self):
-      """
-      Cancels the wireless code receiver.
-      """
-      if self._cb is not None:
-         self.pi.set_glitch_filter(self.gpio, 0) # Remove glitch filter.
-         self._cb.cancel()
-         self._cb = None
+      _433_pwm.rx.__init__(self, pi, gpio, callback, min_bits, max_bits,
+                           glitch, capture, invert=False, end_gap=end_gap,
+                           slack0=slack0, slack1=slack1, log=log)
 
 class tx():
    """
@@ -220,7 +53,8 @@ class tx():
    wireless fobs.
    """
 #   def __init__(self, pi, gpio, repeats=6, bits=24, gap=9000, t0=300, t1=900):
-   def __init__(self, pi, gpio, repeats=REPEATS, bits=MSGLEN, gap=GAP, t0=SHORT, t1=LONG):
+   def __init__(self, pi, gpio, repeats=REPEATS, bits=MSGLEN, gap=GAP, t0=SHORT, t1=LONG,
+                log=_433_log.off):
       """
       Instantiate with the Pi and the GPIO connected to the wireless
       transmitter.
@@ -231,9 +65,13 @@ class tx():
       The pre-/post-amble gap (default 9000 us), short pulse length
       (default 300 us), and long pulse length (default 900 us) may
       be set.
+
+      Each code sent, with its wave chain, is a DEBUG message to
+      "log" (see Common/_433_log.py).
       """
       self.pi = pi
       self.gpio = gpio
+      self.log = log
       self.repeats = repeats
       self.bits = bits
       self.gap = gap
@@ -248,24 +86,30 @@ class tx():
       """
       Generates the basic waveforms needed to transmit codes.
       """
+      # each wave's pulses are kept too, for combined waveforms
+      # (see Common/_433_multi.py)
+      self._pulses = dict()
 
       wf = []
       wf.append(pigpio.pulse(1<<self.gpio, 0, self.t0))
       wf.append(pigpio.pulse(0, 1<<self.gpio, self.gap))
       self.pi.wave_add_generic(wf)
       self._amble = self.pi.wave_create()
+      self._pulses[self._amble] = wf
 
       wf = []
       wf.append(pigpio.pulse(1<<self.gpio, 0, self.t0))
       wf.append(pigpio.pulse(0, 1<<self.gpio, self.t1))
       self.pi.wave_add_generic(wf)
       self._wid0 = self.pi.wave_create()
+      self._pulses[self._wid0] = wf
 
       wf = []
       wf.append(pigpio.pulse(1<<self.gpio, 0, self.t1))
       wf.append(pigpio.pulse(0, 1<<self.gpio, self.t0))
       self.pi.wave_add_generic(wf)
       self._wid1 = self.pi.wave_create()
+      self._pulses[self._wid1] = wf
 
    def set_repeats(self, repeats):
 #      Set the number of code repeats.
@@ -289,33 +133,33 @@ class tx():
 
       self._make_waves()
 
-   def send(self, code):
+   def _chain(self, code):
       """
-      Transmits the code (using the current settings of repeats,
-      bits, gap, short, and long pulse length).
+      Returns the wave chain that transmits the code.
       """
       chain = [self._amble, 255, 0]
 
-      bs=""
       bit = (1<<(self.bits-1))
       for i in range(self.bits):
-#         bs += "0" if (code&bit==0) else "1"
          bit = (1<<(7-i%8))
          if code[int(i/8)] & bit:
             chain += [self._wid1]
-            bs += "1"
          else:
             chain += [self._wid0]
-            bs += "0"
          bit = bit >> 1
 
       chain += [self._amble, 255, 1, self.repeats, 0]
+      return chain
 
-      print("Sending bit string of ",  self.bits, " bits:")
-      print("\t", bs)
-      print("Wave chain:")
-      print(chain)
-      
+   def send(self, code):
+      """
+      Transmits the code (using the current settings of repeats,
+      bits, gap, short, and long pulse length).
+      """
+      # Sent packets are logged by the caller (see Common/_433_sink.py)
+      chain = self._chain(code)
+      if self.log.debug:
+         self.log.emit(_433_log.DEBUG, "tx {} chain {}", bytes(code).hex(), chain)
       self.pi.wave_chain(chain)
 
       while self.pi.wave_tx_busy():
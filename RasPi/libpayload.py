@@ -0,0 +1,154 @@
+'''  libpayload.py
+
+    Library of pack and unpack codecs for the payloads of the 16
+    RasPi message types.
+
+    A RasPi message is 10 bytes, TI DD DD DD DD DD DD DD DD CC:
+    the message type and device ID (4 bits each), 64 bits of data,
+    and a CRC-8 (see libcrc8.py).  The layout of the data for each
+    type is declared in SCHEMAS as a list of bit fields, most
+    significant first:
+       (name, bits)                 unsigned integer
+       (name, bits, scale)          value*scale, stored unsigned
+       (name, bits, scale, True)    value*scale, stored two's complement
+       (None, bits)                 unused (zero)
+    Only the types declared in SCHEMAS -- 0 (64 bits of raw "data"),
+    1 (CPU health), and 15 (counter) -- can be packed or unpacked;
+    the others raise ValueError until their layouts are added.
+
+    Each schema is compiled, once, when the library is loaded, into
+    a pack and an unpack function made of straight-line shifts and
+    masks (no loops over the fields), so packing a payload or
+    unpacking a received code is a single expression.
+
+    To access,
+       import libpayload
+
+    Use:
+       msg = libpayload.pack(1, 13, {"temp_C": 45.3, "uptime": 86400,
+                                     "load1": 0.5, "load5": 0.25})
+       v = libpayload.unpack(msg)         # or the code from _433_RPi.rx
+          # {"type": 1, "id": 13, "crc_ok": True, "temp_C": 45.3, ...}
+
+       a = libpayload.unpack_many(codes, 1)   # NumPy record array
+       a.temp_C.mean()
+
+    Type 1 (CPU health) values are those of a libsense sample of
+    the "thermal", "uptime", and "loadavg" sources.
+'''
+
+import libcrc8 as crc
+
+SCHEMAS = {
+  0:  ("raw",        [ ("data",   64) ]),            # any 8 bytes
+  1:  ("cpu_health", [ ("temp_C", 12, 10, True),     # 0.1C
+                       ("uptime", 20),               # sec since boot, mod 2^20
+                       ("load1",   8, 10),           # load averages, *10
+                       ("load5",   8, 10),
+                       (None,     16) ]),
+  15: ("counter",    [ ("counter", 8),               # packet counter
+                       ("data",   56) ]),            # test pattern
+  }
+
+def _fields(schema):
+  '''Yields (name, bits, shift, scale, signed) for each field'''
+  shift = 64
+  for f in schema:
+    name, bits = f[0], f[1]
+    scale = f[2] if len(f) > 2 else 1
+    signed = f[3] if len(f) > 3 else False
+    shift -= bits
+    yield name, bits, shift, scale, signed
+  if shift < 0:
+    raise ValueError("schema is longer than 64 bits")
+
+def _compile(schema):
+  '''Returns the (pack, unpack) functions of a schema'''
+  p = []
+  u = []
+  for name, bits, shift, scale, signed in _fields(schema):
+    if name is None:
+      continue
+    mask = (1<<bits) - 1
+    val = "v[{!r}]".format(name) if scale == 1 else "round(v[{!r}]*{})".format(name, scale)
+    p.append("((int({}) & {:#x}) << {})".format(val, mask, shift))
+    f = "((x >> {}) & {:#x})".format(shift, mask)
+    if signed:
+      sign = 1<<(bits-1)
+      f = "(({} ^ {:#x}) - {:#x})".format(f, sign, sign)
+    if scale != 1:
+      f = "{}/{}".format(f, float(scale))
+    u.append("{!r}: {}".format(name, f))
+  src = ("def pack(v):\n  return " + (" | ".join(p) or "0") + "\n" +
+         "def unpack(x):\n  return {" + ", ".join(u) + "}\n")
+  g = dict()
+  exec(src, g)
+  return g["pack"], g["unpack"]
+
+_pack = [None]*16
+_unpack = [None]*16
+for t, (n, schema) in SCHEMAS.items():
+  _pack[t], _unpack[t] = _compile(schema)
+
+def _schema(t):
+  '''Returns the (name, fields) of message type "t"'''
+  s = SCHEMAS.get(t)
+  if s is None:
+    raise ValueError("message type {} has no layout in SCHEMAS".format(t))
+  return s
+
+def name(t):
+  '''Returns the name of message type "t"'''
+  return _schema(t)[0]
+
+def pack(t, i, values):
+  '''Returns the 10-byte message of type "t", device ID "i", with
+     the payload fields in dictionary "values"'''
+  _schema(t&0x0f)
+  msg = bytearray(10)
+  msg[0] = (t&0x0f)<<4 | (i&0x0f)
+  msg[1:9] = _pack[t&0x0f](values).to_bytes(8, 'big')
+  msg[9] = crc.crc8(msg, 9, 0x00)
+  return msg
+
+def unpack(msg):
+  '''Returns the type, ID, CRC check, and payload fields of a
+     message given as bytes or as an 80-bit integer code'''
+  if isinstance(msg, int):
+    msg = msg.to_bytes(10, 'big')
+  t = msg[0]>>4
+  _schema(t)
+  v = {"type": t, "id": msg[0]&0x0f, "crc_ok": crc.crc8(msg, 9, 0x00) == msg[9]}
+  v.update(_unpack[t](int.from_bytes(msg[1:9], 'big')))
+  return v
+
+def unpack_many(codes, t):
+  '''Returns a NumPy record array of the messages of type "t" among
+     "codes" (bytes or 80-bit integers), with fields type, id,
+     crc_ok, and the type's payload fields'''
+  import numpy as np
+  fields = [ f for f in _fields(_schema(t)[1]) if f[0] is not None ]
+  b = b"".join(c.to_bytes(10, 'big') if isinstance(c, int) else bytes(c) for c in codes)
+  a = np.frombuffer(b, dtype=np.uint8).reshape(-1, 10)
+  a = a[(a[:,0]>>4) == t]
+
+  table = np.frombuffer(bytes(crc.CRC8Table), dtype=np.uint8)
+  rem = np.zeros(len(a), dtype=np.uint8)
+  for i in range(9):
+    rem = table[rem ^ a[:,i]]
+
+  x = a[:,1:9].copy().view(">u8").ravel().astype(np.uint64)
+  dt = [("type", "u1"), ("id", "u1"), ("crc_ok", "?")]
+  for name, bits, shift, scale, signed in fields:
+    dt.append((name, "f8" if scale != 1 else ("i8" if signed else "u8")))
+  r = np.empty(len(a), dtype=dt)
+  r["type"] = t
+  r["id"] = a[:,0] & 0x0f
+  r["crc_ok"] = rem == a[:,9]
+  for name, bits, shift, scale, signed in fields:
+    f = (x >> np.uint64(shift)) & np.uint64((1<<bits) - 1)
+    if signed:
+      sign = 1<<(bits-1)
+      f = (f.astype(np.int64) ^ sign) - sign
+    r[name] = f/scale if scale != 1 else f
+  return r.view(np.recarray)
@@ -0,0 +1,172 @@
+'''  libsense.py
+
+    Library of sensor sources and a background sampler for the
+    payloads of RasPi messages (CPU temperature, uptime, load
+    averages, ...).
+
+    A source reads one system file -- a sysfs or /proc file --
+    through a file handle that is opened once and kept, rereading
+    it from the start for each sample, and parses what it reads
+    into named values.  A source is read at most once every
+    "min_interval" seconds; within that time the last values are
+    reused, so a source may be shared by any number of message
+    types (there can be 16) without reading its file more often.
+    Sources are kept by name in a registry:
+       libsense.source_for("loadavg")
+    returns the same source object to every caller.
+
+    A sampler reads the sources a message needs in a thread of its
+    own, "lead" seconds ahead of each transmit deadline (every
+    "period" seconds), so the sample is ready when the packet is due
+    and the sender never waits on file reads.
+
+    To access,
+       import libsense
+
+    Use:
+       smp = libsense.sampler(["thermal", "uptime", "loadavg"], period=60)
+       while True:
+          deadline, s = smp.next()        # s["temp_C"], s["uptime"], s["load1"], ...
+          msg = make_msg(s)
+          time.sleep(max(0, deadline - time.time()))
+          tx.send(msg)
+       ...
+       smp.stop()
+
+    Sources provided (add others with libsense.register()):
+       thermal:  temp_C, from /sys/class/thermal/thermal_zone0/temp
+       uptime:   uptime (sec), from /proc/uptime
+       loadavg:  load1, load5, load15, from /proc/loadavg
+       meminfo:  mem_avail_kB, from /proc/meminfo
+'''
+
+import time
+import threading
+
+class source():
+  def __init__(self, path, parse, min_interval=1.0):
+    '''A source of values parsed by "parse" from file "path"'''
+    self.path = path
+    self.parse = parse
+    self.min_interval = min_interval
+    self.reads = 0
+    self._f = None
+    self._t = None
+    self._v = None
+    self._lock = threading.Lock()
+
+  def read(self, now=None):
+    '''Returns the dictionary of the source's values'''
+    if now is None:
+      now = time.time()
+    with self._lock:
+      if self._t is not None and now - self._t < self.min_interval:
+        return self._v
+      if self._f is None:
+        self._f = open(self.path, "rb", buffering=0)
+      self._f.seek(0)
+      self._v = self.parse(self._f.read(4096))
+      self._t = now
+      self.reads += 1
+      return self._v
+
+  def close(self):
+    with self._lock:
+      if self._f is not None:
+        self._f.close()
+        self._f = None
+
+def _thermal(b):
+  return {"temp_C": int(b)/1000.0}
+
+def _uptime(b):
+  return {"uptime": float(b.split()[0])}
+
+def _loadavg(b):
+  w = b.split()
+  return {"load1": float(w[0]), "load5": float(w[1]), "load15": float(w[2])}
+
+def _meminfo(b):
+  for line in b.splitlines():
+    if line.startswith(b"MemAvailable:"):
+      return {"mem_avail_kB": int(line.split()[1])}
+  return {"mem_avail_kB": None}
+
+#   name: (path, parse, min_interval)
+SOURCES = {
+  "thermal": ("/sys/class/thermal/thermal_zone0/temp", _thermal, 1.0),
+  "uptime":  ("/proc/uptime", _uptime, 1.0),
+  "loadavg": ("/proc/loadavg", _loadavg, 5.0),
+  "meminfo": ("/proc/meminfo", _meminfo, 1.0),
+  }
+
+_registry = dict()
+_reglock = threading.Lock()
+
+def register(name, path, parse, min_interval=1.0):
+  '''Adds source "name", reading "path" with "parse"'''
+  with _reglock:
+    SOURCES[name] = (path, parse, min_interval)
+    _registry.pop(name, None)
+
+def source_for(name):
+  '''Returns the shared source object named "name"'''
+  with _reglock:
+    s = _registry.get(name)
+    if s is None:
+      path, parse, min_interval = SOURCES[name]
+      s = _registry[name] = source(path, parse, min_interval)
+    return s
+
+def sample(names, now=None):
+  '''Reads the sources "names" once and returns all their values'''
+  if now is None:
+    now = time.time()
+  v = {"time": now}
+  for n in names:
+    v.update(source_for(n).read(now))
+  return v
+
+class sampler():
+  def __init__(self, names, period, lead=0.2, start=None):
+    '''Samples sources "names" "lead" sec before each deadline,
+       every "period" sec from "start" (default now)'''
+    self.names = list(names)
+    self.period = period
+    self.lead = lead
+    self.deadline = time.time() if start is None else start
+    self._latest = None
+    self._taken = None
+    self._stop = threading.Event()
+    self._cond = threading.Condition()
+    self._t = threading.Thread(target=self._run, name="sampler", daemon=True)
+    self._t.start()
+
+  def _run(self):
+    d = self.deadline
+    while not self._stop.wait(max(0.0, d - self.lead - time.time())):
+      s = sample(self.names)
+      with self._cond:
+        self._latest = (d, s)
+        self._cond.notify_all()
+      d += self.period
+      # if we've fallen behind (system suspended?), skip missed deadlines
+      while d - self.lead < time.time():
+        d += self.period
+
+  def next(self, timeout=None):
+    '''Waits for the sample of the next deadline; returns (deadline, sample)'''
+    with self._cond:
+      if not self._cond.wait_for(lambda: self._latest is not None and
+                                         self._latest is not self._taken, timeout):
+        return None
+      self._taken = self._latest
+      return self._latest
+
+  def latest(self):
+    '''Returns the most recent (deadline, sample) without waiting, or None'''
+    return self._latest
+
+  def stop(self):
+    self._stop.set()
+    self._t.join()
@@ -1,20 +1,17 @@
 # CPUHealth.py
 # Demonstrate how to obtain CPU status in Python
 
-from gpiozero import CPUTemperature
-import re
+import libsense
 
 bb=bytearray([0,0,0,0,0,0,0,0,0,0])
 print("Message byte array: ", end='')
 print(bb)
 
 print("CPU health report")
-cpu = str(CPUTemperature())
-l=[]
-l=re.findall(r'\d+.\d+',cpu)
-t = float(l[0])
+s = libsense.sample(["thermal", "uptime", "loadavg"])
+t = s["temp_C"]
 #t=-20.1
-print("CPU Temp string: {:<s}; extracted temp as string: {:<s}; temp as a float: {:<5.1f}C".format(cpu,l[0],t))
+print("CPU Temp as a float: {:<5.1f}C".format(t))
 n=int((t+0.049)*10) #round to 0.1 degree  & scale to 10th's of a degree C
 print(type(n))
 print("temp * 10 = ", n)
@@ -22,7 +19,7 @@ n=n%(1<<12)          #mask to rh 12 bits
 print(type(n))
 print("temp as bit field: 0x{:<4x}".format(n))
 
-u=float(open('/proc/uptime').read().split()[0])
+u=s["uptime"]
 d=int(u)//24//60//60
 h=(int(u)-d*24*60*60)//60//60
 m=(int(u)-d*24*60*60-h*60*60)//60
@@ -32,8 +29,8 @@ e=e&0xFFFFF
 e=e%(1<<20)         #mask to rh 20 bits
 print("Elapsed time since boot as bit field: 0x{:<x}".format(e))
 
-l1=float(open('/proc/loadavg').read().split()[0])
-l2=float(open('/proc/loadavg').read().split()[1])
+l1=s["load1"]
+l2=s["load5"]
 print("Load averages: {:6.1f} 1-min & {:6.1f} 5-min".format(l1,l2))
 la1=int(l1*10)
 la2=int(l2*10)
@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+# chansim.py
+
+'''
+Radio channel simulator, for capacity studies:  how many Acurite,
+RasPi, and Maverick sensors can one receiver hear before collisions
+dominate?
+
+Many simulated devices of each protocol transmit, each every "period"
+seconds (with +/-10% jitter, from a random start), packets with
+codes of their own.  The pulses of each packet are exactly those the
+protocol's tx class puts on the air (expanded from its wave chain on
+the virtual Pi, Common/_433_virt.py).  All the transmissions are laid
+on one shared channel:
+   - each device has a path loss, uniform in 0..--atten dB, and each
+     transmission a fade, Gaussian with s.d. --fade dB;  transmissions
+     weaker than --margin dB are not heard at all
+   - overlapping carriers are OR-ed, as an OOK receiver's slicer sees
+     them:  the channel is on while any carrier, or noise, is on
+   - impulse noise bursts arrive at --noise per second, with lengths
+     exponentially distributed with mean --noise-len us
+   - each edge is moved by Gaussian jitter of s.d. --jitter us
+The channel's edges are fed, in time order, to the protocols' rx
+classes (through Common/_433_host.py, as on a real receiver host;  or
+Common/_433_mrx.py with --mrx) on the virtual Pi, which applies their
+glitch filters and watchdogs, and the codes decoded are matched
+against those sent.
+
+Everything runs in virtual time, transmissions are generated only as
+the channel reaches them, and nothing sleeps, so an hour of a busy
+channel takes seconds to minutes.  For each protocol it reports the
+transmissions sent, the share decoded (at least one repeat), the
+share that overlapped another transmission, and the false decodes;
+with --scale, the device counts are multiplied by each factor in turn
+to show how delivery falls off as the channel fills.
+
+  Use:
+     python3 chansim.py --devices AR=10,RPi=5,Mav=5 --duration 600
+     python3 chansim.py --devices AR=4,RPi=4,Mav=4 --scale 1,2,4,8 --noise 20
+'''
+
+import sys
+import os
+import time
+import heapq
+import random
+import argparse
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Common'))
+import _433_proto
+import _433_virt
+import _433_host
+import _433_mrx
+
+GPIO = 22             # any pins will do on the virtual Pi
+TXGPIO = 16
+
+#  Seconds between transmissions, as the emulators send them
+PERIOD = { "AR": 10.0, "RPi": 5.0, "Mav": 5.0 }
+
+class device():
+   def __init__(self, name, n, loss):
+      self.name = name
+      self.n = n
+      self.loss = loss
+
+class channel():
+   def __init__(self, counts, duration, args, seed=1):
+      """
+      The channel of "counts" (protocol --> devices) devices over
+      "duration" seconds, with the noise and path settings of "args".
+      """
+      self.rnd = random.Random(seed)
+      self.args = args
+      self.duration = int(duration*1000000)
+      self.tx = dict()
+      for name in counts:
+         _433 = _433_proto.module(name)
+         kw = dict(_433_proto.TX[name])
+         if name == "AR":
+            kw["joan"] = 1.0
+         self.tx[name] = _433.tx(_433_virt.pi(), gpio=TXGPIO, **kw)
+      self.sent = { name: set() for name in counts }
+      self.heard = { name: 0 for name in counts }     # transmissions above the margin
+      self.overlapped = { name: 0 for name in counts }
+      self.on_us = 0
+
+      # all the transmissions:  (start us, device)
+      rnd = self.rnd
+      self._txs = []
+      for name, count in counts.items():
+         period = PERIOD[name]*args.period
+         for i in range(count):
+            d = device(name, i, rnd.uniform(0, args.atten))
+            t = rnd.uniform(0, period)
+            while t < duration:
+               self._txs.append((int(t*1000000), d))
+               t += period*rnd.uniform(0.9, 1.1)
+      self._txs.sort(key=lambda x: x[0])
+
+   def _code(self, name):
+      bits = self.tx[name].bits
+      sent = self.sent[name]
+      while True:
+         if name == "AR":
+            b = bytes(self.rnd.getrandbits(8) for i in range(4))
+            b += bytes([sum(b) & 0xff])
+         else:
+            b = bytes(self.rnd.getrandbits(8) for i in range((bits+7)//8))
+         if b.hex() not in sent:
+            sent.add(b.hex())
+            return b
+
+   def _intervals(self, start, name):
+      """
+      Returns the (on, off) carrier intervals, in us, of a packet of
+      protocol "name" starting at "start".
+      """
+      tx = self.tx[name]
+      pulses = _433_virt.expand(tx._chain(self._code(name)), tx._pulses)
+      out = []
+      t = start
+      for level, us in _433_virt.levels(pulses, TXGPIO):
+         if level:
+            out.append((t, t + us))
+         t += us
+      return out
+
+   def _noise(self):
+      a = self.args
+      if a.noise <= 0:
+         return
+      t = 0.0
+      while True:
+         t += self.rnd.expovariate(a.noise)*1000000
+         if t >= self.duration:
+            return
+         yield (int(t), int(t + 1 + self.rnd.expovariate(1.0/a.noise_len)))
+
+   def _carriers(self):
+      """
+      Generates the carrier intervals of all the transmissions heard,
+      and of the noise, in order of their start.
+      """
+      a = self.args
+      heap = []
+      seq = 0
+      noise = self._noise()
+      first = next(noise, None)
+      if first is not None:
+         heap.append((first[0], first[1], seq, noise))
+      ends = []                                        # (end, name) of recent transmissions
+      for start, d in self._txs:
+         while heap and heap[0][0] < start:
+            s, e, k, it = heapq.heappop(heap)
+            yield s, e
+            nxt = next(it, None)
+            if nxt is not None:
+               heapq.heappush(heap, (nxt[0], nxt[1], k, it))
+         if d.loss + self.rnd.gauss(0, a.fade) > a.margin:
+            self._code(d.name)            # sent, but not heard
+            continue
+         ivs = self._intervals(start, d.name)
+         self.heard[d.name] += 1
+         end = ivs[-1][1]
+         # overlaps with a transmission still on the air
+         ends = [ x for x in ends if x[0] > start ]
+         if ends:
+            self.overlapped[d.name] += 1
+            for x in ends:
+               if not x[2]:
+                  self.overlapped[x[1]] += 1
+                  x[2] = True
+         ends.append([end, d.name, bool(ends)])
+         seq += 1
+         it = iter(ivs)
+         s, e = next(it)
+         heapq.heappush(heap, (s, e, seq, it))
+      while heap:
+         s, e, k, it = heapq.heappop(heap)
+         yield s, e
+         nxt = next(it, None)
+         if nxt is not None:
+            heapq.heappush(heap, (nxt[0], nxt[1], k, it))
+
+   def edges(self, on):
+      """
+      Generates the (level, tick) edges of the channel;  "on" is the
+      level of the receiver's output while a carrier is on.
+      """
+      jitter = self.args.jitter
+      gauss = self.rnd.gauss
+      cur = None
+      last = -1
+      def pair(s, e):
+         nonlocal last
+         if jitter:
+            s = max(last + 1, int(s + gauss(0, jitter)))
+            e = max(s + 1, int(e + gauss(0, jitter)))
+         last = e
+         self.on_us += e - s
+         return (on, s), (1 - on, e)
+      for s, e in self._carriers():
+         if cur is not None and s <= cur[1]:
+            if e > cur[1]:
+               cur[1] = e             # OR of overlapping carriers
+            continue
+         if cur is not None:
+            yield from pair(*cur)
+         cur = [s, e]
+      if cur is not None:
+         yield from pair(*cur)
+
+class collect():
+   """
+   Counts the codes decoded, as a sink for _433_host.
+   """
+   def __init__(self):
+      self.got = dict()           # protocol --> set of hex codes
+
+   def packet(self, dir, model, code, bits=None, **extra):
+      self.add(_433_proto.by_model(model), code, bits)
+
+   def add(self, name, code, bits):
+      self.got.setdefault(name, set()).add(code.to_bytes((bits+7)//8, 'big').hex())
+
+def run(counts, args, seed):
+   """
+   Simulates the channel of "counts" devices; returns the results
+   for each protocol and the channel occupancy.
+   """
+   ch = channel(counts, args.duration, args, seed)
+   vpi = _433_virt.pi()
+   sink = collect()
+   if args.mrx:
+      r = _433_mrx.rx(vpi, GPIO, sink.add, protocols=list(counts), glitch=args.glitch)
+   else:
+      r = _433_host.host(vpi, sink)
+      for name in counts:
+         r.add(GPIO, name, glitch=args.glitch)
+   on = 1 - _433_proto.module("AR").TRAILING       # as the AR receiver is wired
+   vpi.play(GPIO, ch.edges(on))
+   r.cancel()
+   res = dict()
+   for name in counts:
+      sent = ch.sent[name]
+      got = sink.got.get(name, set())
+      res[name] = { 'devices'   : counts[name],
+                    'sent'      : len(sent),
+                    'heard'     : ch.heard[name],
+                    'decoded'   : len(got & sent),
+                    'overlapped': ch.overlapped[name],
+                    'false'     : len(got - sent) }
+   return res, ch.on_us/float(ch.duration)
+
+if __name__ == "__main__":
+   ap = argparse.ArgumentParser(description="Simulate many 433MHz devices sharing one receiver")
+   ap.add_argument("--devices", default="AR=10,RPi=5,Mav=5", help="protocol=count,... (default AR=10,RPi=5,Mav=5)")
+   ap.add_argument("--scale", default="1", help="factors to multiply the device counts by, e.g. 1,2,4,8")
+   ap.add_argument("--duration", type=float, default=600.0, help="virtual seconds to simulate (default 600)")
+   ap.add_argument("--period", type=float, default=1.0, help="multiplies the emulators' periods (default 1)")
+   ap.add_argument("--atten", type=float, default=20.0, help="largest device path loss, dB (default 20)")
+   ap.add_argument("--fade", type=float, default=3.0, help="s.d. of each transmission's fade, dB (default 3)")
+   ap.add_argument("--margin", type=float, default=25.0, help="greatest loss still heard, dB (default 25)")
+   ap.add_argument("--noise", type=float, default=0.0, help="noise bursts per second (default 0)")
+   ap.add_argument("--noise-len", type=float, default=300.0, help="mean noise burst, us (default 300)")
+   ap.add_argument("--jitter", type=float, default=10.0, help="s.d. of edge timing jitter, us (default 10)")
+   ap.add_argument("--glitch", type=int, default=150, help="receivers' glitch filter, us (default 150)")
+   ap.add_argument("--mrx", action="store_true", help="decode with the shared multi-protocol receiver")
+   ap.add_argument("--seed", type=int, default=1)
+   args = ap.parse_args()
+
+   counts = dict()
+   for d in args.devices.split(","):
+      name, _, n = d.partition("=")
+      if name not in _433_proto.PROTOCOLS:
+         ap.error("unknown protocol {}; use one of {}".format(name, ", ".join(sorted(_433_proto.PROTOCOLS))))
+      counts[name] = int(n)
+
+   print("{:>5} {:<4} {:>7} {:>7} {:>7} {:>8} {:>9} {:>6} {:>8} {:>7}".format(
+         "scale", "prot", "devices", "sent", "heard", "decoded", "overlap", "false", "channel", "x real"))
+   for f in args.scale.split(","):
+      f = float(f)
+      t0 = time.time()
+      res, occ = run({ k: int(round(v*f)) for k, v in counts.items() }, args, args.seed)
+      speed = args.duration/(time.time() - t0)
+      for name, r in res.items():
+         print("{:>5g} {:<4} {:>7} {:>7} {:>7} {:>7.1f}% {:>8.1f}% {:>6} {:>7.1f}% {:>7.0f}".format(
+               f, name, r['devices'], r['sent'], r['heard'],
+               100.0*r['decoded']/r['sent'] if r['sent'] else 0.0,
+               100.0*r['overlapped']/r['heard'] if r['heard'] else 0.0,
+               r['false'], 100.0*occ, speed))
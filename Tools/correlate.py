@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+# correlate.py
+
+'''
+Correlates an emulator packet log with an rtl_433 JSON log, offline.
+
+The emulator log is the JSON-lines file written by the emulators
+(LOGFILE; see Common/_433_sink.py); its "tx" records are the packets
+sent.  The rtl_433 log is the output of "rtl_433 -F json" (use
+"-M time:usec" for useful latencies).  Both files are read as
+streams and merged in time order, and each packet rtl_433 heard is
+matched to the send with the same model, ID, and payload made within
+the preceding window (see Common/_433_match.py).
+
+Reported for each emulated device:
+   sent, delivered, packet delivery ratio (pdr), duplicates (the same
+   send heard more than once) and duplicate rate, unmatched packets
+   heard, and mean/50/90/99-percentile send-to-receive latency.
+
+Memory use is bounded by the sends within one window, so multi-GB
+logs can be processed.  Both logs should be in time order, as the
+emulators and rtl_433 write them.  If the two systems' clocks differ,
+give the difference with --offset (added to rtl_433's times).
+
+  Use:
+     python3 correlate.py AR609.json rtl_433.json [--window 5] [--json]
+'''
+
+import sys
+import os
+import json
+import heapq
+import argparse
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Common'))
+import _433_match
+
+#  Event kinds; sends sort ahead of receptions at the same time
+SENT  = 0
+HEARD = 1
+
+# Generates (time, kind, line number, key) events from a JSON-lines file
+#   "want" selects records: "tx" for our sends; None for rtl_433's
+#   records (ours are skipped if both are in one file)
+def events(path, kind, want, offset=0.0):
+   with open(path, "r", buffering=1<<20) as f:
+      for n, line in enumerate(f):
+         if not line.startswith("{"):
+            continue
+         try:
+            rec = json.loads(line)
+         except ValueError:
+            continue
+         if rec.get("dir") != want or "time" not in rec:
+            continue
+         k = _433_match.key(rec)
+         if k is None:
+            continue
+         yield (_433_match.parse_time(rec["time"]) + offset, kind, n, k)
+
+def correlate(txlog, rxlog, window=5.0, offset=0.0):
+   m = _433_match.matcher(window)
+   for t, kind, n, k in heapq.merge(events(txlog, SENT, "tx"),
+                                 events(rxlog, HEARD, None, offset)):
+      if kind == SENT:
+         m.sent(t, k)
+      else:
+         m.heard(t, k)
+   return m.report()
+
+def show(report):
+   print("{:<22s} {:>7s} {:>7s} {:>6s} {:>6s} {:>6s} {:>6s} {:>8s} {:>8s} {:>8s}".format(
+         "device", "sent", "rcvd", "pdr", "dups", "dup%", "unmtch",
+         "lat_p50", "lat_p90", "lat_p99"))
+   fmt = lambda v, f: "-" if v is None else f.format(v)
+   for dev, v in report.items():
+      print("{:<22s} {:>7d} {:>7d} {:>6s} {:>6d} {:>6s} {:>6d} {:>8s} {:>8s} {:>8s}".format(
+            dev, v['sent'], v['delivered'], fmt(v['pdr'], "{:.3f}"),
+            v['duplicates'], fmt(v['dup_rate'], "{:.1%}"), v['unmatched'],
+            fmt(v['lat_p50'], "{:.3f}"), fmt(v['lat_p90'], "{:.3f}"),
+            fmt(v['lat_p99'], "{:.3f}")))
+
+if __name__ == "__main__":
+   ap = argparse.ArgumentParser(description="Match emulator sends against an rtl_433 JSON log")
+   ap.add_argument("txlog", help="emulator JSON-lines log (LOGFILE)")
+   ap.add_argument("rxlog", help="rtl_433 -F json log")
+   ap.add_argument("--window", type=float, default=5.0,
+                   help="longest send-to-receive delay to match, sec (default 5)")
+   ap.add_argument("--offset", type=float, default=0.0,
+                   help="seconds to add to rtl_433 times to align the clocks")
+   ap.add_argument("--json", action="store_true", help="print the report as JSON")
+   args = ap.parse_args()
+
+   report = correlate(args.txlog, args.rxlog, args.window, args.offset)
+   if args.json:
+      print(json.dumps(report, indent=1))
+   else:
+      show(report)
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+# mkcu8.py
+
+'''
+Renders emulator transmissions as I/Q sample files that rtl_433 can
+read with "rtl_433 -r", so its decoders can be regression-tested at
+disk speed with no radio in the loop.
+
+The pulses rendered are exactly those the emulators' tx classes put
+on the air:  each packet is sent by the protocol's own tx class on a
+virtual Pi (Common/_433_virt.py), which expands the wave chain into
+its pulse sequence.  The carrier is keyed on and off by those pulses
+(OOK) and written as interleaved unsigned 8-bit I/Q samples (.cu8),
+optionally with a frequency offset and added Gaussian noise.
+
+Packets come either from an emulator's JSON-lines log (the "tx"
+records; see Common/_433_sink.py), so the file holds exactly what was
+sent in a session, or from hex strings given with --proto and --data.
+Transmissions are separated by --spacing seconds of silence.
+
+The output name follows rtl_433's convention of recording the center
+frequency and sample rate in the file name, e.g.
+   AR609_433.92M_250k.cu8
+so "rtl_433 -r AR609_433.92M_250k.cu8" needs no other options.
+
+Requires NumPy.
+
+  Use:
+     python3 mkcu8.py --log ../Acurite/AR609.json -o AR609
+     python3 mkcu8.py --proto AR --data a420c80591 --count 100 --noise 0.05 -o AR609
+'''
+
+import sys
+import os
+import json
+import argparse
+import numpy as np
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Common'))
+import _433_proto
+import _433_virt
+
+GPIO = 16             # any pin will do on the virtual Pi
+
+class renderer():
+   def __init__(self, f, rate=250000, level=0.8, noise=0.0, offset=0.0, seed=None):
+      """
+      Writes OOK I/Q samples at "rate" samples/sec to the open binary
+      file "f".  The carrier has amplitude "level" (full scale is 1.0)
+      and sits "offset" Hz from the center frequency; "noise" is the
+      standard deviation of the Gaussian noise added to I and Q.
+      """
+      self.f = f
+      self.rate = rate
+      self.level = level
+      self.noise = noise
+      self.w = 2*np.pi*offset/rate
+      self.rng = np.random.default_rng(seed)
+      self.n = 0                # samples written so far, for carrier phase
+      self.frac = 0.0           # sample-time remainder carried between steps
+
+   def _write(self, env):
+      """
+      Modulates the envelope "env" onto the carrier and writes it.
+      """
+      n = len(env)
+      if self.w:
+         ph = self.w*(self.n + np.arange(n))
+         iq = env*np.exp(1j*ph)
+      else:
+         iq = env.astype(np.complex64)
+      if self.noise:
+         iq = iq + self.noise*(self.rng.standard_normal(n) + 1j*self.rng.standard_normal(n))
+      out = np.empty(2*n, dtype=np.uint8)
+      out[0::2] = np.clip(np.rint(127.5 + 127.5*iq.real), 0, 255)
+      out[1::2] = np.clip(np.rint(127.5 + 127.5*iq.imag), 0, 255)
+      self.f.write(out.tobytes())
+      self.n += n
+
+   def steps(self, steps):
+      """
+      Renders a list of (level, usec) steps.
+      """
+      if not steps:
+         return
+      lv = np.array([s[0] for s in steps], dtype=np.float32)*self.level
+      us = np.array([s[1] for s in steps], dtype=np.float64)
+      # sample boundaries from the cumulative time, so rounding doesn't drift
+      ends = np.rint(self.frac + np.cumsum(us)*self.rate/1e6).astype(np.int64)
+      counts = np.diff(ends, prepend=0)
+      self.frac = self.frac + us.sum()*self.rate/1e6 - ends[-1]
+      self._write(np.repeat(lv, counts))
+
+   def silence(self, secs, chunk=1<<16):
+      n = int(secs*self.rate)
+      while n > 0:
+         k = min(n, chunk)
+         self._write(np.zeros(k, dtype=np.float32))
+         n -= k
+
+# Generates (protocol, packet bytes) from an emulator log's "tx" records
+def from_log(path):
+   with open(path, "r") as f:
+      for line in f:
+         try:
+            rec = json.loads(line)
+         except ValueError:
+            continue
+         if rec.get("dir") != "tx":
+            continue
+         name = _433_proto.by_model(rec.get("model"))
+         if name is not None:
+            yield name, bytes.fromhex(rec["data"])
+
+if __name__ == "__main__":
+   ap = argparse.ArgumentParser(description="Render emulator transmissions as rtl_433 .cu8 I/Q files")
+   ap.add_argument("--log", help="emulator JSON-lines log whose tx packets to render")
+   ap.add_argument("--proto", choices=sorted(_433_proto.PROTOCOLS), help="protocol of --data packets")
+   ap.add_argument("--data", action="append", default=[], help="packet as hex (may be repeated)")
+   ap.add_argument("--count", type=int, default=1, help="times to send the --data packets")
+   ap.add_argument("-o", "--out", default="emul", help="output file name prefix")
+   ap.add_argument("--rate", type=int, default=250000, help="sample rate (default 250000)")
+   ap.add_argument("--freq", type=float, default=433.92e6, help="center frequency for the file name")
+   ap.add_argument("--offset", type=float, default=0.0, help="carrier offset from center, Hz")
+   ap.add_argument("--level", type=float, default=0.8, help="carrier amplitude, 0..1")
+   ap.add_argument("--noise", type=float, default=0.0, help="noise std dev, 0..1")
+   ap.add_argument("--spacing", type=float, default=0.25, help="sec of silence between transmissions")
+   ap.add_argument("--seed", type=int, help="noise random seed")
+   args = ap.parse_args()
+
+   if args.log:
+      packets = from_log(args.log)
+   elif args.proto and args.data:
+      packets = ( (args.proto, bytes.fromhex(d)) for i in range(args.count) for d in args.data )
+   else:
+      ap.error("give --log, or --proto and --data")
+
+   vpi = _433_virt.pi()
+   txs = dict()
+   path = "{}_{:g}M_{:g}k.cu8".format(args.out, args.freq/1e6, args.rate/1e3)
+   n = 0
+   with open(path, "wb") as f:
+      r = renderer(f, args.rate, args.level, args.noise, args.offset, args.seed)
+      r.silence(args.spacing)
+      for name, msg in packets:
+         tx = txs.get((name, len(msg)))
+         if tx is None:
+            params = dict(_433_proto.TX[name])
+            if name == "AR":
+               params["joan"] = 1.0
+            params["bits"] = 8*len(msg)
+            tx = txs[name, len(msg)] = _433_proto.module(name).tx(vpi, gpio=GPIO, **params)
+         tx.send(msg)
+         r.steps(_433_virt.levels(vpi.sent.pop()[1], GPIO))
+         r.silence(args.spacing)
+         n += 1
+   print("{} transmissions written to {}".format(n, path))
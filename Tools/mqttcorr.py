@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+# mqttcorr.py
+
+'''
+Live correlator for rtl_433's MQTT feed.
+
+Follows the JSON-lines logs of one or more running emulators (LOGFILE;
+see Common/_433_sink.py) to learn what was just transmitted, and
+subscribes to the events rtl_433 publishes to an MQTT broker
+("rtl_433 -F mqtt://broker:1883" publishes each decoded packet to
+"rtl_433/<host>/events").  Each event heard is matched by model, ID,
+and payload against the table of sends made within the last "window"
+seconds; sends older than that are dropped from the table.
+
+Every "period" seconds the delivery ratio, duplicate rate, and latency
+percentiles of each emulated device are printed and published as JSON
+to the stats topic (default "emulators/stats").  Each report covers
+the sends of the period before the last one, from "start" to "end",
+so that all of them have had the full window to be heard;  a delivery
+is counted in the period of its send.
+
+By default a packet is timed by its arrival at this program, since the
+emulators and rtl_433 may run on machines whose clocks differ; with
+--rtl-time, rtl_433's own "time" field is used instead.
+
+For testing, Tools/mqttstub.py is a local broker stand-in.
+
+  Use:
+     python3 mqttcorr.py --sends ../Acurite/AR609.json [--broker localhost:1883]
+'''
+
+import sys
+import os
+import time
+import json
+import asyncio
+import argparse
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Common'))
+import _433_match
+import _433_mqtt
+
+POLL = 0.05           # sec between checks of the send logs for new lines
+
+class correlator():
+   def __init__(self, window=5.0, hold=0.5, rtl_time=False):
+      """
+      Events heard are held back "hold" sec before matching, so that
+      the send they match has surely been read from the send log.
+      """
+      self.m = _433_match.matcher(window)
+      self.hold = hold
+      self.rtl_time = rtl_time
+      self.heard = asyncio.Queue()
+      self._rolls = [time.time()]*2     # times of the last two rolls
+
+   async def follow(self, path, from_start=False):
+      """
+      Reads the sends from an emulator log as it grows, like "tail -f".
+      """
+      with open(path, "r") as f:
+         if not from_start:
+            f.seek(0, os.SEEK_END)
+         part = ""
+         while True:
+            line = f.readline()
+            if not line:
+               await asyncio.sleep(POLL)
+               continue
+            line = part + line
+            if not line.endswith("\n"):      # writer is mid-line
+               part = line
+               continue
+            part = ""
+            self.sent(line)
+
+   def sent(self, line):
+      try:
+         rec = json.loads(line)
+      except ValueError:
+         return
+      if rec.get("dir") != "tx":
+         return
+      k = _433_match.key(rec)
+      if k is not None:
+         self.m.sent(_433_match.parse_time(rec["time"]), k)
+
+   def event(self, payload):
+      """
+      Queues an rtl_433 event (JSON text) heard now.
+      """
+      try:
+         rec = json.loads(payload)
+      except ValueError:
+         return
+      if "dir" in rec:                       # one of our own records
+         return
+      k = _433_match.key(rec)
+      if k is None:
+         return
+      if self.rtl_time and "time" in rec:
+         t = _433_match.parse_time(rec["time"])
+      else:
+         t = time.time()
+      self.heard.put_nowait((time.time(), t, k))
+
+   async def match(self):
+      while True:
+         arrived, t, k = await self.heard.get()
+         delay = arrived + self.hold - time.time()
+         if delay > 0:
+            await asyncio.sleep(delay)
+         self.m.heard(t, k)
+
+   def stats(self):
+      """
+      Returns the statistics of the sends made between the calls
+      before the last, and the last, as a dictionary.
+      """
+      now = time.time()
+      self.m.expire(now - self.hold)
+      start, end = self._rolls
+      self._rolls = [end, now]
+      tf = "%Y-%m-%d %H:%M:%S"
+      return { "time": time.strftime(tf, time.localtime(now)),
+               "start": time.strftime(tf, time.localtime(start)),
+               "end": time.strftime(tf, time.localtime(end)),
+               "pending": self.m.pending(),
+               "devices": self.m.roll() }
+
+async def subscribe(c, client, topic):
+   await client.connect()
+   await client.subscribe(topic)
+   async for t, payload in client.messages():
+      c.event(payload)
+
+async def report(c, client, topic, period):
+   while True:
+      await asyncio.sleep(period)
+      s = json.dumps(c.stats())
+      print(s, flush=True)
+      await client.publish(topic, s)
+
+async def main(args):
+   host, port = (args.broker.split(":") + ["1883"])[0:2]
+   c = correlator(args.window, args.hold, args.rtl_time)
+   sub = _433_mqtt.client(host, int(port))
+   pub = _433_mqtt.client(host, int(port))
+   await pub.connect()
+   tasks = [ asyncio.ensure_future(c.follow(p, args.from_start)) for p in args.sends ]
+   tasks.append(asyncio.ensure_future(c.match()))
+   tasks.append(asyncio.ensure_future(report(c, pub, args.stats_topic, args.period)))
+   try:
+      await subscribe(c, sub, args.topic)     # runs until the broker goes away
+   finally:
+      for t in tasks:
+         t.cancel()
+      await sub.close()
+      await pub.close()
+
+if __name__ == "__main__":
+   ap = argparse.ArgumentParser(description="Match emulator sends against rtl_433's MQTT events, live")
+   ap.add_argument("--sends", action="append", required=True,
+                   help="emulator JSON-lines log to follow (may be repeated)")
+   ap.add_argument("--broker", default="localhost:1883", help="MQTT broker host[:port]")
+   ap.add_argument("--topic", default="rtl_433/+/events", help="rtl_433 events topic")
+   ap.add_argument("--stats-topic", default="emulators/stats",
+                   help="topic on which to publish the statistics")
+   ap.add_argument("--period", type=float, default=60.0,
+                   help="sec between statistics reports (default 60)")
+   ap.add_argument("--window", type=float, default=5.0,
+                   help="longest send-to-receive delay to match, sec (default 5)")
+   ap.add_argument("--hold", type=float, default=0.5,
+                   help="sec to hold events before matching (default 0.5)")
+   ap.add_argument("--rtl-time", action="store_true",
+                   help="time events by rtl_433's time field rather than arrival")
+   ap.add_argument("--from-start", action="store_true",
+                   help="read the send logs from the beginning rather than the end")
+   args = ap.parse_args()
+   if args.period < args.window + args.hold:
+      ap.error("--period must be at least --window plus --hold, so each period's sends are all settled when it is reported")
+   try:
+      asyncio.run(main(args))
+   except KeyboardInterrupt:
+      pass
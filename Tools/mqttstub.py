@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+# mqttstub.py
+
+'''
+A local stand-in for an MQTT broker, for testing mqttcorr.py (or
+anything else that uses Common/_433_mqtt.py) without installing and
+configuring a real broker such as mosquitto.
+
+It accepts any client, and forwards each QoS 0 PUBLISH to every
+client with a matching subscription (MQTT "+" and "#" wildcards are
+understood).  Nothing is retained and nothing is persisted.
+
+  Use:
+     python3 mqttstub.py [--port 1883]
+  then point rtl_433 ("-F mqtt://localhost:1883"), mqttcorr.py, and
+  any other MQTT clients at it.
+'''
+
+import sys
+import os
+import asyncio
+import argparse
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Common'))
+import _433_mqtt as mq
+
+class broker():
+   def __init__(self):
+      self.subs = dict()           # writer --> list of topic filters
+
+   async def serve(self, reader, writer):
+      self.subs[writer] = []
+      try:
+         while True:
+            ptype, flags, body = await mq.read_packet(reader)
+            if ptype == mq.CONNECT:
+               writer.write(mq.packet(mq.CONNACK, bytes([0, 0])))
+            elif ptype == mq.SUBSCRIBE:
+               pid = body[0:2]
+               i = 2
+               granted = bytearray()
+               while i < len(body):
+                  n = int.from_bytes(body[i:i+2], 'big')
+                  self.subs[writer].append(body[i+2:i+2+n].decode())
+                  i += 2+n+1
+                  granted.append(0)
+               writer.write(mq.packet(mq.SUBACK, pid + bytes(granted)))
+            elif ptype == mq.PUBLISH:
+               topic, payload = mq.parse_publish(flags, body)
+               out = mq.packet(mq.PUBLISH, mq._str(topic) + payload)
+               for w, filts in self.subs.items():
+                  if any(mq.matches(f, topic) for f in filts):
+                     w.write(out)
+            elif ptype == mq.PINGREQ:
+               writer.write(mq.packet(mq.PINGRESP))
+            elif ptype == mq.DISCONNECT:
+               break
+            await writer.drain()
+      except (asyncio.IncompleteReadError, ConnectionError):
+         pass
+      finally:
+         del self.subs[writer]
+         writer.close()
+
+async def main(host, port):
+   b = broker()
+   server = await asyncio.start_server(b.serve, host, port)
+   async with server:
+      await server.serve_forever()
+
+if __name__ == "__main__":
+   ap = argparse.ArgumentParser(description="Local MQTT broker stand-in (QoS 0 only)")
+   ap.add_argument("--host", default="localhost")
+   ap.add_argument("--port", type=int, default=1883)
+   args = ap.parse_args()
+   try:
+      asyncio.run(main(args.host, args.port))
+   except KeyboardInterrupt:
+      pass
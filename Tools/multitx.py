@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+# multitx.py
+
+'''
+Emulates several devices at once from one Pi, each with its own
+transmitter on its own GPIO:  each round, every device's packet is
+sent at the same time as one combined waveform (see
+Common/_433_multi.py), optionally staggered by --stagger us per
+device.  Packets sent are logged as rtl_433-style "tx" JSON lines
+(Common/_433_sink.py), so rtl_433's reception can be checked with
+correlate.py.
+
+  Use:
+     python3 multitx.py -d 16:AR:a420c80591 -d 20:Mav:aa99a5566a59 [--count 10]
+'''
+
+import sys
+import os
+import time
+import argparse
+import pigpio
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Common'))
+import _433_proto
+import _433_sink
+import _433_multi
+
+if __name__ == "__main__":
+   ap = argparse.ArgumentParser(description="Transmit several emulated devices at once, one per GPIO")
+   ap.add_argument("-d", "--device", action="append", required=True,
+                   help="GPIO:protocol:hex packet, e.g. 16:AR:a420c80591 (may be repeated)")
+   ap.add_argument("--count", type=int, default=0, help="rounds to send (default 0: until ^C)")
+   ap.add_argument("--interval", type=float, default=30.0, help="sec between rounds (default 30)")
+   ap.add_argument("--stagger", type=int, default=0, help="us between devices' starts (default 0)")
+   ap.add_argument("-o", "--out", help="JSON-lines output file (default stdout)")
+   args = ap.parse_args()
+
+   pi = pigpio.pi()
+   if not pi.connected:
+      print("Can't connect to pigpiod.  Is it running?")
+      sys.exit(0)
+   log = _433_sink.sink(args.out)
+
+   devs = []
+   for i, d in enumerate(args.device):
+      gpio, name, data = d.split(":")
+      if name not in _433_proto.PROTOCOLS:
+         ap.error("unknown protocol {}; use one of {}".format(name, ", ".join(sorted(_433_proto.PROTOCOLS))))
+      msg = bytes.fromhex(data)
+      params = dict(_433_proto.TX[name])
+      params["bits"] = 8*len(msg)
+      tx = _433_proto.module(name).tx(pi, gpio=int(gpio), **params)
+      devs.append((tx, msg, i*args.stagger, _433_proto.model(name)))
+   m = _433_multi.tx(pi)
+
+   n = 0
+   try:
+      while args.count == 0 or n < args.count:
+         for tx, msg, offset, model in devs:
+            log.packet("tx", model, msg, gpio=tx.gpio)
+         m.send([(tx, msg, offset) for tx, msg, offset, model in devs])
+         n += 1
+         if args.count == 0 or n < args.count:
+            time.sleep(args.interval)
+   except KeyboardInterrupt:
+      pass
+
+   for tx, msg, offset, model in devs:
+      tx.cancel()
+   pi.stop()
+   log.close()
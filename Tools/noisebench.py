@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+# noisebench.py
+
+'''
+Benchmarks the Acurite receiver's noise prefilter (see _433_AR.rx):
+synthetic noise corpora, with Acurite transmissions mixed in, are
+played into the receiver on the virtual Pi with the prefilter on and
+off, and for each corpus it reports the CPU time the receiver's
+callback takes per million edges, the share of edges the prefilter
+dropped, and the false-reject rate:  the share of the packets decoded
+without the prefilter that were lost with it.
+
+Corpora:
+   uniform   edges of 50 to 3000 us, uniformly distributed
+   short     edges of mean 300 us, exponentially distributed (static)
+   pwm       bursts of other devices' 300/900 us pulse-width codes
+
+  Use:
+     python3 noisebench.py [--edges 1000000] [--packets 50] [--seed 1]
+'''
+
+import sys
+import os
+import time
+import random
+import argparse
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Common'))
+import _433_proto
+import _433_virt
+
+GPIO = 22
+
+def noise(kind, rnd):
+   """
+   Generates noise edge lengths, in us, of corpus "kind".
+   """
+   while True:
+      if kind == "uniform":
+         yield rnd.randint(50, 3000)
+      elif kind == "short":
+         yield int(rnd.expovariate(1/300.0)) + 1
+      else:
+         for i in range(rnd.randint(20, 80)):
+            b = rnd.random() < 0.5
+            yield 300 if b else 900
+            yield 900 if b else 300
+         yield rnd.randint(3000, 12000)
+
+def corpus(kind, edges, packets, seed):
+   """
+   Returns the (level, tick) edges of a corpus of about "edges" noise
+   edges with "packets" Acurite transmissions spread through it, and
+   the number of packets transmitted.
+   """
+   _433 = _433_proto.module("AR")
+   vpi = _433_virt.pi()
+   tx = _433.tx(vpi, gpio=16, joan=1.0, **_433_proto.TX["AR"])
+   rnd = random.Random(seed)
+   gen = noise(kind, rnd)
+   idle = _433.TRAILING                # received level between pulses
+   out = []
+   level = idle
+   t = 0
+   every = max(1, edges//max(1, packets))
+   sent = 0
+   for n in range(edges):
+      if packets and n % every == every//2 and sent < packets:
+         # a transmission, after a quiet spell
+         if level != idle:
+            level = idle
+            out.append((level, t))
+         t += 20000
+         msg = bytes(rnd.getrandbits(8) for i in range(4))
+         msg += bytes([sum(msg) & 0xff])
+         tx.send(msg)
+         for lv, us in _433_virt.levels(vpi.sent.pop()[1], 16):
+            lv = lv ^ _433.TRAILING
+            if lv != level:
+               level = lv
+               out.append((level, t))
+            t += us
+         if level != idle:
+            level = idle
+            out.append((level, t))
+         t += 20000
+         sent += 1
+      level ^= 1
+      out.append((level, t))
+      t += next(gen)
+   return out, sent*tx.repeats
+
+def run(edges, prefilter, glitch):
+   """
+   Plays "edges" into an Acurite rx; returns the packets decoded, the
+   callback's CPU time in ns, edges delivered, and edges prefiltered.
+   """
+   _433 = _433_proto.module("AR")
+   vpi = _433_virt.pi()
+   got = []
+   rx = _433.rx(vpi, GPIO, valid_pkt_callback=lambda c, b: got.append(c),
+                glitch=glitch, prefilter=prefilter)
+   f = rx._cbf
+   busy = [0, 0]
+   def timed(g, l, t):
+      t0 = time.perf_counter_ns()
+      f(g, l, t)
+      busy[0] += time.perf_counter_ns() - t0
+      busy[1] += 1
+   rx._cb.func = timed
+   vpi.play(GPIO, edges)
+   rx.cancel()
+   return len(got), busy[0], busy[1], rx.prefiltered
+
+if __name__ == "__main__":
+   ap = argparse.ArgumentParser(description="Benchmark the Acurite receiver's noise prefilter")
+   ap.add_argument("--edges", type=int, default=1000000, help="noise edges per corpus")
+   ap.add_argument("--packets", type=int, default=50, help="transmissions per corpus")
+   ap.add_argument("--glitch", type=int, default=150, help="glitch filter, us (default 150)")
+   ap.add_argument("--seed", type=int, default=1)
+   args = ap.parse_args()
+
+   print("{:<8} {:>9} {:>7} {:>12} {:>12} {:>9} {:>8} {:>8} {:>7}".format(
+         "corpus", "edges", "pkts", "s/Medge off", "s/Medge on", "dropped", "rx off", "rx on", "f-rej"))
+   for kind in ("uniform", "short", "pwm"):
+      edges, pkts = corpus(kind, args.edges, args.packets, args.seed)
+      n0, ns0, e0, d0 = run(edges, False, args.glitch)
+      n1, ns1, e1, d1 = run(edges, True, args.glitch)
+      print("{:<8} {:>9} {:>7} {:>12.3f} {:>12.3f} {:>8.1f}% {:>8} {:>8} {:>6.2f}%".format(
+            kind, e1, pkts, ns0/e0/1000.0, ns1/e1/1000.0, 100.0*d1/e1, n0, n1,
+            100.0*(n0 - n1)/n0 if n0 else 0.0))
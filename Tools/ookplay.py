@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+# ookplay.py
+
+'''
+Decodes rtl_433 pulse-data (.ook) files with our own receivers, so
+real-device captures can test the decoders without any hardware.
+Raw edge captures recorded by the receivers themselves (.cap files;
+see Common/_433_cap.py) can be replayed the same way.
+
+Each file is streamed (Common/_433_ook.py, Common/_433_cap.py) into the
+rx classes of the chosen protocols, running on a virtual Pi
+(Common/_433_virt.py) that applies their glitch filters and watchdogs
+just as pigpiod would.  Decoded packets are written as rtl_433-style
+JSON lines, the same as the emulators' "rx" records
+(Common/_433_sink.py).
+
+  Use:
+     python3 ookplay.py [--proto AR] [--glitch 150] file.ook ...
+     python3 ookplay.py --proto AR field.0000.cap field.0001.cap
+'''
+
+import sys
+import os
+import argparse
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Common'))
+import _433_proto
+import _433_virt
+import _433_ook
+import _433_cap
+import _433_sink
+
+GPIO = 22             # any pin will do on the virtual Pi
+
+def receiver(vpi, name, log, glitch):
+   """
+   Builds the rx of protocol "name" on the virtual Pi, logging its
+   packets to "log".  Returns the rx and whether it wants inverted
+   pulses.
+   """
+   _433 = _433_proto.module(name)
+   model = _433_proto.model(name)
+   if name == "AR":
+      cb = lambda code, bits: log.packet("rx", model, code, bits)
+      return _433.rx(vpi, GPIO, valid_pkt_callback=cb, glitch=glitch), _433.TRAILING == 1
+   cb = lambda code, bits, gap, t0, t1: log.packet("rx", model, code, bits, gap=gap, t0=t0, t1=t1)
+   return _433.rx(vpi, GPIO, callback=cb, glitch=glitch, **_433_proto.RX.get(name, {})), False
+
+if __name__ == "__main__":
+   ap = argparse.ArgumentParser(description="Decode rtl_433 .ook pulse-data files with our receivers")
+   ap.add_argument("files", nargs="+", help=".ook pulse-data or .cap edge capture files")
+   ap.add_argument("--proto", action="append", choices=sorted(_433_proto.PROTOCOLS),
+                   help="protocol to decode (may be repeated; default all)")
+   ap.add_argument("--glitch", type=int, default=150, help="glitch filter, us (default 150)")
+   ap.add_argument("-o", "--out", help="JSON-lines output file (default stdout)")
+   args = ap.parse_args()
+
+   # the .cap files of a set are one continuous stream of edges
+   caps = [ p for p in args.files if p.endswith(".cap") ]
+   runs = [ [p] for p in args.files if not p.endswith(".cap") ]
+   if caps:
+      runs.append(caps)
+
+   log = _433_sink.sink(args.out)
+   for name in args.proto or sorted(_433_proto.PROTOCOLS):
+      # each protocol gets its own virtual Pi, since they differ in
+      # the pulse polarity they expect
+      for paths in runs:
+         vpi = _433_virt.pi()
+         rx, invert = receiver(vpi, name, log, args.glitch)
+         if paths is caps:
+            # captured levels are already as the receiver reports them
+            vpi.play(GPIO, _433_cap.edges(paths))
+         else:
+            vpi.play(GPIO, _433_ook.edges(paths[0], invert))
+         rx.cancel()
+   log.close()
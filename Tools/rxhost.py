@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+# rxhost.py
+
+'''
+Runs several 433MHz receivers from one process:  each receiver is
+wired to its own GPIO, and any of the emulated protocols may be
+decoded on each (see Common/_433_host.py).  Every packet decoded is
+logged as an rtl_433-style JSON line tagged with its "gpio", and the
+per-pin edge, packet, and decode-time counters are printed to stderr
+every --stats seconds.  With --shm, the packets are also published into
+a shared-memory ring for other local processes (see Common/_433_shm.py
+and shmcat.py).
+
+  Use:
+     python3 rxhost.py -p 22:AR -p 23:RPi -p 23:Mav [-o rx.json] [--shm /dev/shm/rx.433]
+'''
+
+import sys
+import os
+import json
+import time
+import argparse
+import pigpio
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Common'))
+import _433_proto
+import _433_sink
+import _433_host
+import _433_shm
+
+class tee():
+   """
+   Passes each packet to several sinks.
+   """
+   def __init__(self, *sinks):
+      self.sinks = sinks
+
+   def packet(self, *args, **kw):
+      for s in self.sinks:
+         s.packet(*args, **kw)
+
+if __name__ == "__main__":
+   ap = argparse.ArgumentParser(description="Decode several 433MHz receivers on one Pi")
+   ap.add_argument("-p", "--pin", action="append", required=True,
+                   help="GPIO:protocol to decode, e.g. 22:AR (may be repeated)")
+   ap.add_argument("--glitch", type=int, default=150, help="glitch filter, us (default 150)")
+   ap.add_argument("-o", "--out", help="JSON-lines output file (default stdout)")
+   ap.add_argument("--shm", help="shared-memory ring to publish packets to, e.g. /dev/shm/rx.433")
+   ap.add_argument("--stats", type=float, default=60.0, help="sec between counter reports")
+   args = ap.parse_args()
+
+   pi = pigpio.pi()
+   if not pi.connected:
+      print("Can't connect to pigpiod.  Is it running?")
+      sys.exit(0)
+   log = _433_sink.sink(args.out)
+   shm = None if args.shm is None else _433_shm.publisher(args.shm)
+   h = _433_host.host(pi, log if shm is None else tee(log, shm))
+   for p in args.pin:
+      gpio, name = p.split(":")
+      if name not in _433_proto.PROTOCOLS:
+         ap.error("unknown protocol {}; use one of {}".format(name, ", ".join(sorted(_433_proto.PROTOCOLS))))
+      h.add(int(gpio), name, glitch=args.glitch)
+
+   try:
+      while True:
+         time.sleep(args.stats)
+         print(json.dumps(h.stats()), file=sys.stderr)
+   except KeyboardInterrupt:
+      print(json.dumps(h.stats()), file=sys.stderr)
+
+   h.cancel()
+   pi.stop()
+   log.close()
+   if shm is not None:
+      shm.close()
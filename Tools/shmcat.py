@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+# shmcat.py
+
+'''
+Follows the packets an emulator or rxhost.py publishes into a
+shared-memory ring (see Common/_433_shm.py) and writes them as
+rtl_433-style JSON lines, tagged with their "gpio" and ring "seq".
+Any number of shmcat.py's (or other consumers) may follow the same
+ring at once;  none of them affects the receiver.  Packets the
+consumer fell too far behind to read are counted, and reported on
+stderr at ^C.
+
+  Use:
+     python3 shmcat.py /dev/shm/AR609.433 [/dev/shm/Mav.433 ...] [--old] [-o rx.json]
+'''
+
+import sys
+import os
+import json
+import time
+import argparse
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Common'))
+import _433_sink
+import _433_shm
+
+if __name__ == "__main__":
+   ap = argparse.ArgumentParser(description="Follow the packets published in shared-memory rings")
+   ap.add_argument("rings", nargs="+", help="ring files, e.g. /dev/shm/AR609.433")
+   ap.add_argument("--old", action="store_true", help="start with the oldest packets still in the rings")
+   ap.add_argument("-o", "--out", help="JSON-lines output file (default stdout)")
+   args = ap.parse_args()
+
+   subs = [ _433_shm.subscriber(path, old=args.old) for path in args.rings ]
+   log = _433_sink.sink(args.out)
+   try:
+      while True:
+         got = 0
+         for s in subs:
+            for seq, t, gpio, dir, model, bits, data in s.poll():
+               log.put((t, dir, model, data, bits, dict(gpio=gpio, seq=seq)))
+               got += 1
+         if not got:
+            time.sleep(_433_shm.POLL)
+   except KeyboardInterrupt:
+      pass
+
+   log.close()
+   for s in subs:
+      print(json.dumps({ 'ring': s.path, 'read': s.count, 'lost': s.lost }), file=sys.stderr)
+      s.close()
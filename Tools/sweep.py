@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+# sweep.py
+
+'''
+Decoder parameter sweep:  replays recorded captures (.ook pulse-data
+or .cap edge captures) through a protocol's receiver on the virtual
+Pi for every combination of a grid of decoder settings, and ranks the
+settings by valid-packet yield and false-positive rate.
+
+The settings that may be swept are, for
+   AR:       tolerance (%), glitch (us), and the Timing_Table centers
+             sync_gap, pulse, short, long, sync, gap (us)
+   RPi, Mav: glitch (us), slack0, slack1 (fractions), end_gap (us)
+Settings not given keep the emulators' values.
+
+A packet decoded is valid if it passes the protocol's integrity check
+(the Acurite checksum or the RasPi CRC;  Maverick packets have none),
+or, if the packets actually sent are given with --sent (an emulator's
+JSON-lines log, or a file of hex codes one per line), if it is one of
+them.  Any other decode is a false positive.
+
+The grid is shared out over a pool of worker processes, one setting
+at a time;  each worker reads the captures once and keeps their edges
+in memory.
+
+  Use:
+     python3 sweep.py --proto AR -g tolerance=10,17,25 -g glitch=100,150,200 field.*.cap
+     python3 sweep.py --proto RPi -g slack0=0.2,0.3,0.4 -g end_gap=1200,1300,2750 rpi.ook
+'''
+
+import sys
+import os
+import json
+import argparse
+import itertools
+import multiprocessing
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Common'))
+import _433_proto
+import _433_virt
+import _433_ook
+import _433_cap
+import _433_sink
+
+GPIO = 22             # any pin will do on the virtual Pi
+
+PARAMS = {
+   "AR" : ("tolerance", "glitch", "sync_gap", "pulse", "short", "long", "sync", "gap"),
+   "RPi": ("glitch", "slack0", "slack1", "end_gap"),
+   "Mav": ("glitch", "slack0", "slack1", "end_gap")
+   }
+
+#  Worker process state, set up by _init()
+_name = None
+_runs = None
+_sent = None
+_table = None
+
+def _init(name, paths, sent):
+   """
+   Reads the captures into memory, once per worker process.
+   """
+   global _name, _runs, _sent, _table
+   _name = name
+   _sent = sent
+   _433 = _433_proto.module(name)
+   invert = name == "AR" and _433.TRAILING == 1
+   caps = [ p for p in paths if p.endswith(".cap") ]
+   _runs = [ list(_433_ook.edges(p, invert)) for p in paths if not p.endswith(".cap") ]
+   if caps:
+      _runs.append(list(_433_cap.edges(caps)))
+   if name == "AR":
+      _table = [ (e[1].lower(), e[2]) for e in _433.Timing_Table ]
+      _table.append(("tolerance", _433.TOLERANCE))
+
+def _valid(b):
+   if _sent is not None:
+      return b.hex() in _sent
+   v = _433_sink.MODELS[_433_proto.model(_name)](b)
+   return "mic" in v or _name == "Mav"
+
+def run(setting):
+   """
+   Replays all the captures with the decoder settings "setting" (a
+   dict) and returns the counts of valid and false packets.
+   """
+   _433 = _433_proto.module(_name)
+   kw = dict(_433_proto.RX.get(_name, {}))
+   kw["glitch"] = setting.get("glitch", 150)
+   got = []
+   if _name == "AR":
+      # the AR decoder's settings are module globals, read by rx()
+      centers = dict(_table)
+      for e in _433.Timing_Table:
+         e[2] = setting.get(e[1].lower(), centers[e[1].lower()])
+      _433.TOLERANCE = setting.get("tolerance", centers["tolerance"])
+      cb = lambda code, bits: got.append((code, bits))
+      make = lambda vpi: _433.rx(vpi, GPIO, valid_pkt_callback=cb, **kw)
+   else:
+      for k in ("slack0", "slack1", "end_gap"):
+         if k in setting:
+            kw[k] = setting[k]
+      cb = lambda code, bits, gap, t0, t1: got.append((code, bits))
+      make = lambda vpi: _433.rx(vpi, GPIO, callback=cb, **kw)
+   for edges in _runs:
+      vpi = _433_virt.pi()
+      rx = make(vpi)
+      vpi.play(GPIO, edges)
+      rx.cancel()
+   valid = sum(1 for code, bits in got if _valid(code.to_bytes((bits+7)//8, 'big')))
+   false = len(got) - valid
+   return { 'setting' : setting,
+            'valid'   : valid,
+            'false'   : false,
+            'fp_rate' : round(false/len(got), 4) if got else 0.0 }
+
+def _value(s):
+   try:
+      return int(s)
+   except ValueError:
+      return float(s)
+
+def sent_codes(path):
+   """
+   Returns the set of hex codes sent, from an emulator's JSON-lines
+   log ("tx" records) or a file of hex codes.
+   """
+   codes = set()
+   with open(path) as f:
+      for line in f:
+         line = line.strip()
+         if not line:
+            continue
+         if line[0] == "{":
+            rec = json.loads(line)
+            if rec.get("dir", "tx") == "tx" and "data" in rec:
+               codes.add(rec["data"].lower())
+         else:
+            codes.add(line.lower())
+   return codes
+
+if __name__ == "__main__":
+   ap = argparse.ArgumentParser(description="Sweep decoder settings over recorded captures")
+   ap.add_argument("files", nargs="+", help=".ook pulse-data or .cap edge capture files")
+   ap.add_argument("--proto", required=True, choices=sorted(_433_proto.PROTOCOLS))
+   ap.add_argument("-g", "--grid", action="append", default=[],
+                   help="setting=v1,v2,... to sweep (may be repeated)")
+   ap.add_argument("--sent", help="log or list of the codes actually sent")
+   ap.add_argument("-j", "--jobs", type=int, default=None, help="worker processes (default: CPUs)")
+   ap.add_argument("--top", type=int, default=10, help="settings to show (default 10)")
+   ap.add_argument("--json", action="store_true", help="print all results as JSON lines")
+   args = ap.parse_args()
+
+   names = []
+   values = []
+   for g in args.grid:
+      k, _, v = g.partition("=")
+      k = k.lower()
+      if k not in PARAMS[args.proto]:
+         ap.error("{} has no setting {}; use one of {}".format(args.proto, k, ", ".join(PARAMS[args.proto])))
+      names.append(k)
+      values.append([ _value(x) for x in v.split(",") ])
+   grid = [ dict(zip(names, c)) for c in itertools.product(*values) ]
+
+   sent = sent_codes(args.sent) if args.sent else None
+   with multiprocessing.Pool(args.jobs, _init, (args.proto, args.files, sent)) as pool:
+      results = pool.map(run, grid, chunksize=1)
+
+   results.sort(key=lambda r: (-r['valid'], r['fp_rate']))
+   if args.json:
+      for r in results:
+         print(json.dumps(r))
+   else:
+      print("{:>6} {:>6} {:>8}  setting".format("valid", "false", "fp_rate"))
+      for r in results[:args.top]:
+         print("{:>6} {:>6} {:>8.4f}  {}".format(r['valid'], r['false'], r['fp_rate'],
+               " ".join("{}={}".format(k, v) for k, v in r['setting'].items()) or "(defaults)"))
@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+# test_ar_watchdog.py
+
+'''
+Tests that the Acurite receiver (Acurite/_433_AR.py) arms its
+watchdog once per transmission, and counts the calls re-arming it at
+every edge would have made.
+
+  Use:
+     python3 -m pytest tests
+'''
+
+import os
+import sys
+TOP = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, os.path.join(TOP, 'Common'))
+sys.path.insert(0, os.path.join(TOP, 'Acurite'))
+import _433_virt
+import _433_proto
+import _433_AR
+
+def transmissions(n):
+   # the edges of "n" 5-packet transmissions, 1 s apart, as received
+   vpi = _433_virt.pi()
+   tx = _433_AR.tx(vpi, gpio=16, joan=1.0, **_433_proto.TX["AR"])
+   idle = _433_AR.TRAILING
+   out = []
+   for i in range(n):
+      msg = bytes([0xa4, 0x20, 0xc8, i])
+      tx.send(msg + bytes([sum(msg) & 0xff]))
+      t = 1000000*(i + 1)
+      level = idle
+      for lv, us in _433_virt.levels(vpi.sent.pop()[1], 16):
+         lv ^= _433_AR.TRAILING
+         if lv != level:
+            level = lv
+            out.append((level, t))
+         t += us
+   return out
+
+def test_watchdog_calls():
+   vpi = _433_virt.pi()
+   got = []
+   rx = _433_AR.rx(vpi, 22, valid_pkt_callback=lambda code, bits: got.append(code))
+   vpi.play(22, transmissions(3))
+   rx.cancel()
+   assert len(got) == 15
+   assert rx.daemon_calls == 2*3              # armed and disarmed once each
+   assert rx.per_edge_calls > 5*rx.daemon_calls
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+# test_cap.py
+
+'''
+Tests of raw edge capture file rotation (Common/_433_cap.py).
+
+  Use:
+     python3 -m pytest tests
+'''
+
+import os
+import sys
+import struct
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Common'))
+import _433_cap
+
+def counts(prefix):
+   # the record counts written in the headers of the set's files
+   v = dict()
+   for path in _433_cap.files(prefix):
+      with open(path, "rb") as f:
+         v[os.path.basename(path)] = _433_cap.HDR.unpack(f.read(_433_cap.HDRSIZE))[3]
+   return v
+
+def record(prefix, n, records, files):
+   r = _433_cap.recorder(prefix, records=records, files=files)
+   for i in range(n):
+      r.put(22, i & 1, i)
+   r.close()
+   return r
+
+def test_no_limit(tmp_path):
+   p = str(tmp_path / "t")
+   record(p, 21, 4, None)
+   assert counts(p) == { "t.{:04d}.cap".format(i): 4 for i in range(5) } | { "t.0005.cap": 1 }
+   assert [ t for l, t in _433_cap.edges(_433_cap.files(p)) ] == list(range(21))
+   assert not os.path.exists(p + ".next.cap")
+
+def test_files_limit(tmp_path):
+   # 21 edges of 4 per file are files 0..5:  with a limit of "files",
+   #   the last "files" of them are kept, the last holding one edge
+   for files in (1, 2, 3):
+      p = str(tmp_path / "f{}".format(files))
+      record(p, 21, 4, files)
+      c = counts(p)
+      assert len(c) == files
+      assert sorted(c.values()) == [1] + [4]*(files - 1)
+      assert [ t for l, t in _433_cap.edges(_433_cap.files(p)) ] == list(range(21 - 4*(files-1) - 1, 21))
+      assert not os.path.exists(p + ".next.cap")
+
+def test_exact_fill(tmp_path):
+   # a file filled to the last record is only rotated by the next edge
+   p = str(tmp_path / "x")
+   record(p, 8, 4, 2)
+   assert sorted(counts(p).values()) == [4, 4]